@@ -28,6 +28,14 @@ namespace OneClassClassification.Benchmarks
         /// <returns></returns>
         public abstract double[] GenerateExample(MersenneTwister rng);
 
+        /// <summary>
+        /// Maps a point of the unit cube onto the domain <see cref="GenerateExample"/> draws from,
+        /// e.g. for low discrepancy sequences
+        /// </summary>
+        /// <param name="unit">Coordinates from [0, 1)</param>
+        /// <returns></returns>
+        public abstract double[] ScaleExample(double[] unit);
+
         /// <summary>
         /// Simplified version of contraint for mean angle measure
         /// </summary>
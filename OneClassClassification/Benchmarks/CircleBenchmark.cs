@@ -50,6 +50,11 @@ namespace OneClassClassification.Benchmarks
                     .ToArray();
         }
 
+        public override double[] ScaleExample( double[] unit )
+        {
+            return unit.Select(( u, i ) => u * GlobalVariables.R * 4 + ( i + 1 ) - 2 * GlobalVariables.R).ToArray();
+        }
+
         /// <summary>
         /// Generates the vector in form of [0, 1.0, 0, 1.0, ..., 1.0]
         /// </summary>
@@ -42,6 +42,12 @@ namespace OneClassClassification.Benchmarks
                             .ToArray();
         }
 
+        public override double[] ScaleExample( double[] unit )
+        {
+            return unit.Select(( u, i ) => u * ( GlobalVariables.Range * ( i + 1 ) ) + ( i + 1 ) - ( GlobalVariables.R * ( i + 1 ) ))
+                            .ToArray();
+        }
+
         public sealed override double[] GetConstraintForCalculations( Constraint constraint )
         {
             var tmp = new double[Dimensions];
@@ -66,6 +66,11 @@ namespace OneClassClassification.Benchmarks
                     rng.NextDouble() * (3 + GlobalVariables.R) - 1).ToArray();
         }
 
+        public override double[] ScaleExample(double[] unit)
+        {
+            return unit.Select(u => u * (3 + GlobalVariables.R) - 1).ToArray();
+        }
+
         public override double[] GetConstraintForCalculations(Constraint constraint)
         {
             var tmp = new double[Dimensions];
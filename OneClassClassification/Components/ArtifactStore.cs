@@ -0,0 +1,156 @@
+﻿using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.IO;
+using System.IO.Compression;
+using System.Linq;
+using System.Security.Cryptography;
+using System.Text;
+using OneClassClassification.Data;
+using OneClassClassification.Models;
+using OneClassClassification.Utils;
+
+namespace OneClassClassification.Components
+{
+    /// <summary>
+    /// Content addressed store of the trees, rules, unique constraints and models of experiments. Enabled by
+    /// <see cref="GlobalVariables.ArtifactsVariable"/>; every artifact is a gzip compressed file named after the
+    /// SHA-256 hash of its content, so identical artifacts of different runs are stored once. The artifacts of a run
+    /// are indexed in the artifacts table of the results database (see <see cref="DatabaseUtils.SaveArtifacts"/>)
+    /// and loaded by Scripts/artifacts.py.
+    /// </summary>
+    public static class ArtifactStore
+    {
+        /// <summary>
+        /// Node array of the tree, see <see cref="C45BinaryClassificator.TreeRows"/>
+        /// </summary>
+        public const string TreeKind = "tree";
+
+        /// <summary>
+        /// Rules of the tree read by <see cref="ModelCreator"/>
+        /// </summary>
+        public const string RulesKind = "rules";
+
+        /// <summary>
+        /// Unique constraints of the model, one "axis sign value" line each
+        /// </summary>
+        public const string ConstraintsKind = "constraints";
+
+        /// <summary>
+        /// Gurobi model in LP format
+        /// </summary>
+        public const string ModelKind = "model";
+
+        /// <summary>
+        /// Store directory, or null when the store is disabled
+        /// </summary>
+        public static string StoreDirectory
+        {
+            get
+            {
+                var directory = Environment.GetEnvironmentVariable(GlobalVariables.ArtifactsVariable);
+                return string.IsNullOrEmpty(directory) ? null : Path.GetFullPath(directory);
+            }
+        }
+
+        /// <summary>
+        /// Stores the artifacts of the current experiment
+        /// </summary>
+        /// <returns>Hash and size of every kind of artifact, empty when the store is disabled</returns>
+        public static Dictionary<string, Tuple<string, long>> Store( C45BinaryClassificator classificator,
+            ModelCreator model )
+        {
+            var stored = new Dictionary<string, Tuple<string, long>>();
+            var directory = StoreDirectory;
+            if ( directory == null )
+                return stored;
+
+            byte[] tree;
+            using ( var stream = new MemoryStream() )
+            {
+                NpyFile.Write(stream, C45BinaryClassificator.TreeRows(classificator.DecisionTree),
+                    C45BinaryClassificator.TreeColumns);
+                tree = stream.ToArray();
+            }
+
+            var artifacts = new Dictionary<string, byte[]>
+            {
+                [TreeKind] = tree,
+                [RulesKind] = Encoding.UTF8.GetBytes(classificator.OutputRules),
+                [ConstraintsKind] = Encoding.UTF8.GetBytes(ConstraintsText(model.UniqueConstraints)),
+                [ModelKind] = model.ModelFile
+            };
+
+            foreach ( var artifact in artifacts )
+            {
+                try
+                {
+                    stored[artifact.Key] = Tuple.Create(Put(directory, artifact.Value), (long)artifact.Value.Length);
+                }
+                catch ( Exception ex ) when ( ex is IOException || ex is UnauthorizedAccessException )
+                {
+                    // The store is optional, the run is saved without this artifact
+                    Console.WriteLine($"Artifact {artifact.Key} not stored: {ex.Message}");
+                }
+            }
+            return stored;
+        }
+
+        /// <summary>
+        /// One line per constraint with its axis, sign and value separated by tabs
+        /// </summary>
+        public static string ConstraintsText( IEnumerable<Constraint> constraints )
+        {
+            var sb = new StringBuilder();
+            foreach ( var constraint in constraints )
+                sb.Append($"{constraint.Axis}\t{constraint.Sign}\t{constraint.Value.ToString("R", CultureInfo.InvariantCulture)}\n");
+            return sb.ToString();
+        }
+
+        /// <summary>
+        /// Path of the blob of <paramref name="hash"/>, in a subdirectory named after its first two characters
+        /// </summary>
+        public static string BlobPath( string directory, string hash )
+        {
+            return Path.Combine(directory, hash.Substring(0, 2), $"{hash}.gz");
+        }
+
+        /// <summary>
+        /// Writes <paramref name="content"/> compressed unless a blob of the same content exists. The blob is written
+        /// aside and renamed, so readers never see it partially.
+        /// </summary>
+        /// <returns>Hash of the content</returns>
+        public static string Put( string directory, byte[] content )
+        {
+            string hash;
+            using ( var sha = SHA256.Create() )
+                hash = string.Concat(sha.ComputeHash(content).Select(b => b.ToString("x2")));
+
+            var path = BlobPath(directory, hash);
+            if ( File.Exists(path) )
+                return hash;
+
+            Directory.CreateDirectory(Path.GetDirectoryName(path));
+            var temporary = $"{path}.tmp{Guid.NewGuid():N}";
+            try
+            {
+                using ( var file = File.Create(temporary) )
+                using ( var gzip = new GZipStream(file, CompressionLevel.Optimal) )
+                    gzip.Write(content, 0, content.Length);
+
+                if ( !File.Exists(path) )
+                    File.Move(temporary, path);
+            }
+            catch ( IOException ) when ( File.Exists(path) )
+            {
+                // Stored by another process meanwhile
+            }
+            finally
+            {
+                if ( File.Exists(temporary) )
+                    File.Delete(temporary);
+            }
+            return hash;
+        }
+    }
+}
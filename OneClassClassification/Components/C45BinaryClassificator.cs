@@ -1,9 +1,11 @@
-﻿using System.IO;
-using System.Threading.Tasks;
+﻿using System;
+using System.Collections.Generic;
+using System.IO;
 using Accord.MachineLearning.DecisionTrees;
 using Accord.MachineLearning.DecisionTrees.Learning;
 using Accord.Math;
 using OneClassClassification.Data;
+using OneClassClassification.Utils;
 
 namespace OneClassClassification.Components
 {
@@ -36,6 +38,16 @@ namespace OneClassClassification.Components
         public DecisionTree DecisionTree { get; set; }
         public string OutputRules { get; set; }
 
+        /// <summary>
+        /// Value of <see cref="GlobalVariables.TreeLearnerVariable"/> loading trees learned by Scripts/c45.py
+        /// </summary>
+        public const string NumpyLearner = "numpy";
+
+        /// <summary>
+        /// Columns of a node array: feature, threshold, left child, right child and class of a leaf
+        /// </summary>
+        public const int TreeColumns = 5;
+
         /// <summary>
         /// Decision Tree rules output file
         /// </summary>
@@ -62,7 +74,9 @@ namespace OneClassClassification.Components
 
         /// <summary>
         /// Learns a model, wrapper for
-        /// <see cref="Accord.MachineLearning.DecisionTrees.Learning.C45Learning.Learn(double[][], int[], double[])"/>
+        /// <see cref="Accord.MachineLearning.DecisionTrees.Learning.C45Learning.Learn(double[][], int[], double[])"/>.
+        /// With <see cref="GlobalVariables.TreeLearnerVariable"/> set to <see cref="NumpyLearner"/> the tree and its
+        /// rules are loaded from the dataset cache instead
         /// </summary>
         public void Learn()
         {
@@ -74,24 +88,140 @@ namespace OneClassClassification.Components
                 features[i] = new DecisionVariable($"x{i}", DecisionVariableKind.Continuous);
             }
 
-            // Create 2 class tree object 
-            DecisionTree = new DecisionTree(features, 2);
+            if ( string.Equals(Environment.GetEnvironmentVariable(GlobalVariables.TreeLearnerVariable), NumpyLearner,
+                StringComparison.OrdinalIgnoreCase) )
+            {
+                string treePath, rulesPath;
+                if ( !DatasetCache.TryGetTree(out treePath, out rulesPath) )
+                    throw new ArgumentException($"Tree of Join {Join} and MaxHeight {MaxHeight} not found in dataset cache");
 
-            var c45 = new C45Learning(DecisionTree)
+                DecisionTree = LoadTree(treePath, features);
+                OutputRules = File.ReadAllText(rulesPath);
+            }
+            else
             {
-                Join = Join,
-                MaxHeight = MaxHeight,
-                ParallelOptions = new ParallelOptions { MaxDegreeOfParallelism = 1 }  // Only 1 thread will be used by the learning algorithm
-            };
+                // Create 2 class tree object 
+                DecisionTree = new DecisionTree(features, 2);
+
+                var c45 = new C45Learning(DecisionTree)
+                {
+                    Join = Join,
+                    MaxHeight = MaxHeight,
+                    // Splits are searched in parallel, the tree does not depend on the number of threads
+                    ParallelOptions = GlobalVariables.ParallelOptions
+                };
 
-            c45.Learn(Inputs, Outputs);
+                c45.Learn(Inputs, Outputs);
+                OutputRules = DecisionTree.ToRules().ToString().Replace(",", ".");
+            }
 
-            // Getting rules from tree and saving them to file
+            var metrics = GlobalVariables.StageMetrics;
+            metrics.Set("Learning", "Nodes", CountNodes(DecisionTree.Root, 0, out var height, out var leaves));
+            metrics.Set("Learning", "Leaves", leaves);
+            metrics.Set("Learning", "Height", height);
+
+            // Saving rules to file
             using ( var sw = new StreamWriter(OutputPath) )
             {
-                OutputRules = DecisionTree.ToRules().ToString().Replace(",", ".");
                 sw.Write(OutputRules);
             }
         }
+
+        /// <summary>
+        /// Builds a tree from the node array written by Scripts/c45.py. Every row holds the feature of a node
+        /// (negative for a leaf), its threshold, the rows of its children (x &lt;= threshold first) and the class
+        /// of a leaf. The first row is the root.
+        /// </summary>
+        /// <param name="path">.npy file of the node array</param>
+        /// <param name="features">Decision variables of the tree</param>
+        public static DecisionTree LoadTree( string path, DecisionVariable[] features )
+        {
+            var rows = NpyFile.Read(path);
+            var tree = new DecisionTree(features, 2);
+            var nodes = new DecisionNode[rows.Length];
+            for ( var i = 0; i < nodes.Length; i++ )
+                nodes[i] = new DecisionNode(tree);
+
+            for ( var i = 0; i < rows.Length; i++ )
+            {
+                var row = rows[i];
+                if ( row[0] < 0 )
+                {
+                    nodes[i].Output = (int)row[4];
+                    continue;
+                }
+
+                var left = nodes[(int)row[2]];
+                var right = nodes[(int)row[3]];
+                left.Parent = right.Parent = nodes[i];
+                left.Comparison = ComparisonKind.LessThanOrEqual;
+                right.Comparison = ComparisonKind.GreaterThan;
+                left.Value = right.Value = row[1];
+
+                nodes[i].Branches.AttributeIndex = (int)row[0];
+                nodes[i].Branches.AddRange(new[] { left, right });
+            }
+
+            tree.Root = nodes[0];
+            return tree;
+        }
+
+        /// <summary>
+        /// Node array of <paramref name="tree"/> in the format read by <see cref="LoadTree"/>, nodes in breadth first
+        /// order
+        /// </summary>
+        /// <param name="tree">Tree of continuous variables, every inner node with a &lt;= and a &gt; branch</param>
+        public static double[][] TreeRows( DecisionTree tree )
+        {
+            var nodes = new List<DecisionNode> { tree.Root };
+            var rows = new List<double[]>();
+            for ( var i = 0; i < nodes.Count; i++ )
+            {
+                var node = nodes[i];
+                if ( node.IsLeaf )
+                {
+                    rows.Add(new[] { -1.0, 0.0, 0.0, 0.0, node.Output ?? 0 });
+                    continue;
+                }
+
+                var left = node.Branches[0].Comparison == ComparisonKind.LessThanOrEqual ? 0 : 1;
+                rows.Add(new[]
+                {
+                    node.Branches.AttributeIndex, node.Branches[left].Value ?? 0, nodes.Count + left,
+                    nodes.Count + 1 - left, 0.0
+                });
+                nodes.Add(node.Branches[0]);
+                nodes.Add(node.Branches[1]);
+            }
+            return rows.ToArray();
+        }
+
+        /// <summary>
+        /// Counts nodes of the subtree of <paramref name="node"/>
+        /// </summary>
+        /// <param name="node">Root of the subtree</param>
+        /// <param name="depth">Depth of <paramref name="node"/></param>
+        /// <param name="height">Largest depth of a leaf in the subtree</param>
+        /// <param name="leaves">Number of leaves in the subtree</param>
+        /// <returns>Number of nodes in the subtree</returns>
+        private static int CountNodes( DecisionNode node, int depth, out int height, out int leaves )
+        {
+            height = depth;
+            leaves = 0;
+            if ( node.IsLeaf )
+            {
+                leaves = 1;
+                return 1;
+            }
+
+            var nodes = 1;
+            foreach ( var branch in node.Branches )
+            {
+                nodes += CountNodes(branch, depth + 1, out var branchHeight, out var branchLeaves);
+                height = Math.Max(height, branchHeight);
+                leaves += branchLeaves;
+            }
+            return nodes;
+        }
     }
 }
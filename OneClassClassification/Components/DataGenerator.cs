@@ -2,6 +2,7 @@
 using System.Collections.Generic;
 using System.IO;
 using System.Linq;
+using System.Threading.Tasks;
 using Accord.MachineLearning;
 using OneClassClassification.Benchmarks;
 using OneClassClassification.Data;
@@ -55,6 +56,11 @@ namespace OneClassClassification.Components
         /// </summary>
         public Benchmark Benchmark { get; set; }
 
+        /// <summary>
+        /// Candidates of the rejection sampling whose densities are calculated at once
+        /// </summary>
+        private const int RejectionBatch = 1024;
+
         /// <summary>
         /// Instsnce of RNG
         /// </summary>
@@ -99,6 +105,9 @@ namespace OneClassClassification.Components
         /// </summary>
         public void GenerateTrainingData()
         {
+            var metrics = GlobalVariables.StageMetrics;
+            var fit = metrics.Measure("MixtureFit");
+
             Feasibles = GenerateFeasibleExamples(GlobalVariables.FeasibleExamplesCount);
 
             // Fill training data
@@ -116,14 +125,17 @@ namespace OneClassClassification.Components
             {
                 Initializations = 100,
                 MaxIterations = 10000,
-                ParallelOptions = new System.Threading.Tasks.ParallelOptions() { MaxDegreeOfParallelism = 1 },
+                ParallelOptions = GlobalVariables.ParallelOptions,
                 Tolerance = 10E-11,
                 Options = new Accord.Statistics.Distributions.Fitting.NormalOptions() { Regularization = double.Epsilon }
             };
 
+            // The starting points of the fit are drawn from Accord's generator, seeded like the run
+            Accord.Math.Random.Generator.Seed = GlobalVariables.Seed;
+
             // Estimate the Gaussian Mixture
             gmm.Learn(_dal.TrainingFeasibleExamples);
-            var iterations = gmm.Iterations;
+            metrics.Set("MixtureFit", "Iterations", gmm.Iterations);
             var distribution = gmm.ToMixtureDistribution();
 
             // Get minimal probability of probability density function from distribution (percentile 0)
@@ -133,44 +145,79 @@ namespace OneClassClassification.Components
 
             // Rescale data range for infeasible example creation
             NewBoundries = BoundryRescaler.Rescale(Feasibles);
+            fit.Dispose();
 
-            // Generate infeasible examples
+            // Generate infeasible examples. Candidates are drawn in batches and their densities calculated in
+            // parallel; the generator is rewound to the last used candidate, so the examples do not depend on
+            // the number of threads
+            var sampling = metrics.Measure("RejectionSampling");
             var infeasibles = new List<double[]>();
+            var candidates = new double[RejectionBatch][];
+            var probabilities = new double[RejectionBatch];
+            long attempts = 0;
 
             while (infeasibles.Count < GlobalVariables.InfeasibleExamplesCount)
             {
+                var snapshot = new MersenneTwister(_rand);
+
                 // Generate points within new boundry
-                var x = GenerateLimitedInputs(GlobalVariables.Dimensions, NewBoundries);
+                for (var i = 0; i < RejectionBatch; i++)
+                    candidates[i] = GenerateLimitedInputs(GlobalVariables.Dimensions, NewBoundries);
 
                 // Calculate probability density function value for given input
-                var probability = distribution.ProbabilityDensityFunction(x);
+                Parallel.For(0, RejectionBatch, GlobalVariables.ParallelOptions,
+                    i => probabilities[i] = distribution.ProbabilityDensityFunction(candidates[i]));
 
-                // Check if the value is smaller than smallest probability of all feasible examples
-                if (probability > minimalProbability)
-                    continue;
+                var used = 0;
+                while (used < RejectionBatch && infeasibles.Count < GlobalVariables.InfeasibleExamplesCount)
+                {
+                    var x = candidates[used];
+
+                    // Check if the value is smaller than smallest probability of all feasible examples
+                    if (probabilities[used++] > minimalProbability)
+                        continue;
+
+                    infeasibles.Add(x);
 
-                infeasibles.Add(x);
+                    TrainingData.Add(x.ExtendArrayWithValue(0.0));
 
-                TrainingData.Add(x.ExtendArrayWithValue(0.0));
+                    Output.Add(0);
+                }
+                attempts += used;
+
+                if (used == RejectionBatch)
+                    continue;
 
-                Output.Add(0);
+                // Draw the used candidates again to continue right after them
+                _rand.Restore(snapshot);
+                for (var i = 0; i < used; i++)
+                    GenerateLimitedInputs(GlobalVariables.Dimensions, NewBoundries);
             }
 
             _dal.TrainingInfeasibleExamples = infeasibles.ToArray();
             _dal.TrainingData = TrainingData.ToArray();
+
+            sampling.Dispose();
+            metrics.Set("RejectionSampling", "Attempts", attempts);
+            metrics.Set("RejectionSampling", "Accepted", infeasibles.Count);
         }
 
         /// <summary>
         /// Generates test data consisting of <see cref="GlobalVariables.TestExamples"/> * 2 examples
         /// both with fixed and homogenous distribution
         /// </summary>
-        public void GenerateTestData()
+        /// <param name="homogenous">False to leave out the homogenous test data, which the adaptive evaluation
+        /// does not use. It is drawn last, so the other data sets do not change</param>
+        public void GenerateTestData( bool homogenous = true )
         {
             FixedDistributionTestData.AddRange(GenerateFeasibleExamples(GlobalVariables.TestExamples)
                 .AddColumnWithValues(1.0));
             FixedDistributionTestData.AddRange(GenerateInfeasibleExamples(GlobalVariables.TestExamples)
                 .AddColumnWithValues(0.0));
 
+            if ( !homogenous )
+                return;
+
             double[] vector;
 
             while(HomogenousTestData.Count < GlobalVariables.TestExamples * 2 )
@@ -180,6 +227,42 @@ namespace OneClassClassification.Components
             }
         }
 
+        /// <summary>
+        /// Restores data produced by <see cref="GenerateTrainingData"/> and <see cref="GenerateTestData"/>,
+        /// e.g. from <see cref="DatasetCache"/>
+        /// </summary>
+        /// <param name="trainingData">Training examples with the class in the last column</param>
+        /// <param name="fixedDistributionTestData">Test examples with equal distribution of classes</param>
+        /// <param name="homogenousTestData">Test examples with homogenous distribution</param>
+        /// <param name="newBoundries">Rows of minimum and maximum value of each variable</param>
+        /// <param name="eps">Value of <see cref="Rescalers.BoundryRescaler.Eps"/></param>
+        public void LoadData(double[][] trainingData, double[][] fixedDistributionTestData,
+            double[][] homogenousTestData, double[][] newBoundries, double eps)
+        {
+            TrainingData = trainingData.ToList();
+            Output = TrainingData.Select(x => (int)x[x.Length - 1]).ToList();
+            Feasibles = TrainingData.Where(x => x[x.Length - 1] == 1.0)
+                .Select(x => x.Take(x.Length - 1).ToArray())
+                .ToList();
+
+            NewBoundries = new double[newBoundries.Length, 2];
+            for (var i = 0; i < newBoundries.Length; i++)
+            {
+                NewBoundries[i, 0] = newBoundries[i][0];
+                NewBoundries[i, 1] = newBoundries[i][1];
+            }
+            BoundryRescaler.Eps = eps;
+
+            FixedDistributionTestData = fixedDistributionTestData.ToList();
+            HomogenousTestData = homogenousTestData.ToList();
+
+            _dal.TrainingFeasibleExamples = Feasibles.ToArray();
+            _dal.TrainingInfeasibleExamples = TrainingData.Where(x => x[x.Length - 1] == 0.0)
+                .Select(x => x.Take(x.Length - 1).ToArray())
+                .ToArray();
+            _dal.TrainingData = trainingData;
+        }
+
         /// <summary>
         /// Generate inputs within specyfied range
         /// </summary>
@@ -0,0 +1,256 @@
+﻿using System;
+using System.Globalization;
+using System.IO;
+using System.Linq;
+using System.Security.Cryptography;
+using System.Text;
+using OneClassClassification.Data;
+using OneClassClassification.Utils;
+
+namespace OneClassClassification.Components
+{
+    /// <summary>
+    /// Content addressed cache of generated data sets, shared by experiments which differ only in tree parameters.
+    /// Enabled by <see cref="GlobalVariables.DatasetCacheVariable"/>; every entry is a directory of .npy files
+    /// named after the hash of all data generation parameters.
+    /// </summary>
+    public static class DatasetCache
+    {
+        /// <summary>
+        /// Changes whenever generated data or the layout of an entry changes, invalidating older entries
+        /// </summary>
+        private const string FormatVersion = "2";
+
+        private const string TrainingFile = "training.npy";
+        private const string FixedTestFile = "fixed_test.npy";
+        private const string HomogenousTestFile = "homogenous_test.npy";
+        private const string BoundriesFile = "boundries.npy";
+        private const string EpsFile = "eps.npy";
+
+        /// <summary>
+        /// Trees and rules learned by Scripts/c45.py, named after Join and MaxHeight
+        /// </summary>
+        private const string TreeFile = "tree_{0}_{1}.npy";
+        private const string RulesFile = "rules_{0}_{1}.txt";
+
+        /// <summary>
+        /// Generator of data sets produced by <see cref="DataGenerator"/> itself
+        /// </summary>
+        public const string ProgramGenerator = "accord";
+
+        /// <summary>
+        /// Cache size used when <see cref="GlobalVariables.DatasetCacheSizeVariable"/> is not set
+        /// </summary>
+        private const long DefaultSizeMb = 10 * 1024;
+
+        /// <summary>
+        /// Cache directory, or null when the cache is disabled
+        /// </summary>
+        public static string CacheDirectory
+        {
+            get
+            {
+                var directory = Environment.GetEnvironmentVariable(GlobalVariables.DatasetCacheVariable);
+                return string.IsNullOrEmpty(directory) ? null : Path.GetFullPath(directory);
+            }
+        }
+
+        /// <summary>
+        /// Generator of the data sets used by experiments, see <see cref="GlobalVariables.DataGeneratorVariable"/>
+        /// </summary>
+        public static string Generator
+        {
+            get
+            {
+                var generator = Environment.GetEnvironmentVariable(GlobalVariables.DataGeneratorVariable);
+                return string.IsNullOrEmpty(generator) ? ProgramGenerator : generator.ToLower();
+            }
+        }
+
+        /// <summary>
+        /// Hash of the generator and every parameter the generated data depends on. Join and MaxHeight are left out.
+        /// Scripts/dataGeneration.py computes the same key.
+        /// </summary>
+        public static string Key()
+        {
+            var parameters = string.Join("|",
+                FormatVersion,
+                Generator,
+                GlobalVariables.BenchmarkName,
+                GlobalVariables.Dimensions.ToString(CultureInfo.InvariantCulture),
+                GlobalVariables.FeasibleExamplesCount.ToString(CultureInfo.InvariantCulture),
+                GlobalVariables.InfeasibleExamplesCount.ToString(CultureInfo.InvariantCulture),
+#pragma warning disable 618
+                GlobalVariables.K.ToString("R", CultureInfo.InvariantCulture),
+#pragma warning restore 618
+                GlobalVariables.Seed.ToString(CultureInfo.InvariantCulture),
+                GlobalVariables.Components.ToString(CultureInfo.InvariantCulture),
+                GlobalVariables.TestExamples.ToString(CultureInfo.InvariantCulture),
+                GlobalVariables.R.ToString("R", CultureInfo.InvariantCulture),
+                GlobalVariables.Offset.ToString("R", CultureInfo.InvariantCulture));
+
+            using ( var sha = SHA256.Create() )
+            {
+                var hash = sha.ComputeHash(Encoding.UTF8.GetBytes(parameters));
+                return string.Concat(hash.Select(b => b.ToString("x2")));
+            }
+        }
+
+        /// <summary>
+        /// Paths of the tree and rules of the current parameters learned by Scripts/c45.py
+        /// </summary>
+        /// <param name="treePath">Node array, see <see cref="C45BinaryClassificator.LoadTree"/></param>
+        /// <param name="rulesPath">Rules in the format of <see cref="Accord.MachineLearning.DecisionTrees.DecisionTree.ToRules"/></param>
+        /// <returns>False if the cache is disabled or holds no tree of the current parameters</returns>
+        public static bool TryGetTree( out string treePath, out string rulesPath )
+        {
+            treePath = rulesPath = null;
+            if ( CacheDirectory == null )
+                return false;
+
+            var entry = Path.Combine(CacheDirectory, Key());
+            treePath = Path.Combine(entry, string.Format(TreeFile, GlobalVariables.Join, GlobalVariables.MaxHeight));
+            rulesPath = Path.Combine(entry, string.Format(RulesFile, GlobalVariables.Join, GlobalVariables.MaxHeight));
+            return File.Exists(treePath) && File.Exists(rulesPath);
+        }
+
+        /// <summary>
+        /// Fills <paramref name="generator"/> with cached data of the current parameters
+        /// </summary>
+        /// <returns>False if the cache is disabled or holds no usable entry</returns>
+        public static bool TryLoad( DataGenerator generator )
+        {
+            if ( CacheDirectory == null )
+                return false;
+
+            var entry = Path.Combine(CacheDirectory, Key());
+            if ( !Directory.Exists(entry) )
+                return false;
+
+            try
+            {
+                generator.LoadData(
+                    NpyFile.Read(Path.Combine(entry, TrainingFile)),
+                    NpyFile.Read(Path.Combine(entry, FixedTestFile)),
+                    NpyFile.Read(Path.Combine(entry, HomogenousTestFile)),
+                    NpyFile.Read(Path.Combine(entry, BoundriesFile)),
+                    NpyFile.Read(Path.Combine(entry, EpsFile))[0][0]);
+
+                // Last use of the entry, for eviction
+                Directory.SetLastWriteTimeUtc(entry, DateTime.UtcNow);
+            }
+            catch ( Exception ex ) when ( ex is IOException || ex is UnauthorizedAccessException ||
+                                          ex is InvalidDataException )
+            {
+                // Evicted while being read or damaged: generate the data again. Store never replaces an existing
+                // entry, so a damaged one is removed first
+                Console.WriteLine($"Dataset cache entry {entry} not loaded: {ex.Message}");
+                DeleteEntry(entry);
+                return false;
+            }
+
+            return true;
+        }
+
+        /// <summary>
+        /// Saves data of <paramref name="generator"/> under the current parameters, then evicts least recently used
+        /// entries above the size limit. The entry is written aside and renamed, so readers never see it partially.
+        /// </summary>
+        public static void Store( DataGenerator generator )
+        {
+            var directory = CacheDirectory;
+            if ( directory == null || Generator != ProgramGenerator )
+                return;
+
+            var entry = Path.Combine(directory, Key());
+            var temporary = $"{entry}.tmp{Guid.NewGuid():N}";
+            var columns = GlobalVariables.Dimensions + 1;
+
+            try
+            {
+                Directory.CreateDirectory(temporary);
+                NpyFile.Write(Path.Combine(temporary, TrainingFile), generator.TrainingData.ToArray(), columns);
+                NpyFile.Write(Path.Combine(temporary, FixedTestFile),
+                    generator.FixedDistributionTestData.ToArray(), columns);
+                NpyFile.Write(Path.Combine(temporary, HomogenousTestFile),
+                    generator.HomogenousTestData.ToArray(), columns);
+                NpyFile.Write(Path.Combine(temporary, BoundriesFile), generator.NewBoundries);
+                NpyFile.Write(Path.Combine(temporary, EpsFile), new[] { new[] { generator.BoundryRescaler.Eps } }, 1);
+
+                if ( !Directory.Exists(entry) )
+                    Directory.Move(temporary, entry);
+            }
+            catch ( Exception ex ) when ( ex is IOException || ex is UnauthorizedAccessException )
+            {
+                // Another process stored the same entry first, or the disk is full; the cache is optional
+                Console.WriteLine($"Dataset cache entry {entry} not stored: {ex.Message}");
+            }
+            finally
+            {
+                DeleteEntry(temporary);
+            }
+
+            Evict(directory, SizeLimit());
+        }
+
+        /// <summary>
+        /// Size limit in bytes from <see cref="GlobalVariables.DatasetCacheSizeVariable"/> (megabytes)
+        /// </summary>
+        private static long SizeLimit()
+        {
+            long megabytes;
+            var value = Environment.GetEnvironmentVariable(GlobalVariables.DatasetCacheSizeVariable);
+            if ( !long.TryParse(value, NumberStyles.Integer, CultureInfo.InvariantCulture, out megabytes) )
+                megabytes = DefaultSizeMb;
+            return megabytes * 1024 * 1024;
+        }
+
+        /// <summary>
+        /// Removes least recently used entries until the cache fits into <paramref name="limit"/> bytes.
+        /// Entries being written are neither counted nor removed.
+        /// </summary>
+        private static void Evict( string directory, long limit )
+        {
+            var entries = new DirectoryInfo(directory).GetDirectories()
+                .Where(entry => !entry.Name.Contains(".tmp"))
+                .Select(entry => new { entry.FullName, entry.LastWriteTimeUtc, Size = EntrySize(entry) })
+                .OrderBy(entry => entry.LastWriteTimeUtc)
+                .ToList();
+
+            var total = entries.Sum(entry => entry.Size);
+            foreach ( var entry in entries )
+            {
+                if ( total <= limit )
+                    break;
+                DeleteEntry(entry.FullName);
+                total -= entry.Size;
+            }
+        }
+
+        private static long EntrySize( DirectoryInfo entry )
+        {
+            try
+            {
+                return entry.GetFiles().Sum(file => file.Length);
+            }
+            catch ( IOException )
+            {
+                // Removed by another process meanwhile
+                return 0;
+            }
+        }
+
+        private static void DeleteEntry( string entry )
+        {
+            try
+            {
+                if ( Directory.Exists(entry) )
+                    Directory.Delete(entry, true);
+            }
+            catch ( Exception ex ) when ( ex is IOException || ex is UnauthorizedAccessException )
+            {
+                // Still open by a reader on a file system which does not allow it; removed by a later eviction
+            }
+        }
+    }
+}
@@ -1,4 +1,5 @@
-﻿using System.Collections.Generic;
+﻿using System;
+using System.Collections.Generic;
 using System.IO;
 using Gurobi;
 using OneClassClassification.Data;
@@ -14,6 +15,11 @@ namespace OneClassClassification.Components
     {
         private readonly string _path;
 
+        /// <summary>
+        /// Gurobi environment shared by all models created in the process
+        /// </summary>
+        private static GRBEnv _env;
+
         /// <summary>
         /// 
         /// </summary>
@@ -29,6 +35,12 @@ namespace OneClassClassification.Components
         /// </summary>
         public GRBModel Model { get; set; }
 
+        /// <summary>
+        /// Output model in LP format, as written to <see cref="GlobalVariables.GurobiModelPath"/>. Concurrent runs
+        /// overwrite that file, so the model of this run is kept here
+        /// </summary>
+        public byte[] ModelFile { get; private set; }
+
         /// <summary>
         /// Number of constraints in output model
         /// </summary>
@@ -71,9 +83,10 @@ namespace OneClassClassification.Components
                 inputs[i] = "x" + i;
             }
 
-            // Create Gurobi Environment and model
-            var env = new GRBEnv();
-            Model = new GRBModel(env) { ModelName = "OneClassClassifier" };
+            // Create Gurobi Environment (once per process) and model
+            if ( _env == null )
+                _env = new GRBEnv();
+            Model = new GRBModel(_env) { ModelName = "OneClassClassifier" };
 
             // Add continous variables
             var continousVariables = new GRBVar[inputs.Length];
@@ -133,7 +146,30 @@ namespace OneClassClassification.Components
             Constraints = constraintCounter;
             Terms = termsCounter;
 
-            Model.Write(GlobalVariables.GurobiModelPath);
+            var metrics = GlobalVariables.StageMetrics;
+            metrics.Set("ModelCreation", "Constraints", Constraints);
+            metrics.Set("ModelCreation", "Terms", Terms);
+            metrics.Set("ModelCreation", "Binaries", binaryVariables.Length);
+
+            using ( metrics.Measure("ModelWrite") )
+            {
+                // Gurobi picks the format by the extension, the file of this run is read back before it is shared
+                var path = Path.Combine(GlobalVariables.ProjectPath, $"Gurobi_out.{Guid.NewGuid():N}.lp");
+                try
+                {
+                    Model.Write(path);
+                    ModelFile = File.ReadAllBytes(path);
+                    File.Copy(path, GlobalVariables.GurobiModelPath, true);
+                }
+                catch ( IOException ex ) when ( ModelFile != null )
+                {
+                    Console.WriteLine($"Model not copied to {GlobalVariables.GurobiModelPath}: {ex.Message}");
+                }
+                finally
+                {
+                    File.Delete(path);
+                }
+            }
         }
     }
 }
@@ -1,16 +1,17 @@
 ﻿using System;
+using System.Collections.Concurrent;
 using System.Collections.Generic;
 using System.ComponentModel;
 using System.Diagnostics;
-using System.IO;
 using System.Linq;
+using System.Threading.Tasks;
 using Accord.MachineLearning.DecisionTrees;
 using Accord.Math;
 using Accord.Math.Distances;
-using Gurobi;
 using OneClassClassification.Benchmarks;
 using OneClassClassification.Data;
 using OneClassClassification.Models;
+using OneClassClassification.Utils;
 
 namespace OneClassClassification.Components
 {
@@ -40,6 +41,37 @@ namespace OneClassClassification.Components
         public double HomogenousJaccardIndex { get; private set; }
         public double HomogenousAccuracy { get; private set; }
 
+        /// <summary>
+        /// Width of the 95% confidence interval of <see cref="HomogenousJaccardIndex"/>
+        /// </summary>
+        public double HomogenousJaccardInterval { get; private set; }
+
+        /// <summary>
+        /// Number of points the homogenous statistics were calculated from
+        /// </summary>
+        public int HomogenousSamples { get; private set; }
+
+        /// <summary>
+        /// Points the homogenous statistics were calculated from: <see cref="UniformEvaluation"/> or
+        /// <see cref="HaltonEvaluation"/>
+        /// </summary>
+        public string HomogenousEvaluation { get; private set; }
+
+        /// <summary>
+        /// Homogenous test set generated by <see cref="DataGenerator.GenerateTestData"/>
+        /// </summary>
+        public const string UniformEvaluation = "uniform";
+
+        /// <summary>
+        /// Randomized Halton sequence of the adaptive evaluation
+        /// </summary>
+        public const string HaltonEvaluation = "halton";
+
+        /// <summary>
+        /// Quantile of the standard normal distribution for 95% confidence intervals
+        /// </summary>
+        private const double Z95 = 1.959963984540054;
+
         public void CalculateStatistics( DecisionTree decisionTree, List<Constraint> synthesizedConstraints, DataGenerator dataGenerator )
         {
             var timer = new Stopwatch();
@@ -47,7 +79,10 @@ namespace OneClassClassification.Components
 
             FixedTestDataStatistics(dataGenerator.FixedDistributionTestData, decisionTree);
 
-            HomogenousTestDataStatistics(dataGenerator.HomogenousTestData, decisionTree);
+            if ( GlobalVariables.AdaptiveEvaluation )
+                AdaptiveHomogenousStatistics(dataGenerator.Benchmark, decisionTree, GlobalVariables.EvaluationWidth);
+            else
+                HomogenousTestDataStatistics(dataGenerator.HomogenousTestData, decisionTree);
 
             // Calculate Mean Angle 
             try
@@ -102,6 +137,67 @@ namespace OneClassClassification.Components
             HomogenousFalsePositive = CalculateFalsePositive(truth, predictions);
             HomogenousTrueNegative = CalculateTrueNegative(truth, predictions);
             HomogenousFalseNegative = CalculateFalseNegative(truth, predictions);
+
+            HomogenousSamples = testData.Count;
+            HomogenousEvaluation = UniformEvaluation;
+            HomogenousJaccardInterval = JaccardIntervalWidth(HomogenousTruePositive,
+                HomogenousTruePositive + HomogenousFalsePositive + HomogenousFalseNegative);
+        }
+
+        /// <summary>
+        /// Calculate homogenous statistics on batches of a randomized Halton sequence over the benchmark domain
+        /// until the confidence interval of the Jaccard index is at most <paramref name="targetWidth"/> wide
+        /// or <see cref="GlobalVariables.MaxEvaluationExamples"/> points were evaluated
+        /// </summary>
+        /// <param name="benchmark"></param>
+        /// <param name="decisionTree"></param>
+        /// <param name="targetWidth">Width of the 95% confidence interval</param>
+        private void AdaptiveHomogenousStatistics( Benchmark benchmark, DecisionTree decisionTree, double targetWidth )
+        {
+            var sequence = new HaltonSequence(GlobalVariables.Dimensions, new MersenneTwister(GlobalVariables.Seed));
+            int tp = 0, fp = 0, tn = 0, fn = 0;
+
+            do
+            {
+                var input = sequence.Next(GlobalVariables.EvaluationBatch).Select(benchmark.ScaleExample).ToArray();
+                var truth = benchmark.AssignExamples(input);
+                var predictions = Decide(decisionTree, input);
+
+                tp += CalculateTruePositive(truth, predictions);
+                fp += CalculateFalsePositive(truth, predictions);
+                tn += CalculateTrueNegative(truth, predictions);
+                fn += CalculateFalseNegative(truth, predictions);
+            } while ( JaccardIntervalWidth(tp, tp + fp + fn) > targetWidth &&
+                      tp + fp + tn + fn < GlobalVariables.MaxEvaluationExamples );
+
+            HomogenousTruePositive = tp;
+            HomogenousFalsePositive = fp;
+            HomogenousTrueNegative = tn;
+            HomogenousFalseNegative = fn;
+
+            HomogenousSamples = tp + fp + tn + fn;
+            HomogenousEvaluation = HaltonEvaluation;
+            HomogenousJaccardIndex = tp + fp + fn == 0 ? 1 : (double)tp / ( tp + fp + fn );
+            HomogenousAccuracy = (double)( tp + tn ) / HomogenousSamples;
+            HomogenousJaccardInterval = JaccardIntervalWidth(tp, tp + fp + fn);
+        }
+
+        /// <summary>
+        /// Width of the 95% Wilson interval of the Jaccard index TP / (TP + FP + FN), i.e. of the proportion of
+        /// true positives among the points classified or labelled as positive
+        /// </summary>
+        /// <param name="truePositive">Number of true positives</param>
+        /// <param name="union">Number of true positives, false positives and false negatives</param>
+        /// <returns>Width of the interval, 1 without any positive point</returns>
+        public static double JaccardIntervalWidth( int truePositive, int union )
+        {
+            if ( union == 0 )
+                return 1;
+
+            var p = (double)truePositive / union;
+            var z2 = Z95 * Z95;
+            var halfWidth = Z95 / ( 1 + z2 / union ) * Math.Sqrt(p * ( 1 - p ) / union + z2 / ( 4.0 * union * union ));
+            return 2 * halfWidth;
         }
 
         /// <summary>
@@ -118,9 +214,29 @@ namespace OneClassClassification.Components
                             .GetColumns(Vector.Range(0, GlobalVariables.Dimensions));
 
             truth = testData.Select(t => t[t.Length - 1]).ToArray();
-            predictions = decisionTree
-                .Decide(input)
-                .To<double[]>();
+            predictions = Decide(decisionTree, input);
+        }
+
+        /// <summary>
+        /// Classifies <paramref name="input"/> with <see cref="GlobalVariables.Threads"/> threads, each deciding
+        /// a contiguous range of examples
+        /// </summary>
+        /// <param name="decisionTree"></param>
+        /// <param name="input">Examples without their classes</param>
+        /// <returns>Predicted class of every example</returns>
+        public static double[] Decide( DecisionTree decisionTree, double[][] input )
+        {
+            var predictions = new double[input.Length];
+            if ( input.Length == 0 )
+                return predictions;
+
+            Parallel.ForEach(Partitioner.Create(0, input.Length),
+                GlobalVariables.ParallelOptions, range =>
+                {
+                    for ( var i = range.Item1; i < range.Item2; i++ )
+                        predictions[i] = decisionTree.Decide(input[i]);
+                });
+            return predictions;
         }
 
         /// <summary>
@@ -199,7 +315,8 @@ namespace OneClassClassification.Components
 
         /// <summary>
         /// Calculates mean angle between weight vectors or corresponding constraints 
-        /// in the synthesized and actual models with use of Gurobi
+        /// in the synthesized and actual models. Pairs of constraints are selected so that every constraint
+        /// of both models is in a pair and the sum of angles is the smallest (see <see cref="AssignmentSolver.Cover"/>)
         /// </summary>
         /// <param name="synthesizedConstraints"></param>
         /// <param name="benchmark"></param>
@@ -223,84 +340,18 @@ namespace OneClassClassification.Components
                 }
             }
 
-            // Assignment problem
-            var env = new GRBEnv("angle.log");
-            var model = new GRBModel(env)
-            {
-                ModelSense = GRB.MINIMIZE,
-                ModelName = "Mean Angle Assignment Problem"
-            };
-
-            // Binary variable for each matrix cell
-            var grbVars = new GRBVar[matrix.GetLength(0), matrix.GetLength(1)];
+            var cover = AssignmentSolver.Cover(matrix);
 
+            var sum = 0.0;
             for( var i = 0; i < matrix.GetLength(0); i++ )
             {
                 for( var j = 0; j < matrix.GetLength(1); j++ )
                 {
-                    // min 0, max 1, objective 0 (minimizing)
-                    grbVars[i, j] = model.AddVar(0.0, 1.0, 0.0, GRB.BINARY, $"b{i}.{j}");
+                    if( cover[i, j] )
+                        sum += matrix[i, j];
                 }
             }
 
-            var contraintCounter = 0;
-            var objectiveExpr = new GRBLinExpr();
-
-            // First add contraints for each row
-            for( var i = 0; i < matrix.GetLength(0); i++ )
-            {
-                var rowExpr = new GRBLinExpr();
-                for( var j = 0; j < matrix.GetLength(1); j++ )
-                {
-                    rowExpr.AddTerm(1.0, grbVars[i, j]);
-                    // Creating objective equation ONLY ONCE !
-                    objectiveExpr.AddTerm(matrix[i, j], grbVars[i, j]);
-                }
-                model.AddConstr(rowExpr, GRB.GREATER_EQUAL, 1, $"c{contraintCounter++}");
-            }
-
-            // Transpose matrix so we can perform the same operation
-            matrix = matrix.Transpose();
-
-            // Add contstaints for originally columns
-            for( var i = 0; i < matrix.GetLength(0); i++ )
-            {
-                var rowExpr = new GRBLinExpr();
-                for( var j = 0; j < matrix.GetLength(1); j++ )
-                {
-                    // Inverted indexes i and j
-                    rowExpr.AddTerm(1.0, grbVars[j, i]);
-                }
-                model.AddConstr(rowExpr, GRB.GREATER_EQUAL, 1, $"c{contraintCounter++}");
-            }
-
-            model.SetObjective(objectiveExpr);
-
-            model.Optimize();
-
-            // Back to orignal shape
-            matrix = matrix.Transpose();
-
-            // Gets indicators for each bianry variable for solution
-            var binarySolutions = new double[matrix.GetLength(0), matrix.GetLength(1)];
-
-            for( var i = 0; i < matrix.GetLength(0); i++ )
-            {
-                for( var j = 0; j < matrix.GetLength(1); j++ )
-                {
-                    binarySolutions[i, j] = grbVars[i, j].X;
-                }
-            }
-
-            // Multiplies binary indicators with coeficients
-            var sum = Matrix.ElementwiseMultiply(matrix, binarySolutions).Sum();
-            var path = Path.Combine(GlobalVariables.ProjectPath, "angle_out.lp");
-
-            model.Write(path);
-
-            model.Dispose();
-            env.Dispose();
-
             // Return mean angle
             return sum / (matrix.GetLength(0) > matrix.GetLength(1)
                 ? matrix.GetLength(0)
@@ -1,6 +1,9 @@
 ﻿using System;
+using System.Globalization;
 using System.IO;
 using System.Text;
+using System.Threading.Tasks;
+using OneClassClassification.Utils;
 
 namespace OneClassClassification.Data
 {
@@ -48,6 +51,11 @@ namespace OneClassClassification.Data
         
         public static StringBuilder ErrorLog { get; set; } = new StringBuilder();
 
+        /// <summary>
+        /// Time, memory and counters of the stages of the current experiment
+        /// </summary>
+        public static StageMetrics StageMetrics { get; set; } = new StageMetrics();
+
         /// <summary>
         /// Used to set <see cref="Accord.MachineLearning.GaussianMixtureModel"/> components
         /// </summary>
@@ -55,21 +63,115 @@ namespace OneClassClassification.Data
 
         public static string ExperimentName { get; set; }
 
+        /// <summary>
+        /// Environment variable with the folder for output files, replacing the output folder next to the program.
+        /// Runs started at the same time (Scripts/localRunner.py) need folders of their own, as the rules written
+        /// by <see cref="Components.C45BinaryClassificator"/> are read back by <see cref="Components.ModelCreator"/>
+        /// </summary>
+        public const string OutputDirectoryVariable = "OCC_OUTPUT_DIRECTORY";
+
         /// <summary>
         /// Folder for output files
         /// </summary>
-        public static readonly string ProjectPath =
-            Path.GetFullPath(Path.Combine(AppDomain.CurrentDomain.BaseDirectory, "output"));
+        public static readonly string ProjectPath = Path.GetFullPath(
+            Environment.GetEnvironmentVariable(OutputDirectoryVariable) ??
+            Path.Combine(AppDomain.CurrentDomain.BaseDirectory, "output"));
 
         /// <summary>
         /// Path to output Gurobi model
         /// </summary>
         public static readonly string GurobiModelPath = Path.Combine(ProjectPath, "Gurobi_out.lp");
 
+        /// <summary>
+        /// Environment variable which, when set, makes every node write results into its own shard database
+        /// instead of the shared one. Shards are merged back with Scripts/shards.py
+        /// </summary>
+        public const string ShardsVariable = "OCC_RESULT_SHARDS";
+
+        /// <summary>
+        /// Environment variable with the path of the results database, replacing the default testDatabase.sqlite
+        /// (e.g. a scratch database of Scripts/benchmark.py)
+        /// </summary>
+        public const string ResultsDatabaseVariable = "OCC_RESULTS_DATABASE";
+
+        /// <summary>
+        /// Environment variable with the directory of the dataset cache (see <see cref="Components.DatasetCache"/>),
+        /// usually on shared scratch storage. The cache is disabled when it is not set
+        /// </summary>
+        public const string DatasetCacheVariable = "OCC_DATASET_CACHE";
+
+        /// <summary>
+        /// Environment variable with the size limit of the dataset cache in megabytes
+        /// </summary>
+        public const string DatasetCacheSizeVariable = "OCC_DATASET_CACHE_MB";
+
+        /// <summary>
+        /// Environment variable naming the generator of cached data sets. Data sets of any other generator than
+        /// <see cref="Components.DatasetCache.ProgramGenerator"/> (e.g. "numpy" for Scripts/dataGeneration.py)
+        /// are only loaded from the cache, never generated by the program
+        /// </summary>
+        public const string DataGeneratorVariable = "OCC_DATA_GENERATOR";
+
+        /// <summary>
+        /// Environment variable naming the learner of decision trees. With "numpy" the tree is loaded from the
+        /// dataset cache, where Scripts/c45.py stored it, instead of being learned by
+        /// <see cref="Accord.MachineLearning.DecisionTrees.Learning.C45Learning"/>
+        /// </summary>
+        public const string TreeLearnerVariable = "OCC_TREE_LEARNER";
+
+        /// <summary>
+        /// Environment variable with the directory of the artifact store (see <see cref="Components.ArtifactStore"/>)
+        /// keeping the tree, rules, constraints and model of every run. Nothing is kept when it is not set
+        /// </summary>
+        public const string ArtifactsVariable = "OCC_ARTIFACTS";
+
+        /// <summary>
+        /// Environment variable with the number of threads a run may use, usually the CPUs of its job
+        /// (SLURM_CPUS_PER_TASK). A single thread is used when it is not set
+        /// </summary>
+        public const string ThreadsVariable = "OCC_THREADS";
+
+        /// <summary>
+        /// Threads used by the mixture fit, the rejection sampling, the C4.5 learning and the test set evaluation
+        /// </summary>
+        public static int Threads { get; set; } = ThreadBudget(Environment.GetEnvironmentVariable(ThreadsVariable));
+
+        /// <summary>
+        /// Options limiting parallel loops to <see cref="Threads"/>
+        /// </summary>
+        public static ParallelOptions ParallelOptions => new ParallelOptions { MaxDegreeOfParallelism = Threads };
+
+        /// <summary>
+        /// Returns the number of threads given by <paramref name="value"/>, 1 when it is not a positive number
+        /// </summary>
+        /// <param name="value">Value of <see cref="ThreadsVariable"/></param>
+        public static int ThreadBudget( string value )
+        {
+            int threads;
+            return int.TryParse(value, out threads) && threads > 0 ? threads : 1;
+        }
+
         /// <summary>
         /// Path to database
         /// </summary>
-        public static string Dbpath = Path.GetFullPath(Path.Combine(ProjectPath, @"../testDatabase.sqlite"));
+        public static string Dbpath = ResultDatabasePath(Path.GetFullPath(
+            Environment.GetEnvironmentVariable(ResultsDatabaseVariable) ??
+            Path.Combine(AppDomain.CurrentDomain.BaseDirectory, "testDatabase.sqlite")));
+
+        /// <summary>
+        /// Returns <paramref name="databasePath"/>, or the shard of this node (database.shards/node.sqlite)
+        /// when <see cref="ShardsVariable"/> is set
+        /// </summary>
+        /// <param name="databasePath">Shared results database</param>
+        private static string ResultDatabasePath( string databasePath )
+        {
+            if ( string.IsNullOrEmpty(Environment.GetEnvironmentVariable(ShardsVariable)) )
+                return databasePath;
+
+            var shardDirectory = Path.ChangeExtension(databasePath, ".shards");
+            Directory.CreateDirectory(shardDirectory);
+            return Path.Combine(shardDirectory, $"{Environment.MachineName}.sqlite");
+        }
 
         /// <summary>
         /// Variable used in MILP model as M - big constant
@@ -85,5 +187,46 @@ namespace OneClassClassification.Data
         /// Feasible and infeasible amount separately. Total is 2 * TestExamples
         /// </summary>
         public static readonly int TestExamples = 50000;
+
+        /// <summary>
+        /// Environment variable with the target width of the 95% confidence interval of the homogenous Jaccard index.
+        /// When set, the homogenous statistics are evaluated on a randomized Halton sequence over the benchmark domain,
+        /// in batches of <see cref="EvaluationBatch"/> points, until the interval is narrow enough
+        /// </summary>
+        public const string EvaluationWidthVariable = "OCC_EVALUATION_CI_WIDTH";
+
+        /// <summary>
+        /// Target width of the adaptive evaluation, 0 when the homogenous statistics are calculated on the generated
+        /// homogenous test set
+        /// </summary>
+        public static double EvaluationWidth { get; set; } =
+            EvaluationTarget(Environment.GetEnvironmentVariable(EvaluationWidthVariable));
+
+        /// <summary>
+        /// Whether the homogenous statistics are evaluated on a Halton sequence instead of the generated test set
+        /// </summary>
+        public static bool AdaptiveEvaluation => EvaluationWidth > 0;
+
+        /// <summary>
+        /// Returns the interval width given by <paramref name="value"/>, 0 when it is not a positive number
+        /// </summary>
+        /// <param name="value">Value of <see cref="EvaluationWidthVariable"/></param>
+        public static double EvaluationTarget( string value )
+        {
+            double width;
+            return double.TryParse(value, NumberStyles.Float, CultureInfo.InvariantCulture, out width) && width > 0
+                ? width
+                : 0;
+        }
+
+        /// <summary>
+        /// Points evaluated at once in the adaptive evaluation
+        /// </summary>
+        public static readonly int EvaluationBatch = 4096;
+
+        /// <summary>
+        /// Points after which the adaptive evaluation stops regardless of the interval width
+        /// </summary>
+        public static readonly int MaxEvaluationExamples = 20 * TestExamples;
     }
 }
@@ -1,6 +1,8 @@
 ﻿using System;
 using System.Collections.Generic;
 using System.Diagnostics;
+using System.IO;
+using System.Linq;
 using System.Text;
 using System.Threading;
 using OneClassClassification.Components;
@@ -18,12 +20,82 @@ namespace OneClassClassification
 
             Thread.CurrentThread.CurrentCulture = customCulture;
 
+            if ( args.Length == 4 && args[0] == "--manifest" )
+                return RunManifest(args[1], int.Parse(args[2]), int.Parse(args[3]));
+
             if ( args.Length != 9 )
             {
                 DisplayUsage();
                 Console.ReadKey();
                 return -1;
             }
+
+            return RunExperiment(args);
+        }
+
+        /// <summary>
+        /// Runs <paramref name="count"/> experiments from a manifest file in one process, starting with the line
+        /// <paramref name="first"/> (0 based). Every manifest line holds the 9 program arguments separated by tabs.
+        /// </summary>
+        /// <param name="manifestPath">Manifest written by Scripts/main.py</param>
+        /// <param name="first">Index of the first line to run</param>
+        /// <param name="count">Number of lines to run</param>
+        /// <returns>0 if all experiments succeeded, -1 otherwise</returns>
+        private static int RunManifest( string manifestPath, int first, int count )
+        {
+            var result = 0;
+            var index = first;
+
+            foreach ( var line in File.ReadLines(manifestPath).Skip(first).Take(count) )
+            {
+                var lineIndex = index++;
+                if ( string.IsNullOrWhiteSpace(line) ) continue;
+
+                // State left by the previous experiment
+                GlobalVariables.ErrorLog = new StringBuilder();
+                GlobalVariables.StageMetrics = new StageMetrics();
+
+                var fields = line.Split('\t');
+                if ( fields.Length != 9 )
+                {
+                    // Without its parameters the failure cannot be recorded in the database
+                    Console.WriteLine($"Manifest line {lineIndex} has {fields.Length} fields instead of 9, skipped");
+                    result = -1;
+                    continue;
+                }
+
+                // A failure of one experiment, e.g. in Gurobi or SQLite, must not drop the remaining lines
+                try
+                {
+                    if ( RunExperiment(fields) != 0 )
+                        result = -1;
+                }
+                catch ( Exception ex )
+                {
+                    Console.WriteLine($"Manifest line {lineIndex} failed: {ex}");
+                    result = -1;
+                    try
+                    {
+                        DatabaseUtils.SaveErrorToDatabase(ex.Message);
+                    }
+                    catch ( Exception saveEx )
+                    {
+                        Console.WriteLine($"Error of manifest line {lineIndex} not saved: {saveEx.Message}");
+                    }
+                }
+            }
+
+            return result;
+        }
+
+        /// <summary>
+        /// Runs a single experiment described by the 9 program arguments
+        /// </summary>
+        /// <param name="args">Program arguments</param>
+        /// <returns>0 on success, -1 on error</returns>
+        private static int RunExperiment( string[] args )
+        {
+            ModelCreator modelCreator = null;
             try
             {
                 PrepareParameters(args);
@@ -32,26 +104,54 @@ namespace OneClassClassification
                 if (DatabaseUtils.CheckIfExists(args))
                 {
                     Console.WriteLine("Experiment already exists in database!");
+                    DatabaseUtils.RecordLedgerState("done");
                     return 0;
                 }
 
+                DatabaseUtils.RecordLedgerState("running");
+
                 var sw = new Stopwatch();
                 sw.Start();
 
                 Console.WriteLine("----- Generating data ------");
+                var metrics = GlobalVariables.StageMetrics;
                 var dataGenerator = new DataGenerator();
-                dataGenerator.GenerateTrainingData();
-                dataGenerator.GenerateTestData();
+                bool cached;
+                using ( metrics.Measure("DatasetCacheLoad") )
+                    cached = DatasetCache.TryLoad(dataGenerator);
+
+                if ( cached )
+                {
+                    Console.WriteLine("Data loaded from dataset cache");
+                }
+                else if ( DatasetCache.Generator != DatasetCache.ProgramGenerator )
+                {
+                    throw new ArgumentException(
+                        $"Data set of generator {DatasetCache.Generator} not found in dataset cache");
+                }
+                else
+                {
+                    dataGenerator.GenerateTrainingData();
+                    // Entries of the dataset cache always hold the homogenous test data, for runs without the
+                    // adaptive evaluation
+                    using ( metrics.Measure("TestData") )
+                        dataGenerator.GenerateTestData(!GlobalVariables.AdaptiveEvaluation ||
+                                                       DatasetCache.CacheDirectory != null);
+                    using ( metrics.Measure("DatasetCacheStore") )
+                        DatasetCache.Store(dataGenerator);
+                }
 
                 Console.WriteLine("----- Classification data ------");
 
                 var dataClassificator = new C45BinaryClassificator(dataGenerator.TrainingData.ToArray());
-                dataClassificator.Learn();
+                using ( metrics.Measure("Learning") )
+                    dataClassificator.Learn();
 
                 Console.WriteLine("----- Creating model ------");
 
-                var modelCreator = new ModelCreator(dataClassificator.OutputPath);
-                modelCreator.Create();
+                modelCreator = new ModelCreator(dataClassificator.OutputPath);
+                using ( metrics.Measure("ModelCreation") )
+                    modelCreator.Create();
 
                 sw.Stop();
 
@@ -59,9 +159,11 @@ namespace OneClassClassification
                 
                 // Calculating jaccard index for training data
                 var statistics = new StatisticsCalculator();
-                statistics.CalculateStatistics(dataClassificator.DecisionTree,
-                    modelCreator.UniqueConstraints,
-                    dataGenerator);
+                using ( metrics.Measure("Statistics") )
+                    statistics.CalculateStatistics(dataClassificator.DecisionTree,
+                        modelCreator.UniqueConstraints,
+                        dataGenerator);
+                metrics.Set("Statistics", "Samples", statistics.HomogenousSamples);
 
                 // Saving data to database
                 DatabaseUtils.SaveToDatabase(dataClassificator, modelCreator,
@@ -82,6 +184,11 @@ namespace OneClassClassification
                 Console.WriteLine(message);
                 return -1;
             }
+            finally
+            {
+                // Also after a failed run, which would otherwise keep the Gurobi model of every failed line
+                modelCreator?.Model?.Dispose();
+            }
 
             return 0;
         }
@@ -106,6 +213,7 @@ namespace OneClassClassification
             sb.Append("[Tree max height parameter] [Random number generator seed] ");
             sb.Append("[BenchmarkName ={ cricle,cube}] [Components] [Experiment name]\n");
             sb.AppendLine("example: OneClassClassification.exe 100 5 0.5 100 100 25 circle 20 \"Simple experiment\"");
+            sb.AppendLine("Manifest pattern: OneClassClassification.exe --manifest [manifest file] [first line] [lines count]");
             Console.Write(sb.ToString());
             Console.WriteLine("Press any key ... ");
         }
@@ -0,0 +1,164 @@
+﻿using System;
+
+namespace OneClassClassification.Utils
+{
+    /// <summary>
+    /// Hungarian algorithm for rectangular assignment problems and the minimum cost cover of a cost matrix
+    /// built on it
+    /// </summary>
+    public static class AssignmentSolver
+    {
+        /// <summary>
+        /// Assigns every row to a different column with the smallest total cost (shortest augmenting paths
+        /// with row and column potentials), in O(rows^2 * columns)
+        /// </summary>
+        /// <param name="cost">Matrix with no more rows than columns</param>
+        /// <returns>Column assigned to every row</returns>
+        public static int[] Assign( double[,] cost )
+        {
+            var rows = cost.GetLength(0);
+            var columns = cost.GetLength(1);
+            if ( rows > columns )
+                throw new ArgumentException("Assignment needs at least as many columns as rows");
+
+            // Index 0 is a virtual column the row being added starts from
+            var u = new double[rows + 1];
+            var v = new double[columns + 1];
+            var owner = new int[columns + 1];
+            var way = new int[columns + 1];
+
+            for ( var i = 1; i <= rows; i++ )
+            {
+                owner[0] = i;
+                var current = 0;
+                var minimum = new double[columns + 1];
+                var used = new bool[columns + 1];
+                for ( var j = 0; j <= columns; j++ )
+                    minimum[j] = double.PositiveInfinity;
+
+                do
+                {
+                    used[current] = true;
+                    var row = owner[current];
+                    var delta = double.PositiveInfinity;
+                    var next = 0;
+                    for ( var j = 1; j <= columns; j++ )
+                    {
+                        if ( used[j] )
+                            continue;
+                        var reduced = cost[row - 1, j - 1] - u[row] - v[j];
+                        if ( reduced < minimum[j] )
+                        {
+                            minimum[j] = reduced;
+                            way[j] = current;
+                        }
+                        if ( minimum[j] < delta )
+                        {
+                            delta = minimum[j];
+                            next = j;
+                        }
+                    }
+
+                    for ( var j = 0; j <= columns; j++ )
+                    {
+                        if ( used[j] )
+                        {
+                            u[owner[j]] += delta;
+                            v[j] -= delta;
+                        }
+                        else
+                            minimum[j] -= delta;
+                    }
+                    current = next;
+                } while ( owner[current] != 0 );
+
+                // Flips the augmenting path
+                do
+                {
+                    var previous = way[current];
+                    owner[current] = owner[previous];
+                    current = previous;
+                } while ( current != 0 );
+            }
+
+            var assignment = new int[rows];
+            for ( var j = 1; j <= columns; j++ )
+            {
+                if ( owner[j] != 0 )
+                    assignment[owner[j] - 1] = j - 1;
+            }
+            return assignment;
+        }
+
+        /// <summary>
+        /// Selects cells of a nonnegative cost matrix with the smallest total cost such that every row and every
+        /// column holds a selected cell (minimum cost edge cover of the complete bipartite graph).
+        /// Every row and column is covered either by a cell of a matching or by its cheapest cell; the matching
+        /// maximizes the savings of cells over the cheapest cells of their row and column
+        /// </summary>
+        /// <param name="cost">Nonnegative costs</param>
+        /// <returns>Indicators of the selected cells, none when the matrix has no cells (e.g. a tree without
+        /// synthesized constraints, whose mean angle is then 0)</returns>
+        public static bool[,] Cover( double[,] cost )
+        {
+            var rows = cost.GetLength(0);
+            var columns = cost.GetLength(1);
+            var cover = new bool[rows, columns];
+            if ( rows == 0 || columns == 0 )
+                return cover;
+
+            var rowMinimum = new int[rows];
+            var columnMinimum = new int[columns];
+            for ( var i = 0; i < rows; i++ )
+            {
+                for ( var j = 0; j < columns; j++ )
+                {
+                    if ( cost[i, j] < cost[i, rowMinimum[i]] )
+                        rowMinimum[i] = j;
+                    if ( cost[i, j] < cost[columnMinimum[j], j] )
+                        columnMinimum[j] = i;
+                }
+            }
+
+            // Negative savings, oriented so that rows are not more than columns
+            var transposed = rows > columns;
+            var savings = transposed ? new double[columns, rows] : new double[rows, columns];
+            for ( var i = 0; i < rows; i++ )
+            {
+                for ( var j = 0; j < columns; j++ )
+                {
+                    var saving = Math.Max(0, cost[i, rowMinimum[i]] + cost[columnMinimum[j], j] - cost[i, j]);
+                    if ( transposed )
+                        savings[j, i] = -saving;
+                    else
+                        savings[i, j] = -saving;
+                }
+            }
+
+            var rowCovered = new bool[rows];
+            var columnCovered = new bool[columns];
+            var assignment = Assign(savings);
+            for ( var k = 0; k < assignment.Length; k++ )
+            {
+                var i = transposed ? assignment[k] : k;
+                var j = transposed ? k : assignment[k];
+                // Cells without savings are no better than the cheapest cells
+                if ( savings[k, assignment[k]] >= 0 )
+                    continue;
+                cover[i, j] = rowCovered[i] = columnCovered[j] = true;
+            }
+
+            for ( var i = 0; i < rows; i++ )
+            {
+                if ( !rowCovered[i] )
+                    cover[i, rowMinimum[i]] = columnCovered[rowMinimum[i]] = true;
+            }
+            for ( var j = 0; j < columns; j++ )
+            {
+                if ( !columnCovered[j] )
+                    cover[columnMinimum[j], j] = true;
+            }
+            return cover;
+        }
+    }
+}
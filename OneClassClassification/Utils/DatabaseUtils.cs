@@ -1,4 +1,5 @@
 ﻿using System;
+using System.Collections.Generic;
 using System.IO;
 using System.Text;
 using ExperimentDatabase;
@@ -17,7 +18,7 @@ namespace OneClassClassification.Utils
         /// Saves experiments data to database. Data is gathered from different program's classes given as parameters
         /// </summary>
         /// <param name="classificator">Instance of <see cref="C45BinaryClassificator"/>class 
-        /// (Used only for rules saving which is commented)</param>
+        /// (Used only for the artifact store)</param>
         /// <param name="model"></param>
         /// <param name="statistics"></param>
         /// <param name="data"></param>
@@ -81,6 +82,10 @@ namespace OneClassClassification.Utils
             experiment["HTN"] = statistics.HomogenousTrueNegative;
             experiment["HFN"] = statistics.HomogenousFalseNegative;
 
+            experiment["HJaccardCI"] = statistics.HomogenousJaccardInterval;
+            experiment["HSamples"] = statistics.HomogenousSamples;
+            experiment["HEvaluation"] = statistics.HomogenousEvaluation;
+
             experiment["Total"] = statistics.DataLength;
 
             experiment["MeanAngle"] = statistics.MeanAngle;
@@ -94,6 +99,146 @@ namespace OneClassClassification.Utils
 
             experiment.Dispose();
             db.Dispose();
+
+            SaveStageMetrics(GlobalVariables.StageMetrics);
+            SaveArtifacts(ArtifactStore.Store(classificator, model));
+
+            if ( GlobalVariables.ErrorLog.Length == 0 )
+                RecordLedgerState("done");
+            else
+                RecordLedgerState("error", GlobalVariables.ErrorLog.ToString());
+        }
+
+        /// <summary>
+        /// Saves <paramref name="metrics"/> into the stage_metrics table, one row per stage and metric, for the latest
+        /// experiment with the parameters of the current run. Scripts/profiler.py reports them
+        /// </summary>
+        /// <param name="metrics">Metrics of the experiment just saved</param>
+        public static void SaveStageMetrics( StageMetrics metrics )
+        {
+            using (var conn = new SqliteConnection($"Data Source={GlobalVariables.Dbpath}"))
+            {
+                conn.Open();
+
+                using (var transaction = conn.BeginTransaction())
+                {
+                    using (var create = new SqliteCommand("CREATE TABLE IF NOT EXISTS stage_metrics(" +
+                                                          "ExperimentId INTEGER NOT NULL, Stage TEXT NOT NULL, " +
+                                                          "Metric TEXT NOT NULL, Value REAL, " +
+                                                          "PRIMARY KEY (ExperimentId, Stage, Metric)) WITHOUT ROWID",
+                        conn, transaction))
+                    {
+                        create.ExecuteNonQuery();
+                    }
+
+                    var query = "INSERT OR REPLACE INTO stage_metrics (ExperimentId, Stage, Metric, Value) " +
+                                $"SELECT id, @Stage, @Metric, @Value FROM experiments WHERE {RunParametersFilter} " +
+                                "ORDER BY id DESC LIMIT 1";
+
+                    using (var command = new SqliteCommand(query, conn, transaction))
+                    {
+                        AddExperimentParameters(command);
+                        var stage = command.Parameters.Add("@Stage", SqliteType.Text);
+                        var metric = command.Parameters.Add("@Metric", SqliteType.Text);
+                        var value = command.Parameters.Add("@Value", SqliteType.Real);
+
+                        foreach (var pair in metrics.Stages)
+                        {
+                            foreach (var entry in pair.Value)
+                            {
+                                stage.Value = pair.Key;
+                                metric.Value = entry.Key;
+                                value.Value = entry.Value;
+                                command.ExecuteNonQuery();
+                            }
+                        }
+                    }
+
+                    transaction.Commit();
+                }
+            }
+        }
+
+        /// <summary>
+        /// Saves the hashes of the artifacts of the current run into the artifacts table, for the latest experiment
+        /// with its parameters. Scripts/artifacts.py loads them from the <see cref="ArtifactStore"/>
+        /// </summary>
+        /// <param name="artifacts">Hash and size of every kind of artifact, from <see cref="ArtifactStore.Store"/></param>
+        public static void SaveArtifacts( Dictionary<string, Tuple<string, long>> artifacts )
+        {
+            if ( artifacts.Count == 0 )
+                return;
+
+            using (var conn = new SqliteConnection($"Data Source={GlobalVariables.Dbpath}"))
+            {
+                conn.Open();
+
+                using (var transaction = conn.BeginTransaction())
+                {
+                    using (var create = new SqliteCommand("CREATE TABLE IF NOT EXISTS artifacts(" +
+                                                          "ExperimentId INTEGER NOT NULL, Kind TEXT NOT NULL, " +
+                                                          "Hash TEXT NOT NULL, Size INTEGER NOT NULL, " +
+                                                          "PRIMARY KEY (ExperimentId, Kind)) WITHOUT ROWID",
+                        conn, transaction))
+                    {
+                        create.ExecuteNonQuery();
+                    }
+
+                    var query = "INSERT OR REPLACE INTO artifacts (ExperimentId, Kind, Hash, Size) " +
+                                $"SELECT id, @Kind, @Hash, @Size FROM experiments WHERE {RunParametersFilter} " +
+                                "ORDER BY id DESC LIMIT 1";
+
+                    using (var command = new SqliteCommand(query, conn, transaction))
+                    {
+                        AddExperimentParameters(command);
+                        var kind = command.Parameters.Add("@Kind", SqliteType.Text);
+                        var hash = command.Parameters.Add("@Hash", SqliteType.Text);
+                        var size = command.Parameters.Add("@Size", SqliteType.Integer);
+
+                        foreach (var artifact in artifacts)
+                        {
+                            kind.Value = artifact.Key;
+                            hash.Value = artifact.Value.Item1;
+                            size.Value = artifact.Value.Item2;
+                            command.ExecuteNonQuery();
+                        }
+                    }
+
+                    transaction.Commit();
+                }
+            }
+        }
+
+        /// <summary>
+        /// Columns identifying a run in the experiments table and in the job ledger
+        /// </summary>
+        private const string RunParameterColumns =
+            "FeasibleExamples, Dimensions, K, [Join], MaxHeight, Seed, Benchmark, Components";
+
+        /// <summary>
+        /// Values of <see cref="RunParameterColumns"/> for the current run, bound by <see cref="AddExperimentParameters"/>
+        /// </summary>
+        private const string RunParameterValues =
+            "@FeasibleExamples, @Dimensions, @K, @Join, @MaxHeight, @Seed, @Benchmark, @Components";
+
+        /// <summary>
+        /// Condition on the parameters of the current run, bound by <see cref="AddExperimentParameters"/>
+        /// </summary>
+        private const string RunParametersFilter =
+            "FeasibleExamples = @FeasibleExamples AND Dimensions = @Dimensions AND K = @K AND " +
+            "[Join] = @Join AND MaxHeight = @MaxHeight AND Seed = @Seed AND " +
+            "Benchmark = @Benchmark AND Components = @Components";
+
+        private static void AddExperimentParameters( SqliteCommand command )
+        {
+            command.Parameters.AddWithValue("@FeasibleExamples", GlobalVariables.FeasibleExamplesCount);
+            command.Parameters.AddWithValue("@Dimensions", GlobalVariables.Dimensions);
+            command.Parameters.AddWithValue("@K", GlobalVariables.K);
+            command.Parameters.AddWithValue("@Join", GlobalVariables.Join);
+            command.Parameters.AddWithValue("@MaxHeight", GlobalVariables.MaxHeight);
+            command.Parameters.AddWithValue("@Seed", GlobalVariables.Seed);
+            command.Parameters.AddWithValue("@Benchmark", GlobalVariables.BenchmarkName);
+            command.Parameters.AddWithValue("@Components", GlobalVariables.Components);
         }
 
         // In case of an error save run parameters and errors into database
@@ -119,6 +264,43 @@ namespace OneClassClassification.Utils
 
             experiment.Dispose();
             db.Dispose();
+
+            RecordLedgerState("error", GlobalVariables.ErrorLog.ToString());
+        }
+
+        /// <summary>
+        /// Sets state of the current run in the job ledger kept by Scripts/ledger.py. Does nothing when the
+        /// database has no ledger.
+        /// </summary>
+        /// <param name="state">One of: pending, running, done, error</param>
+        /// <param name="error">Error text of a failed run</param>
+        public static void RecordLedgerState( string state, string error = null )
+        {
+            if ( !File.Exists(GlobalVariables.Dbpath) )
+                return;
+
+            using (var conn = new SqliteConnection($"Data Source={GlobalVariables.Dbpath}"))
+            {
+                conn.Open();
+
+                using (var check = new SqliteCommand("SELECT COUNT(*) FROM sqlite_master WHERE name = 'job_ledger'", conn))
+                {
+                    if ( Convert.ToInt64(check.ExecuteScalar()) == 0 ) return;
+                }
+
+                var query = $"INSERT OR IGNORE INTO job_ledger ({RunParameterColumns}, State) " +
+                            $"VALUES ({RunParameterValues}, @State); " +
+                            "UPDATE job_ledger SET State = @State, Error = @Error, Updated = CURRENT_TIMESTAMP " +
+                            $"WHERE {RunParametersFilter}";
+
+                using (var command = new SqliteCommand(query, conn))
+                {
+                    AddExperimentParameters(command);
+                    command.Parameters.AddWithValue("@State", state);
+                    command.Parameters.AddWithValue("@Error", (object)error ?? DBNull.Value);
+                    command.ExecuteNonQuery();
+                }
+            }
         }
 
         /// <summary>
@@ -0,0 +1,85 @@
+﻿using System;
+using System.Collections.Generic;
+
+namespace OneClassClassification.Utils
+{
+    /// <summary>
+    /// Randomized Halton sequence: radical inverses in the first prime bases, shifted modulo 1 by a random vector
+    /// (Cranley-Patterson rotation), so that points are low discrepancy but still depend on the seed
+    /// </summary>
+    public class HaltonSequence
+    {
+        private readonly int[] _bases;
+        private readonly double[] _shift;
+        private long _index;
+
+        /// <summary>
+        /// Initializes sequence of points of <paramref name="dimensions"/> coordinates
+        /// </summary>
+        /// <param name="dimensions">Number of coordinates</param>
+        /// <param name="rng">Source of the random shift</param>
+        public HaltonSequence( int dimensions, Random rng )
+        {
+            _bases = Primes(dimensions);
+            _shift = new double[dimensions];
+            for ( var i = 0; i < dimensions; i++ )
+                _shift[i] = rng.NextDouble();
+
+            // Skips the origin, which every base maps to 0
+            _index = 1;
+        }
+
+        /// <summary>
+        /// Returns the next point of the unit cube
+        /// </summary>
+        public double[] Next()
+        {
+            var point = new double[_bases.Length];
+            for ( var i = 0; i < point.Length; i++ )
+            {
+                var value = RadicalInverse(_index, _bases[i]) + _shift[i];
+                point[i] = value >= 1 ? value - 1 : value;
+            }
+            _index++;
+            return point;
+        }
+
+        /// <summary>
+        /// Returns <paramref name="count"/> next points
+        /// </summary>
+        public double[][] Next( int count )
+        {
+            var points = new double[count][];
+            for ( var i = 0; i < count; i++ )
+                points[i] = Next();
+            return points;
+        }
+
+        /// <summary>
+        /// Mirrors digits of <paramref name="index"/> in base <paramref name="b"/> around the decimal point
+        /// </summary>
+        private static double RadicalInverse( long index, int b )
+        {
+            var result = 0.0;
+            var fraction = 1.0 / b;
+            while ( index > 0 )
+            {
+                result += ( index % b ) * fraction;
+                index /= b;
+                fraction /= b;
+            }
+            return result;
+        }
+
+        private static int[] Primes( int count )
+        {
+            var primes = new List<int>();
+            for ( var candidate = 2; primes.Count < count; candidate++ )
+            {
+                if ( primes.TrueForAll(p => candidate % p != 0) )
+                    primes.Add(candidate);
+            }
+            return primes.ToArray();
+        }
+    }
+}
@@ -0,0 +1,126 @@
+﻿using System;
+using System.IO;
+using System.IO.MemoryMappedFiles;
+using System.Text;
+using System.Text.RegularExpressions;
+
+namespace OneClassClassification.Utils
+{
+    /// <summary>
+    /// Reads and writes two dimensional arrays of doubles in the NumPy .npy format (version 1.0, little endian),
+    /// so that files can be loaded with numpy.load as well
+    /// </summary>
+    public static class NpyFile
+    {
+        private static readonly byte[] Magic = { 0x93, (byte)'N', (byte)'U', (byte)'M', (byte)'P', (byte)'Y' };
+
+        /// <summary>
+        /// Header alignment of the data, as written by NumPy
+        /// </summary>
+        private const int Alignment = 64;
+
+        private static readonly Regex HeaderPattern = new Regex(
+            @"'descr':\s*'<f8',\s*'fortran_order':\s*False,\s*'shape':\s*\((\d+),\s*(\d+)\)");
+
+        /// <summary>
+        /// Writes <paramref name="rows"/> of equal length as a rows x columns array
+        /// </summary>
+        /// <param name="path">Output file</param>
+        /// <param name="rows">Array rows</param>
+        /// <param name="columns">Length of every row, needed when there are no rows</param>
+        public static void Write( string path, double[][] rows, int columns )
+        {
+            using ( var file = File.Create(path) )
+                Write(file, rows, columns);
+        }
+
+        /// <summary>
+        /// Writes <paramref name="rows"/> of equal length as a rows x columns array into <paramref name="stream"/>,
+        /// which is left open
+        /// </summary>
+        public static void Write( Stream stream, double[][] rows, int columns )
+        {
+            var header = $"{{'descr': '<f8', 'fortran_order': False, 'shape': ({rows.Length}, {columns}), }}";
+            var padding = Alignment - ( Magic.Length + 4 + header.Length + 1 ) % Alignment;
+            header = header + new string(' ', padding % Alignment) + "\n";
+
+            using ( var writer = new BinaryWriter(stream, Encoding.ASCII, true) )
+            {
+                writer.Write(Magic);
+                writer.Write((byte)1);
+                writer.Write((byte)0);
+                writer.Write((ushort)header.Length);
+                writer.Write(Encoding.ASCII.GetBytes(header));
+
+                var buffer = new byte[columns * sizeof(double)];
+                foreach ( var row in rows )
+                {
+                    if ( row.Length != columns )
+                        throw new ArgumentException($"Row of length {row.Length} written as {columns} columns");
+                    Buffer.BlockCopy(row, 0, buffer, 0, buffer.Length);
+                    writer.Write(buffer);
+                }
+            }
+        }
+
+        /// <summary>
+        /// Writes a two dimensional array
+        /// </summary>
+        public static void Write( string path, double[,] array )
+        {
+            var rows = new double[array.GetLength(0)][];
+            for ( var i = 0; i < rows.Length; i++ )
+            {
+                rows[i] = new double[array.GetLength(1)];
+                for ( var j = 0; j < rows[i].Length; j++ )
+                    rows[i][j] = array[i, j];
+            }
+            Write(path, rows, array.GetLength(1));
+        }
+
+        /// <summary>
+        /// Reads an array written by <see cref="Write(string,double[][],int)"/> through a read only memory mapped view,
+        /// copying every row straight from the page cache
+        /// </summary>
+        /// <param name="path">Input file</param>
+        /// <returns>Array rows</returns>
+        public static double[][] Read( string path )
+        {
+            using ( var file = MemoryMappedFile.CreateFromFile(path, FileMode.Open, null, 0, MemoryMappedFileAccess.Read) )
+            using ( var view = file.CreateViewAccessor(0, 0, MemoryMappedFileAccess.Read) )
+            {
+                var prefix = new byte[Magic.Length + 4];
+                view.ReadArray(0, prefix, 0, prefix.Length);
+                for ( var i = 0; i < Magic.Length; i++ )
+                {
+                    if ( prefix[i] != Magic[i] )
+                        throw new InvalidDataException($"{path} is not a .npy file");
+                }
+                if ( prefix[Magic.Length] != 1 )
+                    throw new InvalidDataException($"Unsupported .npy version in {path}");
+
+                var headerLength = prefix[Magic.Length + 2] | prefix[Magic.Length + 3] << 8;
+                var header = new byte[headerLength];
+                view.ReadArray(prefix.Length, header, 0, headerLength);
+
+                var shape = HeaderPattern.Match(Encoding.ASCII.GetString(header));
+                if ( !shape.Success )
+                    throw new InvalidDataException($"{path} does not hold a two dimensional array of doubles");
+
+                var rows = new double[int.Parse(shape.Groups[1].Value)][];
+                var columns = int.Parse(shape.Groups[2].Value);
+                long position = prefix.Length + headerLength;
+                if ( position + (long)rows.Length * columns * sizeof(double) > view.Capacity )
+                    throw new InvalidDataException($"{path} is truncated");
+
+                for ( var i = 0; i < rows.Length; i++ )
+                {
+                    rows[i] = new double[columns];
+                    view.ReadArray(position, rows[i], 0, columns);
+                    position += columns * sizeof(double);
+                }
+                return rows;
+            }
+        }
+    }
+}
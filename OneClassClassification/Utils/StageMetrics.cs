@@ -0,0 +1,95 @@
+﻿using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+
+namespace OneClassClassification.Utils
+{
+    /// <summary>
+    /// Wall and CPU time, resident memory and counters of the stages of one experiment, saved into the
+    /// stage_metrics table by <see cref="DatabaseUtils.SaveStageMetrics"/>
+    /// </summary>
+    public class StageMetrics
+    {
+        /// <summary>
+        /// Metrics of every stage in the order the stages were first measured, by metric name
+        /// </summary>
+        public List<KeyValuePair<string, Dictionary<string, double>>> Stages { get; } =
+            new List<KeyValuePair<string, Dictionary<string, double>>>();
+
+        /// <summary>
+        /// Starts measuring <paramref name="stage"/>; the measurement ends when the returned object is disposed.
+        /// Time of a stage measured more than once is summed
+        /// </summary>
+        /// <param name="stage">Name of the stage</param>
+        public IDisposable Measure( string stage )
+        {
+            return new Measurement(this, stage);
+        }
+
+        /// <summary>
+        /// Adds <paramref name="value"/> to counter <paramref name="counter"/> of <paramref name="stage"/>
+        /// </summary>
+        public void Count( string stage, string counter, double value )
+        {
+            var metrics = Metrics(stage);
+            double current;
+            metrics.TryGetValue(counter, out current);
+            metrics[counter] = current + value;
+        }
+
+        /// <summary>
+        /// Sets <paramref name="counter"/> of <paramref name="stage"/> to <paramref name="value"/>
+        /// </summary>
+        public void Set( string stage, string counter, double value )
+        {
+            Metrics(stage)[counter] = value;
+        }
+
+        private Dictionary<string, double> Metrics( string stage )
+        {
+            foreach ( var pair in Stages )
+            {
+                if ( pair.Key == stage )
+                    return pair.Value;
+            }
+
+            var metrics = new Dictionary<string, double>();
+            Stages.Add(new KeyValuePair<string, Dictionary<string, double>>(stage, metrics));
+            return metrics;
+        }
+
+        private sealed class Measurement : IDisposable
+        {
+            private readonly StageMetrics _metrics;
+            private readonly string _stage;
+            private readonly Stopwatch _wall = Stopwatch.StartNew();
+            private readonly TimeSpan _cpu;
+            private bool _disposed;
+
+            public Measurement( StageMetrics metrics, string stage )
+            {
+                _metrics = metrics;
+                _stage = stage;
+                _metrics.Metrics(stage);
+                using ( var process = Process.GetCurrentProcess() )
+                    _cpu = process.TotalProcessorTime;
+            }
+
+            public void Dispose()
+            {
+                if ( _disposed ) return;
+                _disposed = true;
+                _wall.Stop();
+
+                using ( var process = Process.GetCurrentProcess() )
+                {
+                    _metrics.Count(_stage, "WallMs", _wall.Elapsed.TotalMilliseconds);
+                    _metrics.Count(_stage, "CpuMs", ( process.TotalProcessorTime - _cpu ).TotalMilliseconds);
+                    // Working set when the stage ends; the peak of the process would carry over from earlier stages
+                    // and, in a manifest run, from earlier experiments
+                    _metrics.Set(_stage, "EndRssMb", process.WorkingSet64 / ( 1024.0 * 1024.0 ));
+                }
+            }
+        }
+    }
+}
@@ -103,6 +103,30 @@ public class MersenneTwister : System.Random
 		init (initArray);
 	}
 
+	/// <summary>
+	/// Creates a pseudo-random number generator continuing the sequence of another one.
+	/// </summary>
+	/// <param name="source">The generator whose state is copied.</param>
+	public MersenneTwister (MersenneTwister source)
+	{
+		Restore (source);
+	}
+
+	/// <summary>
+	/// Sets the state of this generator to the state of another one, so that both continue the same sequence.
+	/// </summary>
+	/// <param name="snapshot">The generator whose state is copied, e.g. created with
+	/// <see cref="MersenneTwister(MersenneTwister)"/> before drawing numbers which are not used.</param>
+	public void Restore (MersenneTwister snapshot)
+	{
+		if (snapshot == null) {
+			throw new ArgumentNullException ("snapshot");
+		}
+
+		Array.Copy (snapshot._mt, _mt, N);
+		_mti = snapshot._mti;
+	}
+
 	/// <summary>
 	/// Returns the next pseudo-random <see cref="UInt32"/>.
 	/// </summary>
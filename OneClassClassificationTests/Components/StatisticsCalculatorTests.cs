@@ -166,5 +166,21 @@ namespace OneClassClassificationTests.Components
         {
             Assert.AreEqual(StatisticsCalculator.CalculateAccuracy(Truth,Predictions), 0.5);
         }
+
+        [TestMethod()]
+        public void JaccardIntervalWidthTest()
+        {
+            // Wilson interval: 0 of 10 gives [0, z^2 / (10 + z^2)]
+            Assert.AreEqual(0.2775327998628892, StatisticsCalculator.JaccardIntervalWidth(0, 10), 1e-12);
+            Assert.AreEqual(0.2775327998628892, StatisticsCalculator.JaccardIntervalWidth(10, 10), 1e-12);
+            Assert.AreEqual(0.1923369392680087, StatisticsCalculator.JaccardIntervalWidth(50, 100), 1e-12);
+            Assert.AreEqual(0.0372425196022527, StatisticsCalculator.JaccardIntervalWidth(900, 1000), 1e-12);
+        }
+
+        [TestMethod()]
+        public void JaccardIntervalWidthWithoutPositivesTest()
+        {
+            Assert.AreEqual(1.0, StatisticsCalculator.JaccardIntervalWidth(0, 0));
+        }
     }
 }
\ No newline at end of file
@@ -0,0 +1,82 @@
+﻿using Microsoft.VisualStudio.TestTools.UnitTesting;
+using OneClassClassification.Utils;
+
+namespace OneClassClassificationTests.Utils
+{
+    [TestClass()]
+    public class AssignmentSolverTests
+    {
+        [TestMethod()]
+        public void AssignTest()
+        {
+            var cost = new[,]
+            {
+                {4.0, 1.0, 3.0},
+                {2.0, 0.0, 5.0},
+                {3.0, 2.0, 2.0}
+            };
+
+            CollectionAssert.AreEqual(new[] {1, 0, 2}, AssignmentSolver.Assign(cost));
+        }
+
+        [TestMethod()]
+        public void AssignRectangularTest()
+        {
+            var cost = new[,]
+            {
+                {7.0, 1.0, 9.0, 4.0},
+                {6.0, 2.0, 8.0, 9.0}
+            };
+
+            CollectionAssert.AreEqual(new[] {3, 1}, AssignmentSolver.Assign(cost));
+        }
+
+        [TestMethod()]
+        public void CoverTest()
+        {
+            var cost = new[,]
+            {
+                {1.0, 4.0, 5.0},
+                {2.0, 1.0, 3.0}
+            };
+
+            var transposed = new[,]
+            {
+                {1.0, 2.0},
+                {4.0, 1.0},
+                {5.0, 3.0}
+            };
+
+            foreach ( var matrix in new[] {cost, transposed} )
+            {
+                var cover = AssignmentSolver.Cover(matrix);
+                var sum = 0.0;
+                var rows = new bool[matrix.GetLength(0)];
+                var columns = new bool[matrix.GetLength(1)];
+                for ( var i = 0; i < matrix.GetLength(0); i++ )
+                {
+                    for ( var j = 0; j < matrix.GetLength(1); j++ )
+                    {
+                        if ( !cover[i, j] )
+                            continue;
+                        sum += matrix[i, j];
+                        rows[i] = columns[j] = true;
+                    }
+                }
+
+                Assert.AreEqual(5.0, sum);
+                CollectionAssert.DoesNotContain(rows, false);
+                CollectionAssert.DoesNotContain(columns, false);
+            }
+        }
+
+        [TestMethod()]
+        public void CoverWithoutColumnsTest()
+        {
+            var cover = AssignmentSolver.Cover(new double[3, 0]);
+
+            Assert.AreEqual(3, cover.GetLength(0));
+            Assert.AreEqual(0, cover.GetLength(1));
+        }
+    }
+}
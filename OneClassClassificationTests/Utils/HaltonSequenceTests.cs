@@ -0,0 +1,71 @@
+﻿using System;
+using Microsoft.VisualStudio.TestTools.UnitTesting;
+using OneClassClassification.Utils;
+
+namespace OneClassClassificationTests.Utils
+{
+    [TestClass()]
+    public class HaltonSequenceTests
+    {
+        /// <summary>
+        /// Source of a fixed shift
+        /// </summary>
+        private class ConstantRandom : Random
+        {
+            private readonly double _value;
+
+            public ConstantRandom( double value )
+            {
+                _value = value;
+            }
+
+            public override double NextDouble()
+            {
+                return _value;
+            }
+        }
+
+        [TestMethod()]
+        public void RadicalInversesTest()
+        {
+            var sequence = new HaltonSequence(2, new ConstantRandom(0));
+
+            // Indices 1 to 4 in bases 2 and 3; the origin is skipped
+            var expected = new[]
+            {
+                new[] { 1 / 2.0, 1 / 3.0 },
+                new[] { 1 / 4.0, 2 / 3.0 },
+                new[] { 3 / 4.0, 1 / 9.0 },
+                new[] { 1 / 8.0, 4 / 9.0 }
+            };
+
+            foreach ( var point in expected )
+            {
+                var actual = sequence.Next();
+                for ( var i = 0; i < point.Length; i++ )
+                    Assert.AreEqual(point[i], actual[i], 1e-15);
+            }
+        }
+
+        [TestMethod()]
+        public void ShiftWrapsAroundTest()
+        {
+            var point = new HaltonSequence(3, new ConstantRandom(0.75)).Next();
+
+            // 1/2, 1/3 and 1/5 shifted by 0.75 modulo 1
+            Assert.AreEqual(0.25, point[0], 1e-15);
+            Assert.AreEqual(1 / 3.0 - 0.25, point[1], 1e-15);
+            Assert.AreEqual(0.95, point[2], 1e-15);
+        }
+
+        [TestMethod()]
+        public void PointsInUnitCubeTest()
+        {
+            foreach ( var point in new HaltonSequence(5, new MersenneTwister(3)).Next(10000) )
+            {
+                foreach ( var value in point )
+                    Assert.IsTrue(value >= 0 && value < 1, $"{value} outside of [0, 1)");
+            }
+        }
+    }
+}
@@ -0,0 +1,37 @@
+﻿using Microsoft.VisualStudio.TestTools.UnitTesting;
+
+namespace OneClassClassificationTests.Utils
+{
+    [TestClass()]
+    public class MersenneTwisterTests
+    {
+        [TestMethod()]
+        public void CopyContinuesSequenceTest()
+        {
+            var rand = new MersenneTwister(7);
+            rand.NextDouble();
+
+            var copy = new MersenneTwister(rand);
+
+            // More numbers than the state vector holds, so that both generators regenerate it
+            for ( var i = 0; i < 1000; i++ )
+                Assert.AreEqual(rand.NextDouble(), copy.NextDouble());
+        }
+
+        [TestMethod()]
+        public void RestoreTest()
+        {
+            var rand = new MersenneTwister(7);
+            var snapshot = new MersenneTwister(rand);
+
+            var first = new double[700];
+            for ( var i = 0; i < first.Length; i++ )
+                first[i] = rand.NextDouble();
+
+            rand.Restore(snapshot);
+
+            for ( var i = 0; i < first.Length; i++ )
+                Assert.AreEqual(first[i], rand.NextDouble());
+        }
+    }
+}
@@ -0,0 +1,183 @@
+from __future__ import print_function
+import argparse
+import sqlite3
+import numpy as np
+from groupedStats import GroupRows, MetricsSelectString, metricNames
+from ledger import OpenLedger, parameterColumns
+from schema import Migrate, TagFilter
+from significance import PairedRunsQuery
+
+# A cell is a configuration without its seed; its seeds are replications
+cellColumns = tuple(column for column in parameterColumns if column != 'Seed')
+# Metrics whose confidence intervals decide whether a cell needs more seeds
+convergenceMetrics = ('Jaccard', 'Precision', 'Recall')
+# Experiments compared run by run with --compare, e.g. Tree in testDatabase.sqlite with PrunedTree
+# in treePruningDb.sqlite
+pairedTags = {'Tree': ('PrunedTree',), 'PrunedTree': ('Tree',)}
+
+minimumSeeds = 5
+seedBatch = 5
+confidenceLevel = 0.95
+
+
+def _Cell(configuration):
+    return tuple(getattr(configuration, column) for column in cellColumns)
+
+
+def _Latest(rows, width):
+    """Rows whose first `width` columns identify a run, keeping the last row of a run repeated more than once"""
+    latest = {}
+    for row in rows:
+        latest[tuple(row[:width])] = row
+    return list(latest.values())
+
+
+def _IntervalWidths(stats, level):
+    lower, upper = stats.ConfidenceInterval(level)
+    return upper - lower
+
+
+def LoadCellStatistics(conn, tags):
+    """Statistics of the metrics of every cell, over the successful seeds of runs tagged with any of `tags`"""
+    columns = ', '.join('[{}]'.format(column) for column in cellColumns + ('Seed',))
+    rows = _Latest(conn.execute("SELECT {}, {} FROM experiments WHERE Errors = '' AND {} ORDER BY id"
+                                .format(columns, MetricsSelectString(), TagFilter(tags))).fetchall(),
+                   len(cellColumns) + 1)
+    keys = [tuple(row[:len(cellColumns)]) for row in rows]
+    values = np.array([row[len(cellColumns) + 1:] for row in rows], dtype=np.float64)
+    return GroupRows(keys, values.reshape(len(rows), len(metricNames)))
+
+
+def LoadPairedStatistics(conn, other_path, tags):
+    """Statistics of the differences of the metrics of runs paired by parameters and seed with the database at
+    `other_path`, per cell"""
+    other = sqlite3.connect(other_path)
+    Migrate(other)
+    other.close()
+
+    c = conn.cursor()
+    c.execute("ATTACH DATABASE ? AS other", (other_path,))
+    try:
+        rows = c.execute(PairedRunsQuery(cellColumns, tags)).fetchall()
+    finally:
+        c.execute("DETACH DATABASE other")
+
+    width = len(cellColumns)
+    rows = [row[width:] for row in rows]
+    rows = _Latest(rows, len(parameterColumns))
+    keys = [tuple(value for column, value in zip(parameterColumns, row) if column != 'Seed') for row in rows]
+    values = np.array([row[len(parameterColumns):] for row in rows], dtype=np.float64)
+    values = values.reshape(len(rows), 2 * len(metricNames))
+    return GroupRows(keys, values[:, :len(metricNames)] - values[:, len(metricNames):])
+
+
+class CellState:
+    """Seeds and convergence of one cell. `widths` holds the interval width of every convergence metric,
+    `unresolved` the metrics whose paired comparison is not decided yet"""
+
+    def __init__(self, cell, seeds, widths, unresolved):
+        self.cell = cell
+        self.seeds = seeds
+        self.widths = widths
+        self.unresolved = unresolved
+
+
+def CellStates(conn, cells, tags, width, other_path=None, level=confidenceLevel):
+    """State of every cell. A metric converged when its confidence interval is at most `width` wide. A paired
+    comparison is resolved when the interval of the mean difference excludes zero or is at most `width` wide"""
+    metrics = [metricNames.index(metric) for metric in convergenceMetrics]
+    stats = LoadCellStatistics(conn, tags)
+    interval_widths = _IntervalWidths(stats, level)
+
+    paired = None
+    if other_path is not None:
+        paired_tags = set(tags)
+        for tag in tags:
+            paired_tags.update(pairedTags.get(tag, ()))
+        paired = LoadPairedStatistics(conn, other_path, sorted(paired_tags))
+        lower, upper = paired.ConfidenceInterval(level)
+        with np.errstate(invalid='ignore'):
+            resolved = (lower > 0) | (upper < 0) | (upper - lower <= width)
+
+    states = []
+    for cell in cells:
+        i = stats.index.get(cell)
+        seeds = 0 if i is None else int(stats.n[i, metrics].min())
+        widths = [np.inf if i is None or np.isnan(interval_widths[i, m]) else float(interval_widths[i, m])
+                  for m in metrics]
+        unresolved = []
+        if paired is not None:
+            j = paired.index.get(cell)
+            unresolved = [metricNames[m] for m in metrics if j is None or not resolved[j, m]]
+        states.append(CellState(cell, seeds, widths, unresolved))
+    return states
+
+
+def NeedsSeeds(state, width, minimum=minimumSeeds):
+    return state.seeds < minimum or max(state.widths) > width or bool(state.unresolved)
+
+
+def AdaptiveSeeds(conn, configurations, width, other_path=None, minimum=minimumSeeds, batch=seedBatch,
+                  level=confidenceLevel):
+    """Configurations to run next under sequential sampling of seeds.
+
+    `configurations` hold every seed a cell may get, in order of seeds. A cell whose confidence intervals are
+    at most `width` wide and whose paired comparisons are resolved gets no more seeds. Any other cell gets
+    its next `batch` seeds without a successful run (its first `minimum` ones at the start). Seeds already
+    submitted are among them, so a cell gets no new seeds until they finish (see ledger.MissingWork).
+    Returns the configurations and the states of the cells.
+    """
+    cells = {}
+    for configuration in configurations:
+        cells.setdefault(_Cell(configuration), []).append(configuration)
+    tags = sorted(set(configuration.ExperimentName for configuration in configurations))
+
+    done = set()
+    if cells:
+        rows = conn.execute("SELECT {}, Seed FROM experiments WHERE Errors = '' AND {}"
+                            .format(', '.join('[{}]'.format(column) for column in cellColumns), TagFilter(tags)))
+        done = set(tuple(row) for row in rows)
+
+    scheduled = []
+    states = CellStates(conn, list(cells), tags, width, other_path, level)
+    for state in states:
+        if not NeedsSeeds(state, width, minimum):
+            continue
+        remaining = [configuration for configuration in cells[state.cell]
+                     if state.cell + (configuration.Seed,) not in done]
+        scheduled.extend(remaining[:max(batch, minimum - state.seeds)])
+    return scheduled, states
+
+
+def PrintStates(states, width, minimum=minimumSeeds):
+    print('\t'.join(list(cellColumns) + ['Seeds'] + ['{}CI'.format(metric) for metric in convergenceMetrics] +
+                    ['Unresolved']))
+    for state in states:
+        print('\t'.join(['{}'.format(value) for value in state.cell] + ['{}'.format(state.seeds)] +
+                        ['{:.4f}'.format(value) for value in state.widths] +
+                        [','.join(state.unresolved) or ('-' if NeedsSeeds(state, width, minimum) else 'converged')]))
+
+
+if __name__ == "__main__":
+    from grids import experimentGrids
+    parser = argparse.ArgumentParser(description='Convergence of the cells of an experiment grid: seeds run so '
+                                                 'far, confidence interval widths and unresolved comparisons')
+    parser.add_argument('db', help='results database')
+    parser.add_argument('experiment', choices=sorted(experimentGrids))
+    parser.add_argument('--ci-width', type=float, default=0.02, help='target width of the confidence intervals')
+    parser.add_argument('--seeds', type=int, default=30, help='largest number of seeds of a cell')
+    parser.add_argument('--min-seeds', type=int, default=minimumSeeds)
+    parser.add_argument('--batch', type=int, default=seedBatch, help='seeds added to an unconverged cell at once')
+    parser.add_argument('--compare', help='database paired with the results, e.g. treePruningDb.sqlite')
+    args = parser.parse_args()
+
+    conn = OpenLedger(args.db)
+    if conn is None:
+        parser.error('{} has no results'.format(args.db))
+    grid = list(experimentGrids[args.experiment](xrange(args.seeds)))
+    scheduled, states = AdaptiveSeeds(conn, grid, args.ci_width, args.compare, args.min_seeds, args.batch)
+    conn.close()
+    PrintStates(states, args.ci_width, args.min_seeds)
+    converged = len([state for state in states if not NeedsSeeds(state, args.ci_width, args.min_seeds)])
+    print('{} of {} cells converged, {} of {} runs done, {} in the next batch'.format(
+        converged, len(states), sum(state.seeds for state in states), len(grid), len(scheduled)))
@@ -0,0 +1,146 @@
+from __future__ import print_function
+import argparse
+import gzip
+import hashlib
+import io
+import os
+import sqlite3
+from collections import namedtuple
+import numpy as np
+from c45 import DecisionTree
+from ledger import parameterColumns
+from schema import Migrate, TagFilter, artifactsTable
+
+# Kinds of artifacts kept by ArtifactStore.Store for every run
+artifactKinds = ('tree', 'rules', 'constraints', 'model')
+
+# A run with its artifacts, kind -> decoded artifact
+StoredRun = namedtuple('StoredRun', ('id',) + parameterColumns + ('artifacts',))
+
+
+def BlobPath(store, digest):
+    """Path of a blob, as ArtifactStore.BlobPath"""
+    return os.path.join(store, digest[:2], '{}.gz'.format(digest))
+
+
+def ReadBlob(store, digest):
+    f = gzip.open(BlobPath(store, digest), 'rb')
+    try:
+        return f.read()
+    finally:
+        f.close()
+
+
+def PutBlob(store, content):
+    """Stores `content` unless a blob of the same content exists, like ArtifactStore.Put. Returns its hash"""
+    digest = hashlib.sha256(content).hexdigest()
+    path = BlobPath(store, digest)
+    if os.path.exists(path):
+        return digest
+
+    if not os.path.isdir(os.path.dirname(path)):
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError:
+            # Created by another process meanwhile
+            if not os.path.isdir(os.path.dirname(path)):
+                raise
+    temporary = '{}.tmp{}'.format(path, os.getpid())
+    try:
+        f = gzip.open(temporary, 'wb')
+        try:
+            f.write(content)
+        finally:
+            f.close()
+        os.rename(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return digest
+
+
+def ParseConstraints(content):
+    """(axis, sign, value) of every line written by ArtifactStore.ConstraintsText"""
+    constraints = []
+    for line in content.decode('utf-8').splitlines():
+        axis, sign, value = line.split('\t')
+        constraints.append((int(axis), sign, float(value)))
+    return constraints
+
+
+decoders = {
+    'tree': lambda content: DecisionTree.FromArray(np.load(io.BytesIO(content))),
+    'rules': lambda content: content.decode('utf-8').splitlines(),
+    'constraints': ParseConstraints,
+    'model': lambda content: content.decode('utf-8'),
+}
+
+
+def LoadArtifacts(conn, store, kinds=artifactKinds, tags=None, where=None, arguments=(), decode=True):
+    """Successful runs having any of the artifacts `kinds`, as StoredRun tuples in the order of their ids.
+
+    `tags` and `where` (an SQL condition on the experiments table, with `arguments`) select the runs. The index is
+    read with one query and every distinct blob is read and decoded once, so runs sharing an artifact share the
+    decoded object. With `decode` False the artifacts are the stored bytes.
+    """
+    conditions = ["e.Errors = ''", 'a.Kind IN ({})'.format(', '.join('?' * len(kinds)))]
+    if tags:
+        conditions.append(TagFilter(tags, 'e.id'))
+    if where:
+        conditions.append('({})'.format(where))
+    rows = conn.execute("SELECT e.id, {}, a.Kind, a.Hash FROM {} a JOIN experiments e ON e.id = a.ExperimentId "
+                        "WHERE {} ORDER BY e.id".format(', '.join('e.[{}]'.format(column) for column in parameterColumns),
+                                                        artifactsTable, ' AND '.join(conditions)),
+                        tuple(kinds) + tuple(arguments)).fetchall()
+
+    blobs = {}
+    runs = []
+    for row in rows:
+        kind, digest = row[-2:]
+        if not runs or runs[-1].id != row[0]:
+            runs.append(StoredRun(*(tuple(row[:-2]) + ({},))))
+        if digest not in blobs:
+            content = ReadBlob(store, digest)
+            blobs[digest] = decoders[kind](content) if decode else content
+        runs[-1].artifacts[kind] = blobs[digest]
+    return runs
+
+
+def StoreSummary(conn, store):
+    """(kind, runs, distinct blobs, bytes of all artifacts, bytes of the distinct ones, compressed bytes) of every
+    kind of artifact"""
+    summary = []
+    for kind, runs, blobs, size in conn.execute("SELECT Kind, COUNT(*), COUNT(DISTINCT Hash), SUM(Size) FROM {} "
+                                                "GROUP BY Kind ORDER BY Kind".format(artifactsTable)).fetchall():
+        distinct = conn.execute("SELECT Hash, MAX(Size) FROM {} WHERE Kind = ? GROUP BY Hash".format(artifactsTable),
+                                (kind,)).fetchall()
+        compressed = sum(os.path.getsize(BlobPath(store, digest)) for digest, _ in distinct
+                         if os.path.exists(BlobPath(store, digest)))
+        summary.append((kind, runs, blobs, size, sum(size for _, size in distinct), compressed))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Artifacts of the runs kept in the artifact store (OCC_ARTIFACTS): '
+                                                 'sizes and deduplication, or mean angles recomputed from them')
+    parser.add_argument('db', help='results database')
+    parser.add_argument('store', help='artifact store directory')
+    parser.add_argument('--tag', nargs='+', help='only runs of these experiments, e.g. Tree')
+    parser.add_argument('--mean-angle', action='store_true',
+                        help='recompute the mean angle of every run from its constraints')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    Migrate(conn)
+    if args.mean_angle:
+        from meanAngle import MeanAngle
+        print('id\tBenchmark\tDimensions\tSeed\tMeanAngle')
+        for run in LoadArtifacts(conn, args.store, ('constraints',), args.tag):
+            axes = [axis for axis, _, _ in run.artifacts['constraints']]
+            print('{}\t{}\t{}\t{}\t{!r}'.format(run.id, run.Benchmark, run.Dimensions, run.Seed,
+                                                MeanAngle(run.Benchmark, run.Dimensions, axes)))
+    else:
+        print('Kind\tRuns\tBlobs\tBytes\tDistinctBytes\tCompressedBytes')
+        for line in StoreSummary(conn, args.store):
+            print('\t'.join('{}'.format(value) for value in line))
+    conn.close()
@@ -0,0 +1,319 @@
+from __future__ import print_function
+import argparse
+import json
+import math
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict, namedtuple
+import numpy as np
+from distributions import StudentTwoSidedP
+from grids import Arguments, experimentGrids
+from localRunner import ParseCommand, defaultCommand, pollInterval
+from schema import stageMetricsTable
+
+# Scratch results database of the program (see GlobalVariables.ResultsDatabaseVariable)
+resultsDatabaseVariable = 'OCC_RESULTS_DATABASE'
+
+# Fixed subset of the experiment grids, small enough to run on one machine
+suiteSeeds = (0, 1)
+suiteDimensions = (3, 5)
+suiteFilters = OrderedDict([
+    ('components', lambda configuration: configuration.Components == configuration.Dimensions),
+    ('tree', lambda configuration: configuration.Join == configuration.MaxHeight == configuration.Dimensions),
+    ('examples', lambda configuration: configuration.FeasibleExamples in (100, 500)),
+])
+
+# Analysis scripts timed on copies of the databases of --analysis-dir, with the file names latexTable.py expects
+scriptsDirectory = os.path.dirname(os.path.abspath(__file__))
+analysisDatabases = ('testDatabase.sqlite', 'treePruningDb.sqlite')
+analysisCases = OrderedDict([
+    ('summary', ['summary.py'] + list(analysisDatabases)),
+    ('columnar', ['columnar.py'] + list(analysisDatabases)),
+    ('latexTable', ['latexTable.py']),
+])
+
+benchmarkMetrics = ('WallMs', 'CpuMs', 'PeakRssMb')
+# Stage measured from outside for every run of the program, covering the whole process. The processes of the
+# analysis cases are stages named after the script
+processStage = 'Process'
+# Added to both sides of a ratio, so that stages taking about a millisecond do not produce huge ratios
+metricFloor = 1.0
+
+# One benchmarked command. Dimensions is 0 for cases outside of the experiment grids
+Case = namedtuple('Case', ['Group', 'Name', 'Dimensions', 'Arguments', 'Configuration'])
+
+
+def SuiteConfigurations(seeds=suiteSeeds, dimensions=suiteDimensions):
+    """(grid name, Configuration) of every run of the benchmark suite, in a fixed order"""
+    for name, selected in suiteFilters.items():
+        for configuration in experimentGrids[name](seeds):
+            if configuration.Dimensions in dimensions and selected(configuration):
+                yield name, configuration
+
+
+def ProgramCases(command, seeds=suiteSeeds, dimensions=suiteDimensions):
+    cases = []
+    for i, (grid, configuration) in enumerate(SuiteConfigurations(seeds, dimensions)):
+        # The experiment name identifies the case in the scratch database
+        configuration = configuration._replace(ExperimentName='benchmark{}'.format(i))
+        name = '{}_{}_{}_{}_{}_{}'.format(grid, configuration.Benchmark, configuration.Dimensions,
+                                          configuration.FeasibleExamples, configuration.Join, configuration.Seed)
+        cases.append(Case(grid, name, configuration.Dimensions, command + Arguments(configuration), configuration))
+    return cases
+
+
+def AnalysisCases():
+    return [Case('analysis', name, 0, [sys.executable, os.path.join(scriptsDirectory, arguments[0])] + arguments[1:],
+                 None) for name, arguments in analysisCases.items()]
+
+
+def MeasureCommand(arguments, cwd=None, environment=None, timeout=None, log=None):
+    """Runs a process and returns (exit code or None on timeout, {metric: value}) with its wall and CPU time
+    in milliseconds and its peak resident memory in megabytes"""
+    start = time.time()
+    process = subprocess.Popen(arguments, cwd=cwd, env=environment, stdout=log, stderr=subprocess.STDOUT)
+    while True:
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            break
+        if timeout is not None and time.time() - start > timeout:
+            process.kill()
+            os.wait4(process.pid, 0)
+            return None, {}
+        time.sleep(pollInterval / 10)
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = usage.ru_maxrss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+    metrics = {'WallMs': (time.time() - start) * 1000, 'CpuMs': (usage.ru_utime + usage.ru_stime) * 1000,
+               'PeakRssMb': rss}
+    returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    return returncode, metrics
+
+
+def ReadStageMetrics(db_path):
+    """Stage metrics saved by the program into a scratch database: experiment name -> [(stage, metric, value)]"""
+    if not os.path.exists(db_path):
+        return {}
+    conn = sqlite3.connect(db_path)
+    try:
+        if not conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = ?", (stageMetricsTable,)).fetchone()[0]:
+            return {}
+        stages = {}
+        rows = conn.execute("SELECT e.ExperimentName, sm.Stage, sm.Metric, sm.Value FROM {} sm "
+                            "JOIN experiments e ON e.id = sm.ExperimentId WHERE e.Errors = '' AND sm.Metric IN ({})"
+                            .format(stageMetricsTable, ', '.join('?' * len(benchmarkMetrics))), benchmarkMetrics)
+        for name, stage, metric, value in rows:
+            stages.setdefault(name, []).append((stage, metric, value))
+        return stages
+    finally:
+        conn.close()
+
+
+def RunSuite(cases, repeat=3, timeout=None, analysis_dir=None, log_dir=None, callback=None):
+    """Runs every case `repeat` times. Returns the samples ({(group, case, dimensions, stage, metric): [values]})
+    and the names of failed cases"""
+    samples = OrderedDict()
+    failed = set()
+    scratch = tempfile.mkdtemp(prefix='occ-benchmark-')
+    try:
+        for repetition in xrange(repeat):
+            # Runs already in a database are skipped by the program, so every repetition gets its own
+            db_path = os.path.join(scratch, 'results{}.sqlite'.format(repetition))
+            environment = dict(os.environ)
+            environment[resultsDatabaseVariable] = db_path
+
+            for case in cases:
+                cwd = None
+                if case.Group == 'analysis':
+                    # Fresh copies, so that summaries and snapshots are built from scratch
+                    cwd = os.path.join(scratch, 'analysis')
+                    shutil.rmtree(cwd, ignore_errors=True)
+                    os.makedirs(cwd)
+                    for name in analysisDatabases:
+                        shutil.copy(os.path.join(analysis_dir, name), cwd)
+
+                log = open(os.path.join(log_dir, '{}.log'.format(case.Name)) if log_dir else os.devnull, 'a')
+                try:
+                    returncode, metrics = MeasureCommand(case.Arguments, cwd, environment, timeout, log)
+                finally:
+                    log.close()
+                if returncode != 0:
+                    failed.add(case.Name)
+                stage = processStage if case.Configuration is not None else case.Name
+                for metric, value in metrics.items():
+                    samples.setdefault((case.Group, case.Name, case.Dimensions, stage, metric), []).append(value)
+                if callback is not None:
+                    callback(repetition, case, returncode, metrics)
+
+            stages = ReadStageMetrics(db_path)
+            for case in cases:
+                if case.Configuration is None:
+                    continue
+                for stage, metric, value in stages.get(case.Configuration.ExperimentName, []):
+                    samples.setdefault((case.Group, case.Name, case.Dimensions, stage, metric), []).append(value)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    for key in [key for key in samples if key[1] in failed]:
+        del samples[key]
+    return samples, sorted(failed)
+
+
+def SaveResults(path, samples, command, repeat):
+    results = {'Host': socket.gethostname(), 'Created': time.strftime('%Y-%m-%d %H:%M:%S'), 'Command': command,
+               'Repeat': repeat,
+               'Samples': [{'Group': group, 'Case': case, 'Dimensions': dimensions, 'Stage': stage, 'Metric': metric,
+                            'Values': values}
+                           for (group, case, dimensions, stage, metric), values in samples.items()]}
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=1)
+
+
+def LoadResults(path):
+    with open(path) as f:
+        results = json.load(f)
+    samples = OrderedDict()
+    for sample in results['Samples']:
+        samples[(sample['Group'], sample['Case'], sample['Dimensions'], sample['Stage'], sample['Metric'])] = \
+            sample['Values']
+    return results, samples
+
+
+# Change of one stage at one dimension. Ratio is the geometric mean ratio of current to baseline values
+Comparison = namedtuple('Comparison', ['Group', 'Stage', 'Dimensions', 'Metric', 'Cases', 'Baseline', 'Current',
+                                       'Ratio', 'P', 'Flag'])
+
+
+def WelchTest(first, second):
+    """One-sided p-value of mean(first) > mean(second), or None with too few values"""
+    n1, n2 = len(first), len(second)
+    if n1 + n2 < 3 or min(n1, n2) < 1:
+        return None
+    v1 = np.var(first, ddof=1) / n1 if n1 > 1 else 0.0
+    v2 = np.var(second, ddof=1) / n2 if n2 > 1 else 0.0
+    difference = np.mean(first) - np.mean(second)
+    if v1 + v2 == 0:
+        return 0.0 if difference > 0 else 1.0
+    # Welch-Satterthwaite degrees of freedom; a side without a variance estimate adds nothing
+    dof = (v1 + v2) ** 2 / sum(v ** 2 / (n - 1) for v, n in ((v1, n1), (v2, n2)) if n > 1)
+    t = difference / math.sqrt(v1 + v2)
+    p = float(StudentTwoSidedP(t, dof)) / 2
+    return p if t > 0 else 1 - p
+
+
+def CompareResults(current, baseline, threshold=0.1, alpha=0.05):
+    """Compares two sets of samples stage by stage and dimension by dimension.
+
+    Values are compared as logarithms (plus metricFloor). Each case is centered at the mean of its baseline
+    values, so that runs of different benchmarks and seeds can be pooled, and the centered current values are
+    tested against the centered baseline values with Welch's t-test. A stage regressed ('slower') if the ratio
+    exceeds 1 + `threshold` with a one-sided p-value below `alpha`, and improved ('faster') in the opposite case.
+    """
+    groups = OrderedDict()
+    for key, values in current.items():
+        if key not in baseline:
+            continue
+        group, case, dimensions, stage, metric = key
+        base = np.log(np.asarray(baseline[key], dtype=np.float64) + metricFloor)
+        now = np.log(np.asarray(values, dtype=np.float64) + metricFloor)
+        center = base.mean()
+        entry = groups.setdefault((group, stage, dimensions, metric), ([], [], [], []))
+        entry[0].extend(now - center)
+        entry[1].extend(base - center)
+        entry[2].append(now.mean())
+        entry[3].append(center)
+
+    comparisons = []
+    for (group, stage, dimensions, metric), (now, base, current_means, baseline_means) in groups.items():
+        ratio = math.exp(np.mean(now) - np.mean(base))
+        # Geometric means over the cases
+        slower, faster = WelchTest(now, base), WelchTest(base, now)
+        flag = ''
+        if ratio > 1 + threshold and slower is not None and slower < alpha:
+            flag = 'slower'
+        elif ratio < 1 / (1 + threshold) and faster is not None and faster < alpha:
+            flag = 'faster'
+        comparisons.append(Comparison(group, stage, dimensions, metric, len(current_means),
+                                      math.exp(np.mean(baseline_means)) - metricFloor,
+                                      math.exp(np.mean(current_means)) - metricFloor,
+                                      ratio, slower if ratio >= 1 else faster, flag))
+    return comparisons
+
+
+def PrintComparisons(comparisons, only_flagged=False):
+    print('\t'.join(['Group', 'Stage', 'Dimensions', 'Metric', 'Cases', 'Baseline', 'Current', 'Ratio', 'P', '']))
+    for comparison in comparisons:
+        if only_flagged and not comparison.Flag:
+            continue
+        print('\t'.join([comparison.Group, comparison.Stage, '{}'.format(comparison.Dimensions or '-'),
+                         comparison.Metric, '{}'.format(comparison.Cases), '{:.1f}'.format(comparison.Baseline),
+                         '{:.1f}'.format(comparison.Current), '{:.3f}'.format(comparison.Ratio),
+                         '-' if comparison.P is None else '{:.4f}'.format(comparison.P), comparison.Flag]))
+
+
+def PrintRun(repetition, case, returncode, metrics):
+    status = 'ok' if returncode == 0 else ('timeout' if returncode is None else 'exit {}'.format(returncode))
+    print('{:8} {:3} {:8.0f} ms {:7.1f} MB  {}'.format(status, repetition, metrics.get('WallMs', 0),
+                                                       metrics.get('PeakRssMb', 0), case.Name))
+
+
+def ParseArguments(argv):
+    parser = argparse.ArgumentParser(description='Benchmarks a fixed subset of the experiment grids and compares '
+                                                 'the time and memory of every stage with a baseline')
+    subparsers = parser.add_subparsers(dest='command')
+
+    run = subparsers.add_parser('run', help='run the benchmark suite and save the results')
+    run.add_argument('results', help='JSON file the results are written to')
+    run.add_argument('--exe', default=defaultCommand, help='command running a single configuration')
+    run.add_argument('--repeat', type=int, default=3, help='runs of every case')
+    run.add_argument('--timeout', type=float, help='seconds after which a run is killed')
+    run.add_argument('--no-program', action='store_true', help='only benchmark the analysis scripts')
+    run.add_argument('--analysis-dir', help='directory with testDatabase.sqlite and treePruningDb.sqlite; '
+                                            'benchmarks summary.py, columnar.py and latexTable.py on copies')
+    run.add_argument('--logs', help='directory for the output of every run')
+    run.add_argument('--baseline', help='results to compare with after the run')
+
+    compare = subparsers.add_parser('compare', help='compare saved results with a baseline')
+    compare.add_argument('results')
+    compare.add_argument('baseline')
+
+    for subparser in (run, compare):
+        subparser.add_argument('--threshold', type=float, default=0.1,
+                               help='smallest relative change reported as a regression (default 0.1)')
+        subparser.add_argument('--alpha', type=float, default=0.05, help='significance level (default 0.05)')
+        subparser.add_argument('--flagged', action='store_true', help='print only the changed stages')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = ParseArguments(sys.argv[1:])
+
+    failed = []
+    if args.command == 'run':
+        cases = [] if args.no_program else ProgramCases(ParseCommand(args.exe))
+        if args.analysis_dir:
+            cases += AnalysisCases()
+        if args.logs and not os.path.isdir(args.logs):
+            os.makedirs(args.logs)
+        samples, failed = RunSuite(cases, args.repeat, args.timeout, args.analysis_dir, args.logs, PrintRun)
+        SaveResults(args.results, samples, args.exe, args.repeat)
+        print('{} cases, {} failed, results written to {}'.format(len(cases), len(failed), args.results))
+        baseline_path = args.baseline
+    else:
+        _, samples = LoadResults(args.results)
+        baseline_path = args.baseline
+
+    regressions = []
+    if baseline_path:
+        _, baseline = LoadResults(baseline_path)
+        comparisons = CompareResults(samples, baseline, args.threshold, args.alpha)
+        PrintComparisons(comparisons, args.flagged)
+        regressions = [comparison for comparison in comparisons if comparison.Flag == 'slower']
+        print('{} of {} stages regressed'.format(len(regressions), len(comparisons)))
+    sys.exit(1 if failed or regressions else 0)
@@ -0,0 +1,274 @@
+from __future__ import print_function
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from dataGeneration import CacheKey, generatorName
+from grids import experimentGrids
+
+# Trees are written into the dataset cache entry of their training set, where OneClassClassification.exe loads them
+# with OCC_TREE_LEARNER=numpy (see C45BinaryClassificator.LoadTree). One row per node: feature (-1 for a leaf),
+# threshold, left child (x <= threshold), right child and class of a leaf
+treeFile = 'tree_{}_{}.npy'
+rulesFile = 'rules_{}_{}.txt'
+treeColumns = ('Feature', 'Threshold', 'Left', 'Right', 'Output')
+leafFeature = -1
+
+
+def _Entropy(positives, totals):
+    """Binary entropy in bits of `positives` out of `totals`, elementwise; 0 for pure sets"""
+    positives, totals = np.asarray(positives, dtype=np.float64), np.asarray(totals, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = positives / totals
+        entropy = -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+    return np.where((positives > 0) & (positives < totals), entropy, 0.0)
+
+
+def _BestSplit(left_counts, left_positives, count, positives):
+    """Best of the candidate splits of one feature given by the examples and positives on their left side.
+
+    As in Accord's C45Learning, the split with the largest information gain is chosen (the first one on ties) and
+    scored by its gain ratio. Returns (candidate index, gain ratio), or None without a split gaining information
+    """
+    if not len(left_counts):
+        return None
+    right_counts = count - left_counts
+    gains = _Entropy(positives, count) - (left_counts * _Entropy(left_positives, left_counts) +
+                                          right_counts * _Entropy(positives - left_positives, right_counts)) / count
+    best = int(np.argmax(gains))
+    if gains[best] <= 0:
+        return None
+    return best, gains[best] / _Entropy(left_counts[best], count)
+
+
+class DecisionTree:
+    """Binary decision tree stored in node arrays; node 0 is the root"""
+
+    def __init__(self, feature, threshold, left, right, output):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.output = np.asarray(output, dtype=np.int32)
+
+    @property
+    def nodes(self):
+        return len(self.feature)
+
+    @property
+    def leaves(self):
+        return int(np.sum(self.feature == leafFeature))
+
+    @property
+    def height(self):
+        depth = np.zeros(self.nodes, dtype=np.int32)
+        for node in xrange(self.nodes):
+            if self.feature[node] != leafFeature:
+                depth[self.left[node]] = depth[self.right[node]] = depth[node] + 1
+        return int(depth.max())
+
+    def Decide(self, x):
+        """Class of every row of `x`"""
+        x = np.asarray(x, dtype=np.float64)
+        node = np.zeros(len(x), dtype=np.int32)
+        active = np.arange(len(x))
+        while len(active):
+            internal = self.feature[node[active]] != leafFeature
+            active = active[internal]
+            current = node[active]
+            goes_left = x[active, self.feature[current]] <= self.threshold[current]
+            node[active] = np.where(goes_left, self.left[current], self.right[current])
+        return self.output[node]
+
+    def Rules(self):
+        """Decision rules of the leaves in the format of Accord's DecisionTree.ToRules, read by ModelCreator:
+        '1 =: (x0 <= 2.5) && (x3 > -1.25)'"""
+        rules = []
+        stack = [(0, [])]
+        while stack:
+            node, antecedents = stack.pop()
+            if self.feature[node] == leafFeature:
+                rules.append('{} =: {}'.format(self.output[node], ' && '.join(antecedents)))
+                continue
+            condition = 'x{} {{}} {!r}'.format(self.feature[node], float(self.threshold[node]))
+            stack.append((self.right[node], antecedents + ['({})'.format(condition.format('>'))]))
+            stack.append((self.left[node], antecedents + ['({})'.format(condition.format('<='))]))
+        return rules
+
+    def ToArray(self):
+        return np.column_stack([self.feature, self.threshold, self.left, self.right, self.output]).astype('<f8')
+
+    @staticmethod
+    def FromArray(array):
+        array = np.asarray(array)
+        return DecisionTree(*[array[:, i] for i in xrange(len(treeColumns))])
+
+
+class _TreeBuilder:
+    def __init__(self):
+        self.feature, self.threshold, self.left, self.right, self.output = [], [], [], [], []
+
+    def Add(self):
+        for column in (self.feature, self.threshold, self.left, self.right, self.output):
+            column.append(0)
+        self.feature[-1] = leafFeature
+        return len(self.feature) - 1
+
+    def Leaf(self, node, positives, count):
+        # Most common class, the negative one on ties
+        self.output[node] = 1 if 2 * positives > count else 0
+
+    def Split(self, node, feature, threshold):
+        self.feature[node], self.threshold[node] = feature, threshold
+        self.left[node], self.right[node] = self.Add(), self.Add()
+        return self.left[node], self.right[node]
+
+    def Tree(self):
+        return DecisionTree(self.feature, self.threshold, self.left, self.right, self.output)
+
+
+def _Candidates(usage, join):
+    return [feature for feature, used in enumerate(usage) if used < join]
+
+
+def Learn(x, y, join, max_height=0, bins=None):
+    """C4.5 tree of two classes (y of 0 and 1) with the semantics of Accord's C45Learning.
+
+    A feature is split on at most `join` times on a path from the root, and leaves are at most `max_height` deep
+    (0 for any depth). Candidate thresholds are the midpoints between consecutive distinct values of a feature in
+    the whole training set. The examples of a node are kept in one presorted index array per feature, so the
+    information gain of all thresholds of a feature is computed from cumulative class counts at once. With `bins`
+    the thresholds are at most `bins` - 1 quantiles of every feature instead, and class counts come from histograms.
+    Unlike Accord, a node where no split gains information becomes a leaf.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.asarray(y).astype(np.int64)
+    if bins:
+        return _LearnHistogram(x, y, join, max_height, bins)
+
+    dimensions = x.shape[1]
+    distinct = [np.unique(x[:, f]) for f in xrange(dimensions)]
+    goes_left = np.zeros(len(x), dtype=bool)
+    builder = _TreeBuilder()
+    stack = [(builder.Add(), [np.argsort(x[:, f], kind='mergesort') for f in xrange(dimensions)], 0,
+              (0,) * dimensions)]
+    while stack:
+        node, orders, depth, usage = stack.pop()
+        members = orders[0]
+        count, positives = len(members), int(y[members].sum())
+        builder.Leaf(node, positives, count)
+        candidates = _Candidates(usage, join)
+        if positives in (0, count) or not candidates or (max_height > 0 and depth == max_height):
+            continue
+
+        best = None
+        for f in candidates:
+            values = x[orders[f], f]
+            # Splits between consecutive distinct values of the node
+            ends = np.flatnonzero(values[:-1] < values[1:])
+            split = _BestSplit(ends + 1, np.cumsum(y[orders[f]])[ends], count, positives)
+            if split is not None and (best is None or split[1] > best[1]):
+                best = f, split[1], values[ends[split[0]]]
+        if best is None:
+            continue
+
+        f, _, below = best
+        j = np.searchsorted(distinct[f], below)
+        threshold = (distinct[f][j] + distinct[f][j + 1]) / 2.0
+        goes_left[members] = x[members, f] <= threshold
+        left, right = builder.Split(node, f, threshold)
+        usage = usage[:f] + (usage[f] + 1,) + usage[f + 1:]
+        # Stable partitions keep the index arrays of the children sorted
+        masks = [goes_left[order] for order in orders]
+        stack.append((right, [order[~mask] for order, mask in zip(orders, masks)], depth + 1, usage))
+        stack.append((left, [order[mask] for order, mask in zip(orders, masks)], depth + 1, usage))
+    return builder.Tree()
+
+
+def _LearnHistogram(x, y, join, max_height, bins):
+    dimensions = x.shape[1]
+    quantiles = np.linspace(0, 100, bins + 1)[1:-1]
+    edges = [np.unique(np.percentile(x[:, f], quantiles)) for f in xrange(dimensions)]
+    # Bin of every value: x <= edges[f][k] exactly when codes[:, f] <= k
+    codes = np.column_stack([np.searchsorted(edges[f], x[:, f], side='left') for f in xrange(dimensions)])
+
+    builder = _TreeBuilder()
+    stack = [(builder.Add(), np.arange(len(x)), 0, (0,) * dimensions)]
+    while stack:
+        node, members, depth, usage = stack.pop()
+        count, positives = len(members), int(y[members].sum())
+        builder.Leaf(node, positives, count)
+        candidates = _Candidates(usage, join)
+        if positives in (0, count) or not candidates or (max_height > 0 and depth == max_height):
+            continue
+
+        best = None
+        for f in candidates:
+            size = len(edges[f]) + 1
+            left_counts = np.cumsum(np.bincount(codes[members, f], minlength=size))[:-1]
+            left_positives = np.cumsum(np.bincount(codes[members, f], weights=y[members], minlength=size))[:-1]
+            usable = np.flatnonzero((left_counts > 0) & (left_counts < count))
+            split = _BestSplit(left_counts[usable], left_positives[usable], count, positives)
+            if split is not None and (best is None or split[1] > best[1]):
+                best = f, split[1], usable[split[0]]
+
+        if best is None:
+            continue
+        f, _, k = best
+        left, right = builder.Split(node, f, edges[f][k])
+        usage = usage[:f] + (usage[f] + 1,) + usage[f + 1:]
+        mask = codes[members, f] <= k
+        stack.append((right, members[~mask], depth + 1, usage))
+        stack.append((left, members[mask], depth + 1, usage))
+    return builder.Tree()
+
+
+def StoreTree(entry, join, max_height, tree):
+    """Writes the tree and its rules into a dataset cache entry. Files are written aside and renamed, so runs
+    never read them partially"""
+    for name, write in ((treeFile, lambda f: np.save(f, tree.ToArray())),
+                        (rulesFile, lambda f: f.write(''.join(rule + '\n' for rule in tree.Rules())))):
+        path = os.path.join(entry, name.format(join, max_height))
+        temporary = '{}.tmp{}'.format(path, os.getpid())
+        with open(temporary, 'wb') as f:
+            write(f)
+        os.rename(temporary, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Learns the trees of an experiment from the data sets of the dataset '
+                                                 'cache; run OneClassClassification.exe with OCC_TREE_LEARNER=numpy '
+                                                 'to use them')
+    parser.add_argument('experiment', choices=sorted(experimentGrids))
+    parser.add_argument('cache', help='dataset cache directory (OCC_DATASET_CACHE)')
+    parser.add_argument('--seeds', type=int, default=30, help='number of seeds of every configuration')
+    parser.add_argument('--generator', default='accord', choices=['accord', generatorName],
+                        help='generator of the data sets (OCC_DATA_GENERATOR)')
+    parser.add_argument('--bins', type=int, help='search thresholds among this many quantiles of every feature')
+    parser.add_argument('--force', action='store_true', help='learn trees already in the cache again')
+    args = parser.parse_args()
+
+    missing = 0
+    for configuration in experimentGrids[args.experiment](xrange(args.seeds)):
+        key = CacheKey(configuration.Benchmark, configuration.Dimensions, configuration.FeasibleExamples,
+                       configuration.K, configuration.Seed, configuration.Components, generator=args.generator)
+        entry = os.path.join(args.cache, key)
+        if not os.path.isdir(entry):
+            missing += 1
+            continue
+        if not args.force and os.path.exists(os.path.join(entry, treeFile.format(configuration.Join,
+                                                                                   configuration.MaxHeight))):
+            continue
+
+        training = np.load(os.path.join(entry, 'training.npy'), mmap_mode='r')
+        start = time.time()
+        tree = Learn(training[:, :-1], training[:, -1], configuration.Join, configuration.MaxHeight, args.bins)
+        seconds = time.time() - start
+        StoreTree(entry, configuration.Join, configuration.MaxHeight, tree)
+        print('{} {}d seed {} Join {} MaxHeight {}: {} rows, {} nodes, height {}, {:.2f}s'.format(
+            configuration.Benchmark, configuration.Dimensions, configuration.Seed, configuration.Join,
+            configuration.MaxHeight, len(training), tree.nodes, tree.height, seconds))
+        sys.stdout.flush()
+    if missing:
+        print('{} configurations without a data set in the cache'.format(missing))
@@ -0,0 +1,219 @@
+from __future__ import print_function
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+import numpy as np
+from groupedStats import GroupRows, metricNames, metricsSelectString
+from ledger import parameterColumns
+from schema import HasTag
+from significance import PairedTTests
+
+# Typed columns of the snapshot. The metrics are stored as computed by metricsSelectString.
+integerColumns = ('id', 'FeasibleExamples', 'Dimensions', 'Join', 'MaxHeight', 'Seed', 'Components')
+floatColumns = ('K',) + metricNames
+stringColumns = ('Benchmark', 'ExperimentName')
+blockSize = 10000
+
+metaFile = 'meta.json'
+# Name of the current snapshot version inside the cache directory, replaced once a new version is complete
+pointerFile = 'current'
+# Loads retried when a concurrent build replaces the version being read
+loadAttempts = 5
+snapshotQuery = "SELECT {}, {}, {}, {}, Errors = '' FROM experiments ORDER BY id" \
+    .format(', '.join('CAST([{}] AS INTEGER)'.format(column) for column in integerColumns),
+            'CAST(K AS REAL)', metricsSelectString, ', '.join('[{}]'.format(column) for column in stringColumns))
+
+
+def CacheDirectory(db_path):
+    return '{}.columns'.format(os.path.splitext(db_path)[0])
+
+
+def _SourceState(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows, max_id = conn.execute("SELECT COUNT(*), IFNULL(MAX(id), 0) FROM experiments").fetchone()
+    finally:
+        conn.close()
+    return {'rows': rows, 'maxId': max_id}
+
+
+def _CurrentVersion(directory):
+    try:
+        with open(os.path.join(directory, pointerFile)) as f:
+            return os.path.join(directory, f.read().strip())
+    except (IOError, OSError):
+        return None
+
+
+def _ReplaceFile(source, target):
+    # On Windows os.rename does not overwrite, readers retry while the pointer is missing
+    try:
+        os.rename(source, target)
+    except OSError:
+        if not os.path.exists(target):
+            raise
+        os.remove(target)
+        os.rename(source, target)
+
+
+def _ReadMeta(directory):
+    if directory is None:
+        return None
+    try:
+        with open(os.path.join(directory, metaFile)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+class ColumnarResults:
+    """Snapshot of the experiments table, one NumPy array per column (memory-mapped when loaded from disk).
+
+    Columns are available by name: results['Seed'], results['Jaccard'], ...; results['Succeeded']
+    marks runs without errors.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.rows = len(columns['id'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def Metrics(self, mask=None):
+        """Metric values (rows x metrics) in the order of metricNames"""
+        metrics = np.column_stack([self.columns[name] for name in metricNames]).reshape(self.rows, len(metricNames))
+        return metrics if mask is None else metrics[mask]
+
+    def TagMask(self, tags):
+        """Rows whose experiment name holds any of `tags`; evaluated once per distinct name"""
+        names, inverse = np.unique(self.columns['ExperimentName'], return_inverse=True)
+        tagged = np.array([HasTag(name, tags) for name in names], dtype=bool)
+        return tagged[inverse] if len(names) else np.zeros(self.rows, dtype=bool)
+
+    def Select(self, tags):
+        """Successful runs tagged with any of `tags`"""
+        return np.asarray(self.columns['Succeeded'], dtype=bool) & self.TagMask(tags)
+
+    def Keys(self, columns, rows):
+        """Tuples of `columns` of the rows selected by a mask or an index array"""
+        return list(zip(*[self.columns[column][rows].tolist() for column in columns]))
+
+
+def BuildColumns(db_path, directory=None, block_size=blockSize):
+    """Writes a snapshot of the experiments table of `db_path` as a new version of the cache directory and points
+    the cache at it once complete"""
+    directory = directory or CacheDirectory(db_path)
+    state = _SourceState(db_path)
+    names = list(integerColumns) + list(floatColumns) + list(stringColumns) + ['Succeeded']
+
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute(snapshotQuery)
+    blocks = dict((name, []) for name in names)
+    while True:
+        rows = c.fetchmany(block_size)
+        if not rows:
+            break
+        for name, values in zip(names, zip(*rows)):
+            blocks[name].append(values)
+    conn.close()
+
+    def Column(name, dtype):
+        values = [value for block in blocks[name] for value in block]
+        if dtype is None:
+            return np.array([u'' if value is None else u'{}'.format(value) for value in values], dtype=np.unicode_)
+        return np.array(values, dtype=dtype)
+
+    columns = {}
+    for name in integerColumns:
+        columns[name] = Column(name, np.int64)
+    for name in floatColumns:
+        columns[name] = Column(name, np.float64)
+    for name in stringColumns:
+        columns[name] = Column(name, None)
+    columns['Succeeded'] = Column('Succeeded', bool)
+
+    # Versions are written next to the current one and sort by creation time
+    version = 'v{:020d}-{}'.format(int(time.time() * 1e6), os.getpid())
+    temporary = os.path.join(directory, version + '.tmp')
+    os.makedirs(temporary)
+    for name, values in columns.items():
+        np.save(os.path.join(temporary, '{}.npy'.format(name)), values)
+    with open(os.path.join(temporary, metaFile), 'w') as f:
+        json.dump(state, f)
+    os.rename(temporary, os.path.join(directory, version))
+
+    pointer = os.path.join(directory, '{}.tmp{}'.format(pointerFile, os.getpid()))
+    with open(pointer, 'w') as f:
+        f.write(version)
+    _ReplaceFile(pointer, os.path.join(directory, pointerFile))
+
+    # Older versions; versions being written by other builds are newer
+    for name in os.listdir(directory):
+        if name.startswith('v') and not name.endswith('.tmp') and name < version:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return ColumnarResults(columns)
+
+
+def LoadColumns(db_path, directory=None):
+    """Memory-maps the snapshot of `db_path`, rebuilding it first if the row count or the largest id changed.
+
+    Rows renamed in place (DatabaseUtils.UpdateExperimentNameColumn) keep both, remove the snapshot
+    directory to force a rebuild after that.
+    """
+    directory = directory or CacheDirectory(db_path)
+    state = _SourceState(db_path)
+    for attempt in xrange(loadAttempts):
+        version = _CurrentVersion(directory)
+        if _ReadMeta(version) != state:
+            BuildColumns(db_path, directory)
+            version = _CurrentVersion(directory)
+
+        if version is None:
+            # Pointer being replaced on Windows
+            time.sleep(0.1)
+            continue
+        try:
+            columns = {}
+            for name in os.listdir(version):
+                if name.endswith('.npy'):
+                    columns[name[:-len('.npy')]] = np.load(os.path.join(version, name), mmap_mode='r')
+            return ColumnarResults(columns)
+        except (IOError, OSError):
+            # The version was removed by a concurrent build after the pointer was read
+            if attempt == loadAttempts - 1:
+                raise
+    raise IOError('No snapshot in {}'.format(directory))
+
+
+def ColumnarStatistics(results, group_columns, tags):
+    """Same statistics as summary.LoadSummaryStatistics, computed from a snapshot"""
+    mask = results.Select(tags)
+    return GroupRows(results.Keys(group_columns, mask), results.Metrics(mask))
+
+
+def ColumnarPairedTests(results, other, group_columns, tags, correction=None):
+    """Same tests as significance.ComparePairedRuns, on two snapshots paired by parameters and seed"""
+    # Snapshots are ordered by id, so a configuration run more than once is represented by its latest run
+    latest = []
+    for snapshot in (results, other):
+        mask = snapshot.Select(tags)
+        latest.append(dict(zip(snapshot.Keys(parameterColumns, mask), np.flatnonzero(mask))))
+
+    pairs = sorted((row, latest[1][key]) for key, row in latest[0].items() if key in latest[1])
+    left = np.array([row for row, _ in pairs], dtype=np.intp)
+    right = np.array([row for _, row in pairs], dtype=np.intp)
+
+    keys = results.Keys(group_columns, left)
+    differences = results.Metrics()[left] - other.Metrics()[right]
+    return PairedTTests(keys, differences, correction)
+
+
+if __name__ == "__main__":
+    for db in sys.argv[1:]:
+        snapshot = BuildColumns(db)
+        print('{}: {} rows written to {}'.format(db, snapshot.rows, CacheDirectory(db)))
@@ -0,0 +1,419 @@
+from __future__ import print_function
+import argparse
+import hashlib
+import math
+import os
+import shutil
+import sys
+import time
+import numpy as np
+from grids import experimentGrids
+
+# Benchmark settings, as in GlobalVariables
+benchmarkR = 5.0
+benchmarkOffset = 10.0
+testExamples = 50000
+
+# Entries written for OneClassClassification.exe (see DatasetCache.cs), which loads them with OCC_DATA_GENERATOR=numpy
+cacheFormatVersion = '2'
+generatorName = 'numpy'
+
+# Independent random streams of one seed. Every part of a data set is drawn from its own stream, so that it
+# does not depend on how many candidates were drawn for the other parts (or on the block sizes)
+feasibleStream, mixtureStream, infeasibleStream, fixedFeasibleStream, fixedInfeasibleStream, homogenousStream = \
+    range(6)
+
+# Mixture fitting, as configured in DataGenerator.GenerateTrainingData
+mixtureInitializations = 100
+mixtureIterations = 10000
+mixtureTolerance = 1e-10
+# Deliberately differs from the program, which regularizes with double.Epsilon. Added to a covariance diagonal that
+# leaves it unchanged, so a component collapsing onto a few points would fail its Cholesky factorization here
+mixtureRegularization = 1e-9
+kMeansIterations = 100
+
+
+def RandomStream(seed, stream):
+    return np.random.RandomState([seed, stream])
+
+
+class Benchmark:
+    """Vectorized counterpart of the benchmarks of OneClassClassification.Benchmarks.
+
+    Examples are drawn uniformly from the box [low, high) and rows are classified at once by Feasible.
+    """
+
+    def __init__(self, dimensions, low, high):
+        self.dimensions = dimensions
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+
+    def Draw(self, rng, count):
+        return Uniform(rng, count, self.low, self.high)
+
+    def Feasible(self, x):
+        raise NotImplementedError
+
+
+class CircleBenchmark(Benchmark):
+    def __init__(self, dimensions):
+        centre = np.arange(1, dimensions + 1, dtype=np.float64)
+        Benchmark.__init__(self, dimensions, centre - 2 * benchmarkR, centre + 2 * benchmarkR)
+        self.centre = centre
+
+    def Feasible(self, x):
+        return np.sum((x - self.centre) ** 2, axis=1) < benchmarkR ** 2
+
+
+class CubeBenchmark(Benchmark):
+    def __init__(self, dimensions):
+        i = np.arange(1, dimensions + 1, dtype=np.float64)
+        Benchmark.__init__(self, dimensions, i - benchmarkR * i, i - benchmarkR * i + 3 * benchmarkR * i)
+        self.i = i
+
+    def Feasible(self, x):
+        return np.all((x >= self.i) & (x <= self.i + benchmarkR * self.i), axis=1)
+
+
+class SimplexBenchmark(Benchmark):
+    cot = 1 / math.tan(math.pi / 12)
+    tan = math.tan(math.pi / 12)
+
+    def __init__(self, dimensions):
+        Benchmark.__init__(self, dimensions, [-1.0] * dimensions, [2 + benchmarkR] * dimensions)
+        self.first, self.second = np.triu_indices(dimensions, 1)
+
+    def Feasible(self, x):
+        a = x[:, self.first]
+        b = x[:, self.second]
+        pairs = np.all((a * self.cot - b * self.tan >= 0) & (b * self.cot - a * self.tan >= 0), axis=1)
+        return pairs & (np.sum(x, axis=1) < benchmarkR)
+
+
+benchmarks = {
+    'circle': CircleBenchmark,
+    'cube': CubeBenchmark,
+    'simplex': SimplexBenchmark,
+}
+
+
+def Uniform(rng, count, low, high):
+    """`count` rows uniform in [low, high). Rows are taken from the stream in order, so drawing 2 blocks of n
+    rows gives the same rows as one block of 2n."""
+    return rng.random_sample((count, len(low))) * (high - low) + low
+
+
+def _LogSumExp(x):
+    top = np.max(x, axis=1)
+    top[~np.isfinite(top)] = 0
+    return top + np.log(np.sum(np.exp(x - top[:, np.newaxis]), axis=1))
+
+
+class GaussianMixture:
+    """Mixture of multivariate normal distributions, evaluated for blocks of rows at once"""
+
+    def __init__(self, weights, means, covariances):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.covariances = np.asarray(covariances, dtype=np.float64)
+        self._Factorize()
+
+    def _Factorize(self):
+        dimensions = self.means.shape[1]
+        self.precisionFactors = []
+        self.logNormalizers = []
+        for covariance in self.covariances:
+            factor = np.linalg.cholesky(covariance)
+            # Whitening matrix: rows times its transpose give squared Mahalanobis distances
+            self.precisionFactors.append(np.linalg.inv(factor).T)
+            self.logNormalizers.append(-0.5 * dimensions * math.log(2 * math.pi) - np.sum(np.log(np.diag(factor))))
+
+    def ComponentLogDensities(self, x):
+        """Log-density of every row under every component, weights included (rows x components)"""
+        result = np.empty((len(x), len(self.weights)))
+        for j in xrange(len(self.weights)):
+            white = np.dot(x - self.means[j], self.precisionFactors[j])
+            result[:, j] = math.log(self.weights[j]) + self.logNormalizers[j] - 0.5 * np.sum(white * white, axis=1)
+        return result
+
+    def LogDensity(self, x):
+        return _LogSumExp(self.ComponentLogDensities(x))
+
+    @staticmethod
+    def Fit(x, components, rng, initializations=mixtureInitializations, iterations=mixtureIterations,
+            tolerance=mixtureTolerance, regularization=mixtureRegularization):
+        """Expectation-maximization from `initializations` k-means starts; returns the mixture of the highest
+        likelihood. `regularization` is added to the covariance diagonals."""
+        best, best_likelihood = None, -np.inf
+        for _ in xrange(initializations):
+            mixture = GaussianMixture._KMeansStart(x, components, rng, regularization)
+            likelihood = -np.inf
+            for _ in xrange(iterations):
+                densities = mixture.ComponentLogDensities(x)
+                total = _LogSumExp(densities)
+                previous, likelihood = likelihood, np.mean(total)
+                mixture = GaussianMixture._Maximize(x, np.exp(densities - total[:, np.newaxis]), regularization)
+                if abs(likelihood - previous) <= tolerance * abs(likelihood):
+                    break
+            if likelihood > best_likelihood:
+                best, best_likelihood = mixture, likelihood
+        return best
+
+    @staticmethod
+    def _Maximize(x, responsibilities, regularization):
+        dimensions = x.shape[1]
+        counts = np.sum(responsibilities, axis=0) + 10 * np.finfo(np.float64).eps
+        means = np.dot(responsibilities.T, x) / counts[:, np.newaxis]
+        covariances = np.empty((len(counts), dimensions, dimensions))
+        for j in xrange(len(counts)):
+            centred = x - means[j]
+            covariances[j] = np.dot(responsibilities[:, j] * centred.T, centred) / counts[j] + \
+                regularization * np.eye(dimensions)
+        return GaussianMixture(counts / np.sum(counts), means, covariances)
+
+    @staticmethod
+    def _KMeansStart(x, components, rng, regularization):
+        """k-means++ seeding and Lloyd iterations; hard assignments become the first responsibilities"""
+        centres = [x[rng.randint(len(x))]]
+        distances = np.sum((x - centres[0]) ** 2, axis=1)
+        for _ in xrange(1, components):
+            total = np.sum(distances)
+            choice = rng.randint(len(x)) if total == 0 else \
+                min(np.searchsorted(np.cumsum(distances), rng.random_sample() * total), len(x) - 1)
+            centres.append(x[choice])
+            distances = np.minimum(distances, np.sum((x - x[choice]) ** 2, axis=1))
+        centres = np.array(centres)
+
+        labels = None
+        for _ in xrange(kMeansIterations):
+            squared = np.sum(x * x, axis=1)[:, np.newaxis] - 2 * np.dot(x, centres.T) + np.sum(centres * centres, axis=1)
+            new_labels = np.argmin(squared, axis=1)
+            if labels is not None and np.array_equal(labels, new_labels):
+                break
+            labels = new_labels
+            for j in xrange(components):
+                members = x[labels == j]
+                if len(members):
+                    centres[j] = members.mean(axis=0)
+
+        responsibilities = np.zeros((len(x), components))
+        responsibilities[np.arange(len(x)), labels] = 1
+        # An empty cluster starts from the whole data set
+        empty = responsibilities.sum(axis=0) == 0
+        responsibilities[:, empty] = 1.0 / len(x)
+        return GaussianMixture._Maximize(x, responsibilities, regularization)
+
+
+class AcceptanceStatistics:
+    """Candidates drawn and accepted by a RejectionSampler, in total and per block"""
+
+    def __init__(self, name=''):
+        self.name = name
+        self.candidates = 0
+        self.accepted = 0
+        self.blocks = []
+        self.seconds = 0.0
+
+    def Record(self, candidates, accepted):
+        self.candidates += candidates
+        self.accepted += accepted
+        self.blocks.append((candidates, accepted))
+
+    @property
+    def rate(self):
+        return float(self.accepted) / self.candidates if self.candidates else float('nan')
+
+    def __str__(self):
+        return '{:24} {:10} of {:12} accepted ({:.3%}) in {} blocks, {:.2f}s' \
+            .format(self.name, self.accepted, self.candidates, self.rate, len(self.blocks), self.seconds)
+
+
+class RejectionSampler:
+    """Rejection sampling in blocks. `draw(rng, n)` returns n candidate rows, `accept(rows)` a boolean mask.
+
+    The size of every next block is the number of rows still missing divided by the acceptance rate observed so
+    far (times `headroom`), within [min_block, max_block]. Accepted rows are taken in the order of the stream,
+    so the result is the same for any block sizes.
+    """
+
+    def __init__(self, draw, accept, initial_block=1024, min_block=256, max_block=1 << 18, headroom=1.2,
+                 max_candidates=None):
+        self.draw = draw
+        self.accept = accept
+        self.initial_block = initial_block
+        self.min_block = min_block
+        self.max_block = max_block
+        self.headroom = headroom
+        self.max_candidates = max_candidates
+
+    def _NextBlock(self, statistics, missing, block):
+        if statistics.accepted == 0:
+            return min(2 * block, self.max_block)
+        wanted = int(math.ceil(missing / statistics.rate * self.headroom))
+        return max(self.min_block, min(wanted, self.max_block))
+
+    def Sample(self, count, rng, statistics=None):
+        """Returns `count` accepted rows and the AcceptanceStatistics of the draw"""
+        statistics = statistics or AcceptanceStatistics()
+        start = time.time()
+        parts = []
+        found = 0
+        block = self.initial_block
+        while found < count:
+            if self.max_candidates is not None and statistics.candidates >= self.max_candidates:
+                raise RuntimeError('{} rows accepted out of {} candidates, {} needed'
+                                   .format(found, statistics.candidates, count))
+            candidates = self.draw(rng, block)
+            accepted = candidates[self.accept(candidates)]
+            statistics.Record(block, len(accepted))
+            parts.append(accepted[:count - found])
+            found += len(parts[-1])
+            block = self._NextBlock(statistics, count - found, block)
+
+        statistics.seconds += time.time() - start
+        result = np.concatenate(parts) if parts else np.empty((0, 0))
+        return result, statistics
+
+
+class GeneratedData:
+    """Data set of one configuration, laid out like the fields of DataGenerator"""
+
+    def __init__(self, training, fixed_test, homogenous_test, boundaries, eps, statistics, fit_seconds):
+        self.training = training
+        self.fixed_test = fixed_test
+        self.homogenous_test = homogenous_test
+        self.boundaries = boundaries
+        self.eps = eps
+        self.statistics = statistics
+        self.fit_seconds = fit_seconds
+
+
+def _Labelled(rows, label):
+    return np.column_stack([rows, np.full(len(rows), label, dtype=np.float64)])
+
+
+def GenerateData(benchmark, dimensions, feasible_examples, k, components, seed, test_examples=testExamples,
+                 initializations=mixtureInitializations, sampler_options=None):
+    """Generates training and test data like DataGenerator, with batched rejection sampling.
+
+    Infeasible training examples are drawn from the feasible bounding box widened by `k` times its size and
+    accepted where the mixture fitted to the feasible examples has a density not above its minimum over them.
+    """
+    benchmark = benchmarks[benchmark](dimensions)
+    sampler_options = sampler_options or {}
+    statistics = []
+
+    def Sample(name, stream, draw, accept, count):
+        sampler = RejectionSampler(draw, accept, **sampler_options)
+        rows, stats = sampler.Sample(count, RandomStream(seed, stream), AcceptanceStatistics(name))
+        statistics.append(stats)
+        return rows.reshape(count, dimensions)
+
+    feasible = Sample('training feasible', feasibleStream, benchmark.Draw, benchmark.Feasible, feasible_examples)
+
+    start = time.time()
+    mixture = GaussianMixture.Fit(feasible, components, RandomStream(seed, mixtureStream), initializations)
+    minimal_density = np.min(mixture.LogDensity(feasible))
+    fit_seconds = time.time() - start
+
+    low, high = feasible.min(axis=0), feasible.max(axis=0)
+    margin = k * (high - low)
+    boundaries = np.column_stack([low - margin, high + margin])
+    infeasible = Sample('training infeasible', infeasibleStream,
+                        lambda rng, n: Uniform(rng, n, boundaries[:, 0], boundaries[:, 1]),
+                        lambda x: mixture.LogDensity(x) <= minimal_density,
+                        int(feasible_examples * math.pow(dimensions, 2.0)))
+
+    fixed_test = np.concatenate([
+        _Labelled(Sample('test feasible', fixedFeasibleStream, benchmark.Draw, benchmark.Feasible, test_examples),
+                  1.0),
+        _Labelled(Sample('test infeasible', fixedInfeasibleStream, benchmark.Draw,
+                         lambda x: ~benchmark.Feasible(x), test_examples), 0.0)])
+
+    homogenous = benchmark.Draw(RandomStream(seed, homogenousStream), 2 * test_examples)
+    homogenous_test = _Labelled(homogenous, 0.0)
+    homogenous_test[:, -1] = benchmark.Feasible(homogenous)
+
+    training = np.concatenate([_Labelled(feasible, 1.0), _Labelled(infeasible, 0.0)])
+    # DataGenerator keeps the Eps of the last variable
+    return GeneratedData(training, fixed_test, homogenous_test, boundaries, margin[-1], statistics, fit_seconds)
+
+
+def _RoundTrip(value):
+    """Formats a number like .NET's ToString("R") does for the values used in the grids"""
+    value = float(value)
+    return '{:d}'.format(int(value)) if value.is_integer() else repr(value)
+
+
+def CacheKey(benchmark, dimensions, feasible_examples, k, seed, components, test_examples=testExamples,
+             generator=generatorName):
+    """Key of a data set in the dataset cache, computed like DatasetCache.Key"""
+    parameters = '|'.join([cacheFormatVersion, generator, benchmark.lower(), '{:d}'.format(dimensions),
+                           '{:d}'.format(feasible_examples), '{:d}'.format(int(feasible_examples * dimensions ** 2.0)),
+                           _RoundTrip(k), '{:d}'.format(seed), '{:d}'.format(components),
+                           '{:d}'.format(test_examples), _RoundTrip(benchmarkR), _RoundTrip(benchmarkOffset)])
+    return hashlib.sha256(parameters.encode('utf-8')).hexdigest()
+
+
+def StoreData(directory, key, data):
+    """Writes a data set into the dataset cache, replacing nothing: an existing entry is kept"""
+    entry = os.path.join(directory, key)
+    if os.path.isdir(entry):
+        return False
+
+    temporary = '{}.tmp{}'.format(entry, os.getpid())
+    if os.path.isdir(temporary):
+        shutil.rmtree(temporary)
+    os.makedirs(temporary)
+    try:
+        for name, values in (('training', data.training), ('fixed_test', data.fixed_test),
+                             ('homogenous_test', data.homogenous_test), ('boundries', data.boundaries),
+                             ('eps', np.array([[data.eps]]))):
+            np.save(os.path.join(temporary, '{}.npy'.format(name)), np.ascontiguousarray(values, dtype='<f8'))
+        os.rename(temporary, entry)
+    except OSError:
+        # Written by another process meanwhile
+        if not os.path.isdir(entry):
+            raise
+        return False
+    finally:
+        if os.path.isdir(temporary):
+            shutil.rmtree(temporary)
+    return True
+
+
+def DataConfigurations(configurations):
+    """Distinct data generation parameters of the configurations, in their order"""
+    seen = set()
+    for configuration in configurations:
+        parameters = (configuration.Benchmark, configuration.Dimensions, configuration.FeasibleExamples,
+                      configuration.K, configuration.Seed, configuration.Components)
+        if parameters not in seen:
+            seen.add(parameters)
+            yield parameters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generates the data sets of an experiment into the dataset cache')
+    parser.add_argument('experiment', choices=sorted(experimentGrids))
+    parser.add_argument('cache', help='dataset cache directory (OCC_DATASET_CACHE)')
+    parser.add_argument('--seeds', type=int, default=30, help='number of seeds of every configuration')
+    parser.add_argument('--initializations', type=int, default=mixtureInitializations)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.cache):
+        os.makedirs(args.cache)
+    for benchmark, dimensions, examples, k, seed, components in \
+            DataConfigurations(experimentGrids[args.experiment](xrange(args.seeds))):
+        key = CacheKey(benchmark, dimensions, examples, k, seed, components)
+        if os.path.isdir(os.path.join(args.cache, key)):
+            continue
+        data = GenerateData(benchmark, dimensions, examples, k, components, seed,
+                            initializations=args.initializations)
+        StoreData(args.cache, key, data)
+        print('== {} {}d {} examples, seed {}, {} components'.format(benchmark, dimensions, examples, seed,
+                                                                     components))
+        print('{:24} {:.2f}s'.format('mixture fit', data.fit_seconds))
+        for stats in data.statistics:
+            print(stats)
+        sys.stdout.flush()
@@ -0,0 +1,96 @@
+import math
+import numpy as np
+
+# Iterations of the continued fraction of the incomplete beta function (converges in far fewer for our dofs)
+betaIterations = 300
+betaEpsilon = 3e-16
+# Bisection steps of StudentQuantile, each halves the bracket
+quantileIterations = 100
+
+
+def _BetaContinuedFraction(a, b, x):
+    # Modified Lentz's method, element-wise (Numerical Recipes, betacf)
+    tiny = 1e-300
+    c = np.ones_like(x)
+    d = 1 - (a + b) * x / (a + 1)
+    d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+    h = d.copy()
+
+    for m in range(1, betaIterations + 1):
+        m2 = 2 * m
+        for numerator in (m * (b - m) * x / ((a + m2 - 1) * (a + m2)),
+                          -(a + m) * (a + b + m) * x / ((a + m2) * (a + m2 + 1))):
+            d = 1 + numerator * d
+            d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+            c = 1 + numerator / c
+            c = np.where(np.abs(c) < tiny, tiny, c)
+            delta = d * c
+            h *= delta
+        if np.all(np.abs(delta - 1) < betaEpsilon):
+            break
+    return h
+
+
+def RegularizedBeta(a, b, x):
+    """Regularized incomplete beta function I_x(a, b), element-wise"""
+    a, b, x = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in (a, b, x)])
+    result = np.full(x.shape, np.nan)
+
+    inside = (x > 0) & (x < 1)
+    result[x <= 0] = 0
+    result[x >= 1] = 1
+    if not inside.any():
+        return result
+
+    a, b, x = a[inside], b[inside], x[inside]
+    lgamma = np.vectorize(math.lgamma, otypes=[np.float64])
+    front = np.exp(lgamma(a + b) - lgamma(a) - lgamma(b) + a * np.log(x) + b * np.log1p(-x))
+
+    # The continued fraction converges quickly only for x < (a + 1) / (a + b + 2), otherwise I_x(a, b) = 1 - I_1-x(b, a)
+    direct = x < (a + 1) / (a + b + 2)
+    value = np.empty(x.shape)
+    value[direct] = front[direct] * _BetaContinuedFraction(a[direct], b[direct], x[direct]) / a[direct]
+    flipped = ~direct
+    value[flipped] = 1 - front[flipped] * _BetaContinuedFraction(b[flipped], a[flipped], 1 - x[flipped]) / b[flipped]
+
+    result[inside] = value
+    return result
+
+
+def StudentTwoSidedP(t, dof):
+    """Two-sided p-value P(|T| >= |t|) of Student's t distribution with `dof` degrees of freedom"""
+    t = np.asarray(t, dtype=np.float64)
+    dof = np.asarray(dof, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = RegularizedBeta(dof / 2, 0.5, dof / (dof + t * t))
+        p[np.isinf(t) & (dof > 0)] = 0
+    return p
+
+
+def StudentQuantile(level, dof):
+    """Critical value t with P(|T| <= t) = `level` for Student's t distribution, element-wise in `dof`"""
+    dof = np.asarray(dof, dtype=np.float64)
+    result = np.full(dof.shape, np.nan)
+    with np.errstate(invalid='ignore'):
+        valid = dof > 0
+    if not valid.any():
+        return result
+
+    dof = dof[valid]
+    alpha = 1 - level
+    low = np.zeros(dof.shape)
+    high = np.ones(dof.shape)
+    while True:
+        too_low = StudentTwoSidedP(high, dof) > alpha
+        if not too_low.any():
+            break
+        high[too_low] *= 2
+
+    for _ in range(quantileIterations):
+        middle = (low + high) / 2
+        above = StudentTwoSidedP(middle, dof) > alpha
+        low = np.where(above, middle, low)
+        high = np.where(above, high, middle)
+
+    result[valid] = (low + high) / 2
+    return result
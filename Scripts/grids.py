@@ -0,0 +1,64 @@
+from collections import namedtuple
+
+# Applicaction configuation
+feasibleExamples = 500
+k = 1
+treeJoin = 10
+treeHeight = 10
+benchmarks = {'circle', 'cube', 'simplex'}
+seeds = range(0, 30)
+dimensionsRange = range(3, 8, 1)
+
+# Single run of OneClassClassification.exe. Fields follow the order of the program's arguments
+# and are named after the columns of the experiments table.
+Configuration = namedtuple('Configuration', ['FeasibleExamples', 'Dimensions', 'K', 'Join', 'MaxHeight', 'Seed',
+                                             'Benchmark', 'Components', 'ExperimentName'])
+
+
+def Arguments(configuration):
+    return ['{}'.format(value) for value in configuration]
+
+
+def ComponentsGrid(seed_range=seeds):
+    components_arr = [0.5, 1, 2]
+
+    for seed in seed_range:
+        for ben in benchmarks:
+            for dimensions in dimensionsRange:
+                for c in components_arr:
+                    components = int(round(dimensions * c))
+                    yield Configuration(feasibleExamples, dimensions, k, treeJoin, treeHeight, seed, ben,
+                                        components, 'Components')
+
+
+def TreeParametersGrid(experiment_name, seed_range=seeds):
+    multiplier_arr = [1, 1.5, 2]
+
+    for seed in seed_range:
+        for ben in benchmarks:
+            for dimension in dimensionsRange:
+                for m1 in multiplier_arr:
+                    j = int((round(m1 * dimension)))
+
+                    for m2 in multiplier_arr:
+                        max_height = int(round(m2 * j))
+                        yield Configuration(feasibleExamples, dimension, k, j, max_height, seed, ben,
+                                            dimension, experiment_name)
+
+
+def ExamplesGrid(seed_range=seeds):
+    for seed in seed_range:
+        for ben in benchmarks:
+            for dimension in dimensionsRange:
+                for examples in range(100, 501, 100):
+                    j = int(round(dimension * 2.0))
+                    height = int(round(j * 2.0))
+                    yield Configuration(examples, dimension, k, j, height, seed, ben, dimension, 'Examples')
+
+
+experimentGrids = {
+    'components': ComponentsGrid,
+    'tree': lambda seed_range=seeds: TreeParametersGrid('Tree', seed_range),
+    'pruned-tree': lambda seed_range=seeds: TreeParametersGrid('PrunedTree', seed_range),
+    'examples': ExamplesGrid,
+}
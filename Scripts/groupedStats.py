@@ -0,0 +1,216 @@
+import numpy as np
+from distributions import StudentQuantile
+
+# Rows fetched from a cursor at once when aggregating a query result
+blockSize = 10000
+
+# Metrics shown in every report table, in the order of the table columns
+metricNames = ('Constraints', 'Terms', 'Jaccard', 'Precision', 'Recall', 'MeanAngle')
+
+
+def MetricsSelectString(prefix=''):
+    """SQL expressions of the metrics, on columns of the table aliased `prefix` (e.g. 'a.')"""
+    return "{0}Constraints, {0}Terms, {0}HJaccard, CAST({0}HTP AS float)/({0}HTP+{0}HFN), " \
+           "CAST({0}HTP AS float)/({0}HTP+{0}HFP), {0}MeanAngle".format(prefix)
+
+
+metricsSelectString = MetricsSelectString()
+
+
+class GroupedStatistics:
+    """Mean, standard deviation, min, max and sample count of every metric per group.
+
+    All arrays have shape (groups, metrics); a metric that has no values in a group
+    has n = 0 and NaN everywhere else.
+    """
+
+    def __init__(self, keys, n, mean, m2, minimum, maximum):
+        self.keys = keys
+        self.index = dict((key, i) for i, key in enumerate(keys))
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.min = minimum
+        self.max = maximum
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def Std(self):
+        # Population deviation, undefined for less than two samples
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / self.n)
+        std[self.n < 2] = np.nan
+        return std
+
+    def Variance(self, ddof=1):
+        """Sample variance by default, undefined for n <= ddof"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = self.m2 / (self.n - ddof)
+        variance[self.n <= ddof] = np.nan
+        return variance
+
+    def StandardError(self):
+        """Standard error of the mean"""
+        with np.errstate(invalid='ignore'):
+            return np.sqrt(self.Variance() / self.n)
+
+    def ConfidenceInterval(self, level=0.95):
+        """Bounds of the Student's t confidence interval of every mean"""
+        half_width = StudentQuantile(level, self.n - 1) * self.StandardError()
+        return self.mean - half_width, self.mean + half_width
+
+    def Means(self, key):
+        return _ToList(self.mean, self.index.get(key))
+
+    def AvgStdRow(self, key):
+        """Row in the layout expected by writeAvgStdRows: means followed by deviations"""
+        i = self.index.get(key)
+        return _ToList(self.mean, i) + _ToList(self.Std(), i)
+
+
+def _ToList(arr, i):
+    if i is None:
+        return [None] * arr.shape[1]
+    return [None if np.isnan(x) else float(x) for x in arr[i]]
+
+
+def _AsMatrix(arr, rows):
+    # reshape(0, -1) is ambiguous, an empty input keeps the number of columns it has
+    arr = np.asarray(arr, dtype=np.float64)
+    if rows == 0:
+        return arr.reshape(0, arr.shape[-1] if arr.ndim > 1 else 0)
+    return arr.reshape(rows, -1)
+
+
+def _GroupIds(keys):
+    index = {}
+    ids = np.array([index.setdefault(key, len(index)) for key in keys], dtype=np.intp)
+    groups = [None] * len(index)
+    for key, i in index.items():
+        groups[i] = key
+    return ids, groups
+
+
+def _GroupExtremes(ids, values, groups, reduce_at, initial):
+    result = np.full(groups, initial)
+    reduce_at(result, ids, values)
+    result[np.isinf(result)] = np.nan
+    return result
+
+
+def GroupRows(keys, values):
+    """Computes per-group statistics for `values` (rows x metrics) in one vectorized pass.
+
+    `keys` holds one hashable group key per row. NaN values are skipped the same way
+    SQL aggregates skip NULLs.
+    """
+    ids, groups = _GroupIds(keys)
+
+    values = _AsMatrix(values, len(ids))
+    metrics = values.shape[1]
+    shape = (len(groups), metrics)
+
+    n = np.zeros(shape)
+    mean = np.full(shape, np.nan)
+    m2 = np.full(shape, np.nan)
+    minimum = np.full(shape, np.nan)
+    maximum = np.full(shape, np.nan)
+
+    for m in range(metrics):
+        column = values[:, m]
+        valid = ~np.isnan(column)
+        column_ids = ids[valid]
+        column = column[valid]
+
+        count = np.bincount(column_ids, minlength=len(groups)).astype(np.float64)
+        present = count > 0
+        total = np.bincount(column_ids, weights=column, minlength=len(groups))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            group_mean = total / count
+        deviation = column - group_mean[column_ids]
+
+        n[:, m] = count
+        mean[:, m] = group_mean
+        m2[present, m] = np.bincount(column_ids, weights=deviation * deviation,
+                                     minlength=len(groups))[present]
+
+        minimum[:, m] = _GroupExtremes(column_ids, column, len(groups), np.minimum.at, np.inf)
+        maximum[:, m] = _GroupExtremes(column_ids, column, len(groups), np.maximum.at, -np.inf)
+
+    return GroupedStatistics(groups, n, mean, m2, minimum, maximum)
+
+
+def MergeGroups(keys, n, mean, m2, minimum, maximum):
+    """Combines already aggregated groups (one row per input group) into the groups given by `keys`.
+
+    Uses the pairwise update of Chan et al., so the result equals aggregating the raw rows.
+    """
+    ids, groups = _GroupIds(keys)
+    n, mean, m2, minimum, maximum = [_AsMatrix(a, len(ids)) for a in (n, mean, m2, minimum, maximum)]
+    shape = (len(groups), n.shape[1])
+
+    total_n = np.zeros(shape)
+    total_mean = np.full(shape, np.nan)
+    total_m2 = np.full(shape, np.nan)
+    total_min = np.full(shape, np.nan)
+    total_max = np.full(shape, np.nan)
+
+    for m in range(n.shape[1]):
+        valid = n[:, m] > 0
+        part_ids = ids[valid]
+        part_n = n[valid, m]
+        part_mean = mean[valid, m]
+
+        count = np.bincount(part_ids, weights=part_n, minlength=len(groups))
+        present = count > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            group_mean = np.bincount(part_ids, weights=part_n * part_mean, minlength=len(groups)) / count
+        shift = part_mean - group_mean[part_ids]
+        group_m2 = np.bincount(part_ids, weights=m2[valid, m] + part_n * shift * shift, minlength=len(groups))
+
+        total_n[:, m] = count
+        total_mean[:, m] = group_mean
+        total_m2[present, m] = group_m2[present]
+        total_min[:, m] = _GroupExtremes(part_ids, minimum[valid, m], len(groups), np.minimum.at, np.inf)
+        total_max[:, m] = _GroupExtremes(part_ids, maximum[valid, m], len(groups), np.maximum.at, -np.inf)
+
+    return GroupedStatistics(groups, total_n, total_mean, total_m2, total_min, total_max)
+
+
+def CombineStatistics(statistics):
+    """Merges statistics computed separately (e.g. per block, shard or database file) group by group"""
+    statistics = [stats for stats in statistics if stats.keys]
+    if not statistics:
+        return GroupRows([], np.empty((0, 0)))
+    if len(statistics) == 1:
+        return statistics[0]
+
+    keys = [key for stats in statistics for key in stats.keys]
+    return MergeGroups(keys, *[np.vstack([getattr(stats, moment) for stats in statistics])
+                               for moment in ('n', 'mean', 'm2', 'min', 'max')])
+
+
+def AggregateCursor(c, width, metrics, block_size=blockSize):
+    """Groups the remaining rows of an executed query by their first `width` columns.
+
+    Rows are fetched in blocks of `block_size`, every block is aggregated with GroupRows and
+    folded into the running result, so the whole result set is never held in memory.
+    """
+    total = GroupRows([], np.empty((0, metrics)))
+    while True:
+        rows = c.fetchmany(block_size)
+        if not rows:
+            return total
+        keys = [tuple(row[:width]) for row in rows]
+        values = np.array([row[width:] for row in rows], dtype=np.float64).reshape(len(rows), metrics)
+        total = CombineStatistics([total, GroupRows(keys, values)])
+
+
+def LoadGroupedStatistics(c, group_columns, where_str, params=(), block_size=blockSize):
+    """Aggregates every row matching `where_str` by `group_columns`"""
+    columns = ', '.join('[{}]'.format(column) for column in group_columns)
+    c.execute("SELECT {}, {} FROM experiments WHERE {}".format(columns, metricsSelectString, where_str),
+              params)
+    return AggregateCursor(c, len(group_columns), len(metricNames), block_size)
@@ -0,0 +1,135 @@
+from __future__ import print_function
+import math
+import os
+import sqlite3
+import numpy as np
+from groupedStats import MetricsSelectString, metricNames
+from grids import Configuration, feasibleExamples, k
+
+# Candidates of the search: Join and MaxHeight multipliers as in TreeParametersGrid, Components as in ComponentsGrid
+treeMultipliers = (1, 1.5, 2)
+componentsMultipliers = (0.5, 1, 2)
+searchExperimentName = 'Search'
+
+# Objectives maximized by the search: the mean Jaccard index, less `weight` times the mean of a size metric
+objectiveCosts = {'jaccard': None, 'constraints': 'Constraints', 'terms': 'Terms'}
+
+minimumSeeds = 3
+reduction = 3
+maximumSeeds = 27
+
+
+def Candidates(benchmark, dimensions, search_components=True):
+    """Configurations (without a seed) of one benchmark and number of dimensions, without duplicates"""
+    components = [int(round(dimensions * c)) for c in componentsMultipliers] if search_components else [dimensions]
+    candidates = []
+    for m1 in treeMultipliers:
+        join = int(round(m1 * dimensions))
+        for m2 in treeMultipliers:
+            for count in components:
+                candidate = Configuration(feasibleExamples, dimensions, k, join, int(round(m2 * join)), None,
+                                          benchmark, max(count, 1), searchExperimentName)
+                if candidate not in candidates:
+                    candidates.append(candidate)
+    return candidates
+
+
+def _Key(configuration):
+    return configuration.Join, configuration.MaxHeight, configuration.Components
+
+
+def LoadResults(conn, benchmark, dimensions):
+    """Metrics of the runs of one benchmark and number of dimensions by (Join, MaxHeight, Components) and seed.
+
+    Runs of every experiment count, since they are the same runs. A failed run without a successful repetition
+    maps to None: it is not repeated and does not count in the objective"""
+    results = {}
+    rows = conn.execute("SELECT [Join], MaxHeight, Components, Seed, Errors = '', {} FROM experiments "
+                        "WHERE Benchmark = ? AND Dimensions = ? AND FeasibleExamples = ? AND K = ? ORDER BY id"
+                        .format(MetricsSelectString()), (benchmark, dimensions, feasibleExamples, k))
+    for row in rows:
+        seeds = results.setdefault(tuple(row[:3]), {})
+        if row[4]:
+            seeds[row[3]] = np.array(row[5:], dtype=np.float64)
+        else:
+            seeds.setdefault(row[3], None)
+    return results
+
+
+def Score(metrics, objective='jaccard', weight=0.0):
+    """Objective of a candidate from the metrics of its runs; -inf without successful runs"""
+    metrics = [values for values in metrics if values is not None]
+    if not metrics:
+        return -np.inf
+    means = np.nanmean(np.array(metrics), axis=0)
+    score = means[metricNames.index('Jaccard')]
+    if objectiveCosts[objective] is not None:
+        score -= weight * means[metricNames.index(objectiveCosts[objective])]
+    return -np.inf if np.isnan(score) else float(score)
+
+
+class Rung:
+    """Candidates evaluated on the first `seeds` seeds and their scores, best first"""
+
+    def __init__(self, seeds, candidates, scores):
+        order = sorted(range(len(candidates)), key=lambda i: -scores[i])
+        self.seeds = seeds
+        self.candidates = [candidates[i] for i in order]
+        self.scores = [scores[i] for i in order]
+
+
+def HalvingPlan(conn, benchmark, dimensions, search_components=True, objective='jaccard', weight=0.0,
+                min_seeds=minimumSeeds, eta=reduction, max_seeds=maximumSeeds):
+    """Successive halving over the candidates of one benchmark and number of dimensions.
+
+    All candidates are evaluated on `min_seeds` seeds, the best 1/`eta` of them are promoted to `eta` times as
+    many seeds, and so on until one candidate is left or `max_seeds` is reached. The state is read from the
+    results, so the plan can be recomputed at any time. Returns the configurations of the current rung which
+    were not run yet (empty when the search is finished) and the completed rungs.
+    """
+    results = LoadResults(conn, benchmark, dimensions) if conn is not None else {}
+    candidates = Candidates(benchmark, dimensions, search_components)
+    seeds = min(min_seeds, max_seeds)
+    rungs = []
+    while True:
+        missing = [candidate._replace(Seed=seed) for candidate in candidates for seed in xrange(seeds)
+                   if seed not in results.get(_Key(candidate), {})]
+        if missing:
+            return missing, rungs
+
+        scores = [Score([results[_Key(candidate)][seed] for seed in xrange(seeds)], objective, weight)
+                  for candidate in candidates]
+        rungs.append(Rung(seeds, candidates, scores))
+        if len(candidates) == 1 or seeds >= max_seeds:
+            return [], rungs
+        candidates = rungs[-1].candidates[:max(1, int(math.ceil(len(candidates) / float(eta))))]
+        seeds = min(seeds * eta, max_seeds)
+
+
+def SearchPlan(db_path, brackets, **options):
+    """HalvingPlan of every (benchmark, dimensions) in `brackets`: the runs of their current rungs and
+    {(benchmark, dimensions): completed rungs}"""
+    conn = sqlite3.connect(db_path) if db_path and os.path.exists(db_path) else None
+    try:
+        if conn is not None and not conn.execute("SELECT COUNT(*) FROM sqlite_master "
+                                                 "WHERE name = 'experiments'").fetchone()[0]:
+            conn.close()
+            conn = None
+        runs, rungs = [], {}
+        for benchmark, dimensions in brackets:
+            missing, rungs[(benchmark, dimensions)] = HalvingPlan(conn, benchmark, dimensions, **options)
+            runs += missing
+        return runs, rungs
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def PrintRungs(rungs):
+    print('Benchmark\tDimensions\tSeeds\tCandidates\tJoin\tMaxHeight\tComponents\tScore')
+    for (benchmark, dimensions), completed in sorted(rungs.items()):
+        for rung in completed:
+            best = rung.candidates[0]
+            print('{}\t{}\t{}\t{}\t{}\t{}\t{}\t{:.4f}'.format(benchmark, dimensions, rung.seeds, len(rung.candidates),
+                                                            best.Join, best.MaxHeight, best.Components,
+                                                            rung.scores[0]))
@@ -1,107 +1,103 @@
+from __future__ import print_function
+import argparse
+import hashlib
+import json
+import os
 import sqlite3
-import math
-import numpy as np
-
-ConstraintsStd = 'ConstraintsStd'
-TermsStd = 'TermsStd'
-JaccardStd = 'JaccardStd'
-PrecisionStd = 'PrecisionStd'
-RecallStd = 'RecallStd'
-MeanAngleStd = 'MeanAngleStd'
+from collections import namedtuple
+from multiprocessing import Pool, cpu_count
+from columnar import ColumnarPairedTests, ColumnarStatistics, LoadColumns
+from schema import HasTag, Migrate
+from shards import LoadShardedStatistics, UnmergedShardPaths
+from significance import ComparePairedRuns
+from summary import RefreshSummary, LoadSummaryStatistics, summaryRowsQuery
+
 cellBarMaxHeight = 7
 tikzString = '\\begin{{tikzpicture}}[baseline=0.4pt]' \
              '\\draw[line width=2](0,0pt) -- (0,{}pt);' \
              '\\end{{tikzpicture}}'
-avgStdStatisticsString = "AVG(Constraints), AVG(terms), AVG(HJaccard), " \
-                         "AVG(CAST(HTP AS float)/(HTP+HFN)), AVG(CAST(HTP AS float)/(HTP+HFP)), " \
-                         "AVG(Meanangle), ConstraintsStd, TermsStd, JaccardStd, PrecisionStd, " \
-                         "RecallStd, MeanAngleStd"
-t_threshold = 2.045
-
-cccfactor = 0
-cctfactor = 0
-ccjfactor = 0
-ccpfactor = 0
-ccrfactor = 0
-ccmfactor = 0
-
-
-class StdevFunc:
-    def __init__(self):
-        self.M = 0.0
-        self.S = 0.0
-        self.k = 1
-
-    def step(self, value):
-        if value is None:
-            return
-        t_m = self.M
-        self.M += (value - t_m) / self.k
-        self.S += (value - t_m) * (value - self.M)
-        self.k += 1
-
-    def finalize(self):
-        if self.k < 3:
-            return None
-        return math.sqrt(self.S / (self.k - 1))
-
-
-def CreateIfColumnNotExists(c, columnName):
-    c.execute("PRAGMA table_info(experiments)")
-    name = c.fetchone()
-    find = 0
-    while name is not None:
-        if name[1] == columnName:
-            find = 1
-        name = c.fetchone()
-    if find == 0:
-        c.execute("ALTER TABLE experiments ADD {} NUMERIC".format(columnName))
-
-
-def CheckTable(c):
-    CreateIfColumnNotExists(c, ConstraintsStd)
-    CreateIfColumnNotExists(c, TermsStd)
-    CreateIfColumnNotExists(c, JaccardStd)
-    CreateIfColumnNotExists(c, PrecisionStd)
-    CreateIfColumnNotExists(c, RecallStd)
-    CreateIfColumnNotExists(c, MeanAngleStd)
-
-
-def CalculateStdevAndSaveToDb(c, where_str, arr):
-    c.execute("select stdev(Constraints), stdev(Terms), stdev(HJaccard), "
-              "stdev(CAST(HTP AS float)/(HTP+HFN)), stdev(CAST(HTP AS float)/(HTP+HFP)), "
-              "stdev(MeanAngle) from experiments WHERE {}".format(where_str), arr)
-    results = list(c.fetchone())
-    results = results + arr
-
-    s = "UPDATE experiments SET {} = ?, {} = ?, {} = ?, {} = ?, {} = ?, " \
-        "{} = ? WHERE {}".format(ConstraintsStd, TermsStd, JaccardStd, PrecisionStd,
-                                 RecallStd, MeanAngleStd, where_str)
-    c.execute(s, results)  # REQUIRES COMMIT
-
-
-def CalculateTTestPValue(c_main, c_pruning, where_str, arr):
-    query = "SELECT Constraints, Terms, HJaccard, (CAST(HTP AS float)/(HTP+HFN))," \
-            "(CAST(HTP AS float)/(HTP+HFP)), MeanAngle FROM experiments WHERE {} ORDER BY Seed ASC" \
-        .format(where_str)
-
-    arr1 = np.array(c_main.execute(query, arr).fetchall(), dtype=np.float64)
-    arr1[np.isnan(arr1)] = 0
-
-    arr2 = np.array(c_pruning.execute(query, arr).fetchall(), dtype=np.float64)
-    arr2[np.isnan(arr2)] = 0
-
-    if np.shape(arr1)[0] != np.shape(arr2)[0]:
-        return [False, False, False, False, False, False]
-
-    diff_arr = np.subtract(arr1, arr2)
-    mu_avg = np.average(diff_arr, axis=0)
-
-    std_diff = np.std(diff_arr, axis=0)
-
-    dof = np.shape(diff_arr)[0]
-    t = abs(np.divide(mu_avg, (std_diff / math.sqrt(dof))))
-    return [p > t_threshold for p in t]
+# Paired t-test against treePruningDb.sqlite: significance level and multiple comparison correction
+# (None, 'bonferroni', 'holm' or 'fdr_bh') applied over all cells of a table
+significanceLevel = 0.05
+pValueCorrection = None
+# Read memory-mapped column snapshots (columnar.py) instead of the summary table and SQL joins
+columnarCache = False
+
+componentsTags = ('Components',)
+treeTags = ('Tree', 'PrunedTree')
+examplesTags = ('Examples',)
+treeColumns = ('Benchmark', 'Dimensions', 'Join', 'MaxHeight')
+
+# Hashes of the inputs of the tables last written, kept next to them (see BuildReport)
+manifestFile = 'latexTables.json'
+scriptsDirectory = os.path.dirname(os.path.abspath(__file__))
+# Modules computing the tables; a change to any of them makes every table stale
+rendererModules = ('latexTable', 'columnar', 'distributions', 'groupedStats', 'shards', 'significance', 'summary')
+
+
+class TableContext:
+    """Colour scaling of the cells of one table.
+
+    A cell is shaded by its mean times the factor of its column: the largest mean number of constraints and of
+    terms in the table and the largest mean angle of every benchmark map to 100, the ratios are scaled by 100.
+    The bar next to a cell is its standard deviation relative to `max_stds`.
+    """
+
+    def __init__(self, max_stds):
+        self.max_stds = max_stds
+        self.constraints = 0
+        self.terms = 0
+        self.angles = {}
+
+    def Add(self, benchmark, means):
+        if self.constraints < means[0]:
+            self.constraints = means[0]
+        if self.terms < means[1]:
+            self.terms = means[1]
+        if self.angles.setdefault(benchmark, -1) < means[5]:
+            self.angles[benchmark] = means[5]
+
+    def Factors(self, benchmark):
+        return 100.0 / self.constraints, 100.0 / self.terms, 100, 100, 100, 100.0 / self.angles[benchmark]
+
+
+def LoadStatistics(conn, db, group_columns, tags, refresh=True):
+    """Reads the summary table, or the runs themselves when `db` has shards which are not merged yet. Without
+    `refresh` the summary is read as it is, see PrepareDatabase"""
+    shard_paths = UnmergedShardPaths(conn, db)
+    if shard_paths:
+        return LoadShardedStatistics(conn, shard_paths, group_columns, tags)
+    if columnarCache:
+        return ColumnarStatistics(LoadColumns(db), group_columns, tags)
+
+    if refresh:
+        RefreshSummary(conn)
+    return LoadSummaryStatistics(conn.cursor(), group_columns, tags)
+
+
+def PrepareDatabase(db):
+    """Migrates `db` and brings its summary (and column snapshot) up to date, so that tables can be computed from
+    it by several processes without writing to it"""
+    conn = sqlite3.connect(db)
+    try:
+        Migrate(conn)
+        RefreshSummary(conn)
+        if columnarCache:
+            LoadColumns(db)
+    finally:
+        conn.close()
+
+
+def WriteAtomically(path, write):
+    """Calls `write` with a file next to `path` and renames it to `path`, so a table is never seen partially"""
+    temporary = '{}.tmp{}'.format(path, os.getpid())
+    try:
+        with open(temporary, 'wb') as f:
+            write(f)
+        os.rename(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
 
 
 def writeHeader(file):
@@ -148,9 +144,8 @@ def writeExamplesTableHeader(file, ben):
     writeStatisticsHeader(file)
 
 
-def writeAvgRows(file, c, pagebreak):
-    row = c.fetchone()
-    while row:
+def writeAvgRows(file, rows, pagebreak):
+    for row in rows:
         l = list(row)
         for i, x in enumerate(l):
             if x is None:
@@ -162,16 +157,16 @@ def writeAvgRows(file, c, pagebreak):
                            l[3] / (l[3] + l[5]) if (l[3] + l[5]) > 0 else 0.0,  # Precision  (HTP/(HTP+HFP))
                            l[3] / (l[3] + l[4]) if (l[3] + l[4]) > 0 else 0.0,  # Recall     (HTP/(HTP+HFN))
                            l[6]))
-        row = c.fetchone()
     file.write('    \\\\')
     if pagebreak:
         file.write(' \\cline{2-9}')
     file.write('\n')
 
 
-def writeAvgStdRows(f, c, pagebreak, max_stds, is_significant):
-    row = c.fetchone()
-    while row:
+def writeAvgStdRows(f, rows, pagebreak, context, benchmark, is_significant):
+    factors = context.Factors(benchmark)
+    max_stds = context.max_stds
+    for row in rows:
         l = list(row)
         for i, x in enumerate(l):
             if x is None:
@@ -183,25 +178,24 @@ def writeAvgStdRows(f, c, pagebreak, max_stds, is_significant):
         f_insignificant = ' & \\ccf{{{:.0f}}}{{{:.3f}}} {}'
 
         s = i_significant if is_significant[0] else i_insignificant
-        f.write(s.format(l[0] * cccfactor, l[0], tikzString.format((cellBarMaxHeight * l[6]) / max_stds[0])))
+        f.write(s.format(l[0] * factors[0], l[0], tikzString.format((cellBarMaxHeight * l[6]) / max_stds[0])))
 
         s = i_significant if is_significant[1] else i_insignificant
-        f.write(s.format(l[1] * cctfactor, l[1], tikzString.format((cellBarMaxHeight * l[7]) / max_stds[1])))
+        f.write(s.format(l[1] * factors[1], l[1], tikzString.format((cellBarMaxHeight * l[7]) / max_stds[1])))
 
         s = f_significant if is_significant[2] else f_insignificant
-        f.write(s.format(l[2] * ccjfactor, l[2], tikzString.format((cellBarMaxHeight * l[8]) / max_stds[2])))
+        f.write(s.format(l[2] * factors[2], l[2], tikzString.format((cellBarMaxHeight * l[8]) / max_stds[2])))
 
         s = f_significant if is_significant[3] else f_insignificant
-        f.write(s.format(l[3] * ccpfactor, l[3], tikzString.format((cellBarMaxHeight * l[9]) / max_stds[3])))
+        f.write(s.format(l[3] * factors[3], l[3], tikzString.format((cellBarMaxHeight * l[9]) / max_stds[3])))
 
         s = f_significant if is_significant[4] else f_insignificant
-        f.write(s.format(l[4] * ccrfactor, l[4], tikzString.format((cellBarMaxHeight * l[10]) / max_stds[4])))
+        f.write(s.format(l[4] * factors[4], l[4], tikzString.format((cellBarMaxHeight * l[10]) / max_stds[4])))
 
         s = ' & \\cci{{{:.3f}}}{{\\underline{{{:.3f}}}}} {}' if is_significant[5] else ' & \\cci{{{:.3f}}}{{{:.3f}}} {}'
-        f.write(s.format(l[5] * ccmfactor[benchmark_indi],
+        f.write(s.format(l[5] * factors[5],
                          l[5],
                          tikzString.format(((cellBarMaxHeight * l[11]) / max_stds[5]) if max_stds[5] != 0.0 else 0.0)))
-        row = c.fetchone()
     f.write('    \\\\')
     if pagebreak:
         f.write(' \\cline{2-9}')
@@ -216,276 +210,298 @@ def writeFooter(file):
     # file.write('\\end{document}')
 
 
-def ComponentsTable():
-    global cccfactor, cctfactor, ccjfactor, ccpfactor, ccrfactor, ccmfactor, benchmark_indi
-    ccmfactor = [-1, -1, -1]
+def ComponentsTable(filename='ComponentsTable.tex', refresh=True):
     benchmarks = ('circle', 'cube', 'simplex')
     multiplierArr = [0.5, 1, 2]
 
     conn = sqlite3.connect("testDatabase.sqlite")
-    conn.create_aggregate("stdev", 1, StdevFunc)
-    c = conn.cursor()
-    CheckTable(c)
 
-    benchmark_indi = -1
+    # Statistics for every cell of the table are read in a single pass
+    stats = LoadStatistics(conn, "testDatabase.sqlite", ('Benchmark', 'Dimensions', 'Components'), componentsTags,
+                           refresh)
+    conn.close()
 
-    # Calculate std Deviations for experiment
+    context = TableContext([10, 100, 0.5, 0.5, 0.5, 0.5])
     for ben in benchmarks:
-        benchmark_indi += 1
-
         for dimensions in xrange(3, 8):
             for m in multiplierArr:
-                components = int(round(m * dimensions))
+                context.Add(ben, stats.Means((ben, dimensions, int(round(m * dimensions)))))
 
-                CalculateStdevAndSaveToDb(c,
-                                          "Benchmark = ? AND Dimensions = ? AND "
-                                          "Components = ? AND Errors = '' AND "
-                                          "ExperimentName LiKE '%Components%'",
-                                          [ben, dimensions, components])
-                conn.commit()
+    def write(f):
+        writeHeader(f)
 
-                c.execute("SELECT AVG(Constraints), AVG(Terms), AVG(MeanAngle) FROM experiments WHERE "
-                          "Benchmark = ? AND Dimensions = ? AND Components = ? AND Errors = '' AND "
-                          "ExperimentName LiKE '%Components%'",
-                          [ben, dimensions, components])
+        for ben in benchmarks:
+            writeComponentsTableHeader(f, ben)
 
-                arr = c.fetchone()
-                if cccfactor < arr[0]:  cccfactor = arr[0]
-                if cctfactor < arr[1]:  cctfactor = arr[1]
-                if ccmfactor[benchmark_indi] < arr[2]:  ccmfactor[benchmark_indi] = arr[2]
+            for dimensions in xrange(3, 8):
+                f.write('\\multirow{{{}}}{{*}}{{{}}}'.format(3, dimensions))
 
-        ccmfactor[benchmark_indi] = 100.0 / ccmfactor[benchmark_indi]
+                for m in multiplierArr:
+                    components = int(round(m * dimensions))
+                    f.write(' & {}'.format(components))
+                    rows = [stats.AvgStdRow((ben, dimensions, components))]
 
-    cccfactor = 100.0 / cccfactor
-    cctfactor = 100.0 / cctfactor
-    ccjfactor = 100
-    ccpfactor = 100
-    ccrfactor = 100
+                    # writeAvgRows(f, rows, 0)
+                    writeAvgStdRows(f, rows, 0, context, ben, [False, False, False, False, False, False])
 
-    f = open('ComponentsTable.tex', 'wb')
+                f.write('\\hline')
+                if dimensions != 7:
+                    f.write(' \\hline')
+                f.write('\n')
 
-    writeHeader(f)
+            f.write('\\end{tabular}\n')
+            if ben != 'simplex':
+                f.write('&\n')
+        writeFooter(f)
 
-    max_stds = [10, 100, 0.5, 0.5, 0.5, 0.5]
+    WriteAtomically(filename, write)
 
-    benchmark_indi = -1
 
-    for ben in benchmarks:
-        benchmark_indi += 1
-        writeComponentsTableHeader(f, ben)
-
-        for dimensions in xrange(3, 8):
-            f.write('\\multirow{{{}}}{{*}}{{{}}}'.format(3, dimensions))
-
-            for m in multiplierArr:
-                components = int(round(m * dimensions))
-                f.write(' & {}'.format(components))
-                dim = (dimensions, components, ben)
-                c.execute("SELECT {} FROM experiments WHERE Dimensions = ? AND Components = ? AND "
-                          "Benchmark = ? AND ExperimentName LIKE '%Components%' AND Errors = ''"
-                          .format(avgStdStatisticsString), dim)
-
-                # writeAvgRows(f, c, 0)
-                writeAvgStdRows(f, c, 0, max_stds, [False, False, False, False, False, False])
-
-            f.write('\\hline')
-            if dimensions != 7:
-                f.write(' \\hline')
-            f.write('\n')
-
-        f.write('\\end{tabular}\n')
-        if ben is not 'simplex':
-            f.write('&\n')
-    writeFooter(f)
-    f.close()
-
-
-def TreeTable(db, filename):
-    global cccfactor, cctfactor, ccmfactor, ccjfactor, ccrfactor, ccpfactor, benchmark_indi
-    ccmfactor = [-1, -1, -1]
+def TreeTable(db, filename, refresh=True):
     conn_main = sqlite3.connect(db)
-    conn_pruning = sqlite3.connect('treePruningDb.sqlite')
+    if refresh:
+        conn_pruning = sqlite3.connect('treePruningDb.sqlite')
 
-    conn_main.create_aggregate("stdev", 1, StdevFunc)
+        Migrate(conn_main)
+        Migrate(conn_pruning)
 
-    c1 = conn_main.cursor()
-    c2 = conn_pruning.cursor()
+        conn_pruning.close()
 
-    CheckTable(c1)
     benchmarks = ('circle', 'cube', 'simplex')
-    f = open(filename, 'wb')
     multiplierArr = [1, 1.5, 2]
 
-    filterString = "Benchmark = ? AND Dimensions = ? AND [Join] = ? AND MaxHeight = ? AND Errors = '' AND " \
-                   "ExperimentName LIKE '%Tree%'"
+    stats = LoadStatistics(conn_main, db, treeColumns, treeTags, refresh)
+    if columnarCache:
+        tests = ColumnarPairedTests(LoadColumns(db), LoadColumns('treePruningDb.sqlite'), treeColumns, treeTags,
+                                    pValueCorrection)
+    else:
+        tests = ComparePairedRuns(conn_main, 'treePruningDb.sqlite', treeColumns, treeTags, pValueCorrection)
+    conn_main.close()
 
-    benchmark_indi = -1
-
-    # Calculate std Deviations for experiment
+    context = TableContext([15, 350, 0.5, 0.5, 0.5, 0.5])
     for ben in benchmarks:
-        benchmark_indi += 1
-
         for dimensions in xrange(3, 8):
             for m1 in multiplierArr:
                 join = int(round(m1 * dimensions))
 
                 for m2 in multiplierArr:
-                    maxHeight = int(round(m2 * join))
-                    paramsArr = [ben, dimensions, join, maxHeight]
+                    context.Add(ben, stats.Means((ben, dimensions, join, int(round(m2 * join)))))
 
-                    CalculateStdevAndSaveToDb(c1,
-                                              filterString,
-                                              paramsArr)
+    def write(f):
+        writeHeader(f)
 
-                    conn_main.commit()
+        for ben in benchmarks:
+            writeTreeTableHeader(f, ben)
 
-                    c1.execute("SELECT AVG(Constraints), AVG(Terms), AVG(MeanAngle) FROM experiments WHERE "
-                               "{}".format(filterString),
-                               paramsArr)
+            for dimension in xrange(3, 8):
+                f.write('\\multirow{{{}}}{{*}}{{{}}}'.format(9, dimension))
 
-                    arr = c1.fetchone()
-                    if cccfactor < arr[0]:  cccfactor = arr[0]
-                    if cctfactor < arr[1]:  cctfactor = arr[1]
-                    if ccmfactor[benchmark_indi] < arr[2]:  ccmfactor[benchmark_indi] = arr[2]
+                for m1 in multiplierArr:
+                    join = int(round(m1 * dimension))
+                    f.write(' & \\multirow{{{}}}{{*}}{{{}}}'.format(3, join))
+                    indi = 1
 
-        ccmfactor[benchmark_indi] = 100.0 / ccmfactor[benchmark_indi]
-
-    cccfactor = 100.0 / cccfactor
-    cctfactor = 100.0 / cctfactor
-    ccjfactor = 100
-    ccpfactor = 100
-    ccrfactor = 100
-
-    writeHeader(f)
-
-    max_stds = [15, 350, 0.5, 0.5, 0.5, 0.5]
-
-    benchmark_indi = -1
-
-    for ben in benchmarks:
-        benchmark_indi += 1
-        writeTreeTableHeader(f, ben)
-
-        for dimension in xrange(3, 8):
-            f.write('\\multirow{{{}}}{{*}}{{{}}}'.format(9, dimension))
-
-            for m1 in multiplierArr:
-                join = int(round(m1 * dimension))
-                f.write(' & \\multirow{{{}}}{{*}}{{{}}}'.format(3, join))
-                indi = 1
+                    for m2 in multiplierArr:
+                        maxHeight = int(round(m2 * join))
+                        if indi != 1:
+                            f.write(' & ')
+                        indi = 0
 
-                for m2 in multiplierArr:
-                    maxHeight = int(round(m2 * join))
-                    if indi != 1:
-                        f.write(' & ')
-                    indi = 0
+                        dim = (ben, dimension, join, maxHeight)
 
-                    dim = (ben, dimension, join, maxHeight)
+                        is_significant = tests.Significant(dim, significanceLevel)
 
-                    is_significant = CalculateTTestPValue(c1, c2, filterString, dim)
+                        f.write(' & {}'.format(maxHeight))
 
-                    f.write(' & {}'.format(maxHeight))
-                    c1.execute("SELECT {} FROM experiments WHERE Benchmark = ? AND Dimensions = ? AND [Join] = ? "
-                               "AND MaxHeight = ? AND ExperimentName LIKE '%Tree%' AND "
-                               "Errors = ''".format(avgStdStatisticsString), dim)
+                        pagebreak = 0
+                        if maxHeight == 2 * join:
+                            pagebreak = 1
 
-                    pagebreak = 0
-                    if maxHeight == 2 * join:
-                        pagebreak = 1
+                        writeAvgStdRows(f, [stats.AvgStdRow(dim)], pagebreak, context, ben, is_significant)
 
-                    writeAvgStdRows(f, c1, pagebreak, max_stds, is_significant)
+                f.write('\\hline')
+                if dimension != 7:
+                    f.write(' \\hline')
+                f.write('\n')
 
-            f.write('\\hline')
-            if dimension != 7:
-                f.write(' \\hline')
-            f.write('\n')
+            f.write('\\end{tabular}\n')
+            if ben != 'simplex':
+                f.write('&\n')
+        writeFooter(f)
 
-        f.write('\\end{tabular}\n')
-        if ben != 'simplex':
-            f.write('&\n')
-    writeFooter(f)
-    f.close()
+    WriteAtomically(filename, write)
 
 
-def ExamplesTable():
-    global cccfactor, cctfactor, ccmfactor, ccjfactor, ccrfactor, ccpfactor, benchmark_indi
-    ccmfactor = [-1, -1, -1]
+def ExamplesTable(filename='ExamplesTable.tex', refresh=True):
     conn = sqlite3.connect("testDatabase.sqlite")
-    conn.create_aggregate("stdev", 1, StdevFunc)
-    c = conn.cursor()
-    CheckTable(c)
     benchmarks = ('circle', 'cube', 'simplex')
-    f = open('ExamplesTable.tex', 'wb')
-
-    filter_string = "Benchmark = ? AND Dimensions = ? AND FeasibleExamples = ? AND Errors = '' AND " \
-                    "ExperimentName LIKE '%Examples%'"
 
-    benchmark_indi = -1
+    stats = LoadStatistics(conn, "testDatabase.sqlite", ('Benchmark', 'Dimensions', 'FeasibleExamples'), examplesTags,
+                           refresh)
+    conn.close()
 
-    # Calculate std Deviations for experiment
+    context = TableContext([13, 350, 0.5, 0.5, 0.5, 0.5])
     for ben in benchmarks:
-        benchmark_indi += 1
-
         for dimensions in xrange(3, 8):
             for examples in xrange(100, 501, 100):
-                paramsArr = [ben, dimensions, examples]
-                CalculateStdevAndSaveToDb(c,
-                                          filter_string,
-                                          paramsArr)
-                conn.commit()
-
-                c.execute("SELECT AVG(Constraints), AVG(Terms), AVG(MeanAngle) FROM experiments WHERE "
-                          "{}".format(filter_string),
-                          paramsArr)
-
-                arr = c.fetchone()
-                if cccfactor < arr[0]:  cccfactor = arr[0]
-                if cctfactor < arr[1]:  cctfactor = arr[1]
-                if ccmfactor[benchmark_indi] < arr[2]:  ccmfactor[benchmark_indi] = arr[2]
-
-        ccmfactor[benchmark_indi] = 100.0 / ccmfactor[benchmark_indi]
-
-    cccfactor = 100.0 / cccfactor
-    cctfactor = 100.0 / cctfactor
-    ccjfactor = 100
-    ccpfactor = 100
-    ccrfactor = 100
-
-    writeHeader(f)
-
-    max_stds = [13, 350, 0.5, 0.5, 0.5, 0.5]
-
-    benchmark_indi = -1
-
-    for ben in benchmarks:
-        benchmark_indi += 1
-        writeExamplesTableHeader(f, ben)
-
-        for dimension in xrange(3, 8):
-            f.write('\\multirow{{{}}}{{*}}{{{}}}'.format(5, dimension))
-
-            for examples in xrange(100, 501, 100):
-                f.write(' & {}'.format(examples))
-                dim = (ben, dimension, examples)
-                c.execute("SELECT {} FROM experiments WHERE {}".format(avgStdStatisticsString, filter_string),
-                          dim)
-
-                writeAvgStdRows(f, c, 0, max_stds, [False, False, False, False, False, False])
-
-            f.write('\\hline')
-            if dimension != 7:
-                f.write(' \\hline')
-            f.write('\n')
-
-        f.write('\\end{tabular}\n')
-        if ben != 'simplex':
-            f.write('&\n')
-    writeFooter(f)
-    f.close()
+                context.Add(ben, stats.Means((ben, dimensions, examples)))
+
+    def write(f):
+        writeHeader(f)
+
+        for ben in benchmarks:
+            writeExamplesTableHeader(f, ben)
+
+            for dimension in xrange(3, 8):
+                f.write('\\multirow{{{}}}{{*}}{{{}}}'.format(5, dimension))
+
+                for examples in xrange(100, 501, 100):
+                    f.write(' & {}'.format(examples))
+                    rows = [stats.AvgStdRow((ben, dimension, examples))]
+
+                    writeAvgStdRows(f, rows, 0, context, ben, [False, False, False, False, False, False])
+
+                f.write('\\hline')
+                if dimension != 7:
+                    f.write(' \\hline')
+                f.write('\n')
+
+            f.write('\\end{tabular}\n')
+            if ben != 'simplex':
+                f.write('&\n')
+        writeFooter(f)
+
+    WriteAtomically(filename, write)
+
+
+# A table of the report: the databases and tags of the runs it is computed from, and how it is written
+ReportTable = namedtuple('ReportTable', ['Name', 'Databases', 'Tags', 'Settings', 'Render'])
+reportTables = (
+    ReportTable('ComponentsTable.tex', ('testDatabase.sqlite',), componentsTags, (),
+                lambda path, refresh: ComponentsTable(path, refresh)),
+    ReportTable('TreeTable.tex', ('testDatabase.sqlite', 'treePruningDb.sqlite'), treeTags,
+                (significanceLevel, pValueCorrection),
+                lambda path, refresh: TreeTable('testDatabase.sqlite', path, refresh)),
+    ReportTable('PrunedTreeTable.tex', ('treePruningDb.sqlite',), treeTags, (significanceLevel, pValueCorrection),
+                lambda path, refresh: TreeTable('treePruningDb.sqlite', path, refresh)),
+    ReportTable('ExamplesTable.tex', ('testDatabase.sqlite',), examplesTags, (),
+                lambda path, refresh: ExamplesTable(path, refresh)),
+)
+
+
+def _SourceDigest():
+    digest = hashlib.sha256()
+    for module in rendererModules:
+        with open(os.path.join(scriptsDirectory, '{}.py'.format(module)), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def DatabaseState(db):
+    """Rows of the refreshed summary of `db` in key order, and (name, rows, largest id) of every shard which is not
+    merged yet. Shards only ever receive new rows, so their size tells whether they changed"""
+    conn = sqlite3.connect(db)
+    try:
+        rows = conn.execute(summaryRowsQuery).fetchall()
+        shards = []
+        for path in UnmergedShardPaths(conn, db):
+            shard = sqlite3.connect(path)
+            try:
+                shards.append((os.path.basename(path),) +
+                              shard.execute("SELECT COUNT(*), IFNULL(MAX(id), 0) FROM experiments").fetchone())
+            finally:
+                shard.close()
+    finally:
+        conn.close()
+    return rows, shards
+
+
+def InputDigest(table, states, source_digest=None):
+    """Hash of everything `table` is computed from: the summary groups and shards of the runs it reads (`states`
+    holds the DatabaseState of every database), its settings and the code computing it"""
+    digest = hashlib.sha256()
+    digest.update('{}\n{!r}\n{}\n'.format(table.Name, table.Settings, source_digest or _SourceDigest()))
+    for db in table.Databases:
+        rows, shards = states[db]
+        # Groups carry their number of runs, largest id and moments, so any new, changed or removed run changes them
+        digest.update(''.join('{!r}\n'.format(row) for row in rows if HasTag(row[0], table.Tags)))
+        digest.update('{!r}\n'.format(shards))
+    return digest.hexdigest()
+
+
+def _ReadManifest(directory):
+    try:
+        with open(os.path.join(directory, manifestFile)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _WriteManifest(directory, manifest):
+    content = json.dumps(manifest, indent=1, separators=(',', ': '), sort_keys=True)
+    WriteAtomically(os.path.join(directory, manifestFile), lambda f: f.write(content.encode('utf-8')))
+
+
+def _RenderTable(job):
+    name, path = job
+    dict((table.Name, table) for table in reportTables)[name].Render(path, False)
+    return name
+
+
+def BuildReport(names=None, directory='.', workers=1, force=False):
+    """Writes the tables of the report (all, or those in `names`) into `directory`, skipping tables whose inputs did
+    not change since they were written.
+
+    The databases are migrated and their summaries refreshed first, which only recomputes groups with new or
+    changed runs. The inputs of every table are then hashed from the summaries (see InputDigest), reading each
+    database once, and compared with the hashes recorded in the manifest next to the tables. Stale tables are
+    computed and written by up to `workers` processes, which only read the databases. A table is recorded in the
+    manifest as soon as it is written, so an interrupted build keeps the finished ones. Returns the names of the
+    written tables.
+    """
+    tables = [table for table in reportTables if names is None or table.Name in names]
+    states = {}
+    for db in sorted(set(db for table in tables for db in table.Databases)):
+        PrepareDatabase(db)
+        states[db] = DatabaseState(db)
+
+    manifest = _ReadManifest(directory)
+    source_digest = _SourceDigest()
+    digests, stale = {}, []
+    for table in tables:
+        digests[table.Name] = InputDigest(table, states, source_digest)
+        if force or manifest.get(table.Name) != digests[table.Name] or \
+                not os.path.exists(os.path.join(directory, table.Name)):
+            stale.append(table)
+
+    jobs = [(table.Name, os.path.join(directory, table.Name)) for table in stale]
+    pool = Pool(min(workers, len(jobs))) if workers > 1 and len(jobs) > 1 else None
+    results = pool.imap_unordered(_RenderTable, jobs) if pool else (_RenderTable(job) for job in jobs)
+    written = []
+    try:
+        for name in results:
+            manifest[name] = digests[name]
+            _WriteManifest(directory, manifest)
+            written.append(name)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return written
 
 
 if __name__ == "__main__":
-    ComponentsTable()
-    TreeTable('testDatabase.sqlite', 'TreeTable.tex')
-    TreeTable('treePruningDb.sqlite', 'PrunedTreeTable.tex')
-    ExamplesTable()
+    parser = argparse.ArgumentParser(description='Writes the tables of the report whose results changed since they '
+                                                 'were last written')
+    parser.add_argument('--tables', nargs='+', choices=[table.Name for table in reportTables],
+                        help='only these tables')
+    parser.add_argument('--output', default='.', help='directory of the .tex files')
+    parser.add_argument('--workers', type=int, default=min(len(reportTables), cpu_count()),
+                        help='processes computing tables')
+    parser.add_argument('--force', action='store_true', help='write the tables even if their inputs did not change')
+    args = parser.parse_args()
+
+    written = BuildReport(args.tables, args.output, args.workers, args.force)
+    for table in reportTables:
+        if args.tables is None or table.Name in args.tables:
+            print('{}: {}'.format(table.Name, 'written' if table.Name in written else 'unchanged'))
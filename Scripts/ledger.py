@@ -0,0 +1,152 @@
+from __future__ import print_function
+import os
+import sqlite3
+import sys
+from schema import Migrate
+
+# Parameters identifying a single run. They are the columns compared by DatabaseUtils.CheckIfExists
+parameterColumns = ('FeasibleExamples', 'Dimensions', 'K', 'Join', 'MaxHeight', 'Seed', 'Benchmark', 'Components')
+
+# State of every run: pending (submitted), running, done or error
+ledgerTable = 'job_ledger'
+
+
+def _Columns(prefix=''):
+    return ', '.join('{}[{}]'.format(prefix, column) for column in parameterColumns)
+
+
+def _Match(left, right):
+    return ' AND '.join('{0}.[{2}] = {1}.[{2}]'.format(left, right, column) for column in parameterColumns)
+
+
+def _Parameters(configuration):
+    return tuple(configuration[:len(parameterColumns)])
+
+
+parameterFilter = ' AND '.join('[{}] = ?'.format(column) for column in parameterColumns)
+
+# Ledger state of every run together with its successful experiments row, if there is one
+workQuery = "SELECT {0}, l.State, e.ExperimentName, e.id FROM {1} l " \
+            "LEFT JOIN experiments e ON {2} AND e.Errors = ''".format(_Columns('l.'), ledgerTable, _Match('l', 'e'))
+
+
+def CreateLedger(c):
+    """Creates the job ledger, filled from the runs already in the experiments table. Returns True if it was new"""
+    if c.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = ?", (ledgerTable,)).fetchone()[0]:
+        return False
+
+    c.execute("CREATE TABLE {}({}, State TEXT NOT NULL, Error TEXT, Attempts INTEGER NOT NULL DEFAULT 0, "
+              "Updated TEXT, PRIMARY KEY ({}))"
+              .format(ledgerTable, ', '.join('[{}] NUMERIC'.format(column) for column in parameterColumns),
+                      _Columns()))
+
+    # Bare Errors column is taken from the row with MAX(id), i.e. the latest attempt
+    c.execute("INSERT INTO {0} ({1}, State, Error, Attempts, Updated) "
+              "SELECT {1}, CASE WHEN Successes > 0 THEN 'done' ELSE 'error' END, "
+              "CASE WHEN Successes > 0 THEN NULL ELSE Errors END, Runs, CURRENT_TIMESTAMP FROM "
+              "(SELECT {1}, SUM(Errors = '') AS Successes, COUNT(*) AS Runs, Errors, MAX(id) "
+              "FROM experiments GROUP BY {1})".format(ledgerTable, _Columns()))
+    return True
+
+
+def OpenLedger(db_path):
+    """Connects to a results database and prepares its ledger. Returns None if the database has no results yet"""
+    if not db_path or not os.path.exists(db_path):
+        return None
+
+    conn = sqlite3.connect(db_path, timeout=60)
+    c = conn.cursor()
+    if not c.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'experiments'").fetchone()[0]:
+        conn.close()
+        return None
+
+    Migrate(conn)
+    CreateLedger(c)
+    conn.commit()
+    return conn
+
+
+def MissingWork(conn, configurations, include_pending=False):
+    """Returns configurations which were never run or whose last run failed.
+
+    Runs which are pending or running are skipped too, unless `include_pending` is set (e.g. after
+    jobs were lost). Like DatabaseUtils.CheckIfExists, a finished run of a configuration with another
+    experiment name gets the name appended instead of being repeated.
+    """
+    c = conn.cursor()
+    width = len(parameterColumns)
+    ledger = {}
+    for row in c.execute(workQuery):
+        ledger[tuple(row[:width])] = row[width:]
+
+    missing = []
+    for configuration in configurations:
+        state, experiment_name, experiment_id = ledger.get(_Parameters(configuration), (None, None, None))
+
+        if experiment_id is not None:
+            if configuration.ExperimentName not in u'{}'.format(experiment_name).split(';'):
+                c.execute("UPDATE experiments SET ExperimentName = ExperimentName || ? WHERE id = ?",
+                          (';' + configuration.ExperimentName, experiment_id))
+        elif state in (None, 'error') or include_pending:
+            missing.append(configuration)
+
+    conn.commit()
+    return missing
+
+
+def RecordState(conn, configurations, state, error=None, only_from=None):
+    """Sets the ledger state of configurations. Submitting a run (state 'pending') counts as an attempt.
+
+    With `only_from` only runs currently in one of these states are changed, so that e.g. the exit
+    code of a crashed process does not replace the error recorded by the program itself.
+    """
+    c = conn.cursor()
+    parameters = [_Parameters(configuration) for configuration in configurations]
+
+    c.executemany("INSERT OR IGNORE INTO {} ({}, State) VALUES ({}, ?)"
+                  .format(ledgerTable, _Columns(), ', '.join('?' * len(parameterColumns))),
+                  [p + (state,) for p in parameters])
+
+    condition = parameterFilter
+    if only_from:
+        condition += " AND State IN ({})".format(', '.join('?' * len(only_from)))
+    c.executemany("UPDATE {} SET State = ?, Error = ?, Attempts = Attempts + ?, Updated = CURRENT_TIMESTAMP "
+                  "WHERE {}".format(ledgerTable, condition),
+                  [(state, error, int(state == 'pending')) + p + tuple(only_from or ()) for p in parameters])
+    conn.commit()
+
+
+def RecordResults(c, database='main', since_id=0):
+    """Sets the ledger state of runs saved in `database`.experiments after row `since_id`.
+
+    Used for results which did not pass through DatabaseUtils.RecordLedgerState, e.g. merged shards.
+    """
+    source = "SELECT {} FROM {}.experiments WHERE id > ? AND Errors {} ''"
+    c.execute("INSERT OR IGNORE INTO {0} ({1}, State) SELECT DISTINCT {1}, 'pending' FROM {2}.experiments "
+              "WHERE id > ?".format(ledgerTable, _Columns(), database), (since_id,))
+
+    latest_error = "SELECT e.Errors FROM {}.experiments e WHERE {} AND e.id > ? AND e.Errors <> '' " \
+                   "ORDER BY e.id DESC LIMIT 1".format(database, _Match(ledgerTable, 'e'))
+    c.execute("UPDATE {0} SET State = 'error', Error = ({1}), Updated = CURRENT_TIMESTAMP "
+              "WHERE State <> 'done' AND ({2}) IN ({3})"
+              .format(ledgerTable, latest_error, _Columns(), source.format(_Columns(), database, '<>')),
+              (since_id, since_id))
+    c.execute("UPDATE {} SET State = 'done', Error = NULL, Updated = CURRENT_TIMESTAMP "
+              "WHERE State <> 'done' AND ({}) IN ({})"
+              .format(ledgerTable, _Columns(), source.format(_Columns(), database, '=')), (since_id,))
+
+
+if __name__ == "__main__":
+    for db in sys.argv[1:]:
+        connection = OpenLedger(db)
+        if connection is None:
+            print('{}: no results'.format(db))
+            continue
+
+        print('== {}'.format(db))
+        for name, count in connection.execute("SELECT State, COUNT(*) FROM {} GROUP BY State".format(ledgerTable)):
+            print('{:8} {}'.format(name, count))
+        for error, count in connection.execute("SELECT Error, COUNT(*) FROM {} WHERE State = 'error' "
+                                               "GROUP BY Error ORDER BY 2 DESC".format(ledgerTable)):
+            print('{:6} {}'.format(count, u'{}'.format(error).strip().replace('\n', ' | ')))
+        connection.close()
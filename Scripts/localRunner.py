@@ -0,0 +1,145 @@
+from __future__ import print_function
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+from multiprocessing.pool import ThreadPool
+from grids import Arguments
+from ledger import MissingWork, OpenLedger, RecordState
+
+defaultCommand = 'mono ~/Release/OneClassClassification.exe'
+pollInterval = 0.1
+# Output folder of a run (see GlobalVariables.OutputDirectoryVariable); the program reads back the rules it writes
+# there, so runs at the same time need folders of their own
+outputDirectoryVariable = 'OCC_OUTPUT_DIRECTORY'
+
+
+def ParseCommand(command):
+    return [os.path.expanduser(part) for part in shlex.split(command)]
+
+
+def RunCommand(arguments, timeout=None, log=None, env=None):
+    """Runs a process, killing it after `timeout` seconds. Returns its exit code or None on timeout"""
+    start = time.time()
+    process = subprocess.Popen(arguments, stdout=log, stderr=subprocess.STDOUT, env=env)
+    while process.poll() is None:
+        if timeout is not None and time.time() - start > timeout:
+            process.kill()
+            process.wait()
+            return None
+        time.sleep(pollInterval)
+    return process.returncode
+
+
+class TaskResult:
+    def __init__(self, configuration, returncode, attempts, elapsed):
+        self.configuration = configuration
+        self.returncode = returncode
+        self.attempts = attempts
+        self.elapsed = elapsed
+
+    @property
+    def succeeded(self):
+        return self.returncode == 0
+
+    @property
+    def timed_out(self):
+        return self.returncode is None
+
+
+class LocalRunner:
+    """Runs experiment configurations on a pool of local worker processes.
+
+    `command` is the executable with its leading arguments (e.g. 'mono OneClassClassification.exe' or
+    a stub script); the 9 configuration arguments are appended to it. Failed or timed out tasks are
+    retried up to `retries` times. Every attempt writes its output files into a temporary folder of its own.
+    """
+
+    def __init__(self, command=defaultCommand, workers=1, timeout=None, retries=0, log_dir=None):
+        self.command = ParseCommand(command) if isinstance(command, str) else list(command)
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.log_dir = log_dir
+
+    def _LogFile(self, configuration):
+        if self.log_dir is None:
+            return open(os.devnull, 'w')
+        name = '_'.join(Arguments(configuration)).replace(' ', '-').replace(os.sep, '-')
+        return open(os.path.join(self.log_dir, '{}.log'.format(name)), 'a')
+
+    def RunTask(self, configuration):
+        arguments = self.command + Arguments(configuration)
+        start = time.time()
+        attempts = 0
+        returncode = None
+
+        while attempts <= self.retries:
+            attempts += 1
+            log = self._LogFile(configuration)
+            output = tempfile.mkdtemp(prefix='occ-output-')
+            env = dict(os.environ)
+            env[outputDirectoryVariable] = output
+            try:
+                returncode = RunCommand(arguments, self.timeout, log, env)
+            finally:
+                log.close()
+                shutil.rmtree(output, ignore_errors=True)
+            if returncode == 0:
+                break
+
+        return TaskResult(configuration, returncode, attempts, time.time() - start)
+
+    def Run(self, configurations, callback=None):
+        """Runs all configurations and returns their TaskResults in completion order"""
+        if self.log_dir is not None and not os.path.isdir(self.log_dir):
+            os.makedirs(self.log_dir)
+
+        pool = ThreadPool(self.workers)
+        results = []
+        try:
+            for result in pool.imap_unordered(self.RunTask, configurations):
+                results.append(result)
+                if callback is not None:
+                    callback(result)
+        finally:
+            pool.close()
+            pool.join()
+        return results
+
+
+def PrintResult(result):
+    status = 'ok' if result.succeeded else ('timeout' if result.timed_out else 'exit {}'.format(result.returncode))
+    print('{:8} {:6.1f}s  attempts {}  {}'.format(status, result.elapsed, result.attempts,
+                                                  ' '.join(Arguments(result.configuration))))
+
+
+def RunLocally(configurations, db_path=None, callback=PrintResult, include_pending=False, **runner_options):
+    """Runs configurations missing from the job ledger of `db_path` with a LocalRunner.
+
+    The program records the outcome of every run itself; runs which timed out or crashed before
+    doing so are marked as failed here.
+    """
+    runner = LocalRunner(**runner_options)
+    conn = OpenLedger(db_path)
+    if conn is None:
+        return runner.Run(configurations, callback)
+
+    pending = MissingWork(conn, configurations, include_pending)
+    RecordState(conn, pending, 'pending')
+
+    def Record(result):
+        if result.succeeded:
+            RecordState(conn, [result.configuration], 'done', only_from=('pending', 'running'))
+        else:
+            error = 'Timed out' if result.timed_out else 'Exit code {}'.format(result.returncode)
+            RecordState(conn, [result.configuration], 'error', error, only_from=('pending', 'running'))
+        if callback is not None:
+            callback(result)
+
+    try:
+        return runner.Run(pending, Record)
+    finally:
+        conn.close()
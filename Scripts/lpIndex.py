@@ -0,0 +1,169 @@
+from __future__ import print_function
+import argparse
+import os
+import sqlite3
+import time
+from multiprocessing import Pool
+from lpReader import Bound, Constraint, Objective, VariableTypes, ReadRecords
+
+modelsTable = 'lp_models'
+boundsTable = 'lp_bounds'
+# Coefficients of at least this magnitude count as big-M terms (ModelCreator writes M = 1e6)
+bigMThreshold = 1e4
+
+statisticColumns = (('Sense', 'TEXT'), ('ObjectiveTerms', 'INTEGER'), ('ObjectiveQuadraticTerms', 'INTEGER'),
+                    ('Constraints', 'INTEGER'), ('Equalities', 'INTEGER'), ('QuadraticConstraints', 'INTEGER'),
+                    ('Variables', 'INTEGER'), ('Binaries', 'INTEGER'), ('Generals', 'INTEGER'),
+                    ('Nonzeros', 'INTEGER'), ('BigMTerms', 'INTEGER'), ('BigMConstraints', 'INTEGER'),
+                    ('MaxCoefficient', 'REAL'), ('MinCoefficient', 'REAL'), ('Error', 'TEXT'))
+statisticNames = tuple(name for name, _ in statisticColumns)
+
+
+def CreateTables(c):
+    c.execute("CREATE TABLE IF NOT EXISTS {}(id INTEGER PRIMARY KEY, Path TEXT NOT NULL UNIQUE, "
+              "Size INTEGER NOT NULL, Modified REAL NOT NULL, {})"
+              .format(modelsTable, ', '.join('{} {}'.format(name, kind) for name, kind in statisticColumns)))
+    c.execute("CREATE TABLE IF NOT EXISTS {}(ModelId INTEGER NOT NULL, Variable TEXT NOT NULL, Type TEXT NOT NULL, "
+              "Lower REAL, Upper REAL, PRIMARY KEY (ModelId, Variable)) WITHOUT ROWID".format(boundsTable))
+
+
+def ModelStatistics(lines, big_m=bigMThreshold):
+    """Statistics of an LP model (dict keyed by statisticNames) and the bounds of its variables
+    (name -> (type, lower, upper), with the LP format defaults for undeclared bounds).
+
+    Reads the records one by one, so only the variables of the model are held in memory."""
+    stats = dict((name, 0) for name in statisticNames)
+    stats.update(Sense=None, MaxCoefficient=None, MinCoefficient=None, Error=None)
+    declared, types, seen = {}, {}, set()
+    low, high = float('inf'), 0.0
+
+    for record in ReadRecords(lines):
+        if isinstance(record, Constraint):
+            stats['Constraints'] += 1
+            stats['Equalities'] += record.sense == '='
+            stats['QuadraticConstraints'] += bool(record.quadratic)
+            stats['Nonzeros'] += len(record.terms)
+            big_terms = 0
+            for coefficient, variable in record.terms:
+                seen.add(variable)
+                big_terms += abs(coefficient) >= big_m
+            magnitudes = [abs(coefficient) for coefficient, _ in record.terms if coefficient]
+            if magnitudes:
+                low, high = min(low, min(magnitudes)), max(high, max(magnitudes))
+            for _, first, second in record.quadratic:
+                seen.add(first)
+                seen.add(second)
+            stats['BigMTerms'] += big_terms
+            stats['BigMConstraints'] += big_terms > 0
+        elif isinstance(record, Objective):
+            stats['Sense'] = record.sense
+            stats['ObjectiveTerms'] = len(record.terms)
+            stats['ObjectiveQuadraticTerms'] = len(record.quadratic)
+            seen.update(variable for _, variable in record.terms)
+            seen.update(variable for _, first, second in record.quadratic for variable in (first, second))
+        elif isinstance(record, Bound):
+            lower, upper = declared.get(record.name, (None, None))
+            declared[record.name] = (lower if record.lower is None else record.lower,
+                                     upper if record.upper is None else record.upper)
+        elif isinstance(record, VariableTypes):
+            types.update((name, record.section) for name in record.names)
+
+    if high > 0:
+        stats['MinCoefficient'], stats['MaxCoefficient'] = low, high
+
+    bounds = {}
+    for variable in seen.union(declared, types):
+        kind = {'binaries': 'binary', 'generals': 'general'}.get(types.get(variable), 'continuous')
+        lower, upper = declared.get(variable, (None, None))
+        if lower is None:
+            lower = 0.0
+        if upper is None:
+            upper = 1.0 if kind == 'binary' else float('inf')
+        bounds[variable] = (kind, lower, upper)
+    stats['Variables'] = len(bounds)
+    stats['Binaries'] = sum(1 for kind, _, _ in bounds.values() if kind == 'binary')
+    stats['Generals'] = sum(1 for kind, _, _ in bounds.values() if kind == 'general')
+    return stats, bounds
+
+
+def _ScanFile(job):
+    path, big_m = job
+    try:
+        with open(path) as f:
+            stats, bounds = ModelStatistics(f, big_m)
+    except (IOError, ValueError) as e:
+        stats = dict((name, None) for name in statisticNames)
+        stats['Error'] = '{}: {}'.format(type(e).__name__, e)
+        bounds = {}
+    return path, stats, bounds
+
+
+def FindModels(paths, extension='.lp'):
+    """The given files and the files ending with `extension` below the given directories"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield os.path.abspath(path)
+            continue
+        for root, directories, files in os.walk(path):
+            directories.sort()
+            for name in sorted(files):
+                if name.endswith(extension):
+                    yield os.path.abspath(os.path.join(root, name))
+
+
+def IndexModels(conn, paths, big_m=bigMThreshold, workers=1):
+    """Adds the statistics of the models at `paths` to the index, rescanning files whose size or modification
+    time changed since they were indexed. Returns (scanned, unchanged, failed)"""
+    c = conn.cursor()
+    CreateTables(c)
+    known = dict((row[0], tuple(row[1:])) for row in c.execute("SELECT Path, Size, Modified FROM {}"
+                                                                .format(modelsTable)))
+    states, jobs = {}, []
+    for path in FindModels(paths):
+        state = os.stat(path)
+        states[path] = (state.st_size, state.st_mtime)
+        if known.get(path) != states[path]:
+            jobs.append((path, big_m))
+
+    pool = Pool(workers) if workers > 1 and len(jobs) > 1 else None
+    results = pool.imap_unordered(_ScanFile, jobs, chunksize=8) if pool else (_ScanFile(job) for job in jobs)
+    failed = 0
+    try:
+        for path, stats, bounds in results:
+            failed += stats['Error'] is not None
+            c.execute("DELETE FROM {} WHERE ModelId IN (SELECT id FROM {} WHERE Path = ?)"
+                      .format(boundsTable, modelsTable), (path,))
+            c.execute("INSERT OR REPLACE INTO {}(Path, Size, Modified, {}) VALUES (?, ?, ?, {})"
+                      .format(modelsTable, ', '.join(statisticNames), ', '.join('?' * len(statisticNames))),
+                      (path,) + states[path] + tuple(stats[name] for name in statisticNames))
+            model_id = c.lastrowid
+            c.executemany("INSERT INTO {} VALUES (?, ?, ?, ?, ?)".format(boundsTable),
+                          ((model_id, variable) + bound for variable, bound in bounds.items()))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    conn.commit()
+    return len(jobs), len(states) - len(jobs), failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Indexes statistics of LP models in an SQLite database')
+    parser.add_argument('index', help='SQLite file of the index, created if missing')
+    parser.add_argument('paths', nargs='+', help='.lp files or directories searched for them recursively')
+    parser.add_argument('--workers', type=int, default=1, help='processes reading models')
+    parser.add_argument('--big-m', type=float, default=bigMThreshold,
+                        help='smallest coefficient magnitude counted as a big-M term')
+    args = parser.parse_args()
+
+    start = time.time()
+    conn = sqlite3.connect(args.index)
+    scanned, unchanged, failed = IndexModels(conn, args.paths, args.big_m, args.workers)
+    models, constraints, binaries, nonzeros = conn.execute(
+        "SELECT COUNT(*), SUM(Constraints), SUM(Binaries), SUM(Nonzeros) FROM {} WHERE Error IS NULL"
+        .format(modelsTable)).fetchone()
+    conn.close()
+    print('{} models scanned, {} unchanged, {} failed in {:.1f}s'.format(scanned, unchanged, failed,
+                                                                          time.time() - start))
+    print('Index holds {} models: {} constraints, {} binaries, {} nonzeros'.format(
+        models, constraints or 0, binaries or 0, nonzeros or 0))
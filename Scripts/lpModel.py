@@ -0,0 +1,295 @@
+from __future__ import print_function
+import argparse
+import re
+from collections import Counter, namedtuple
+import numpy as np
+from lpReader import Bound, Constraint, VariableTypes, ReadRecords
+
+# Big-M of the models written by ModelCreator (GlobalVariables.M)
+bigM = 1e6
+# The index of BoxModel holds two bitsets of all boxes per bound, about boxes^2 / 4 bytes per variable
+maxBoxes = 20000
+# Points classified at once by BoxModel.Contains
+blockSize = 65536
+
+# Bound of one continuous variable which applies when all `active` binaries (name -> value) take their values
+BoxConstraint = namedtuple('BoxConstraint', ['axis', 'upper', 'threshold', 'active'])
+
+
+class LpModel:
+    """Constraints, bounds and binaries of a model in LP format. The objective is not kept"""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.constraints = []
+        self.bounds = {}
+        self.binaries = set()
+        self.variables = []
+
+    def Variable(self, name):
+        if name not in self.bounds:
+            self.bounds[name] = (-np.inf, np.inf)
+            self.variables.append(name)
+
+    def Bound(self, bound):
+        self.Variable(bound.name)
+        lower, upper = self.bounds[bound.name]
+        self.bounds[bound.name] = (lower if bound.lower is None else bound.lower,
+                                   upper if bound.upper is None else bound.upper)
+
+
+def ReadLp(lines, name=None):
+    """Reads the constraints, bounds and binaries of an LP file given as lines"""
+    model = LpModel(name)
+    for record in ReadRecords(lines):
+        if isinstance(record, Constraint):
+            model.constraints.append(record)
+        elif isinstance(record, Bound):
+            model.Bound(record)
+        elif isinstance(record, VariableTypes) and record.section == 'binaries':
+            model.binaries.update(record.names)
+
+    # Variables without bounds (e.g. x0, x1, ... of ModelCreator) follow in natural order
+    unbounded = set(variable for constraint in model.constraints for _, variable in constraint.terms
+                    if variable not in model.binaries and variable not in model.bounds)
+    for variable in sorted(unbounded, key=_NaturalKey):
+        model.Variable(variable)
+    return model
+
+
+def _NaturalKey(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def ReadLpFile(path):
+    with open(path) as f:
+        return ReadLp(f, path)
+
+
+def _BoxConstraints(model, columns, big_m):
+    """Turns every constraint into a bound of one variable which is active for one assignment of its binaries.
+
+    In a big-M constraint each binary term relaxes the bound by M when the binary differs from its active
+    value, so the right hand side is the threshold plus M for every term whose active value is 1
+    (the threshold minus M for '>=').
+    """
+    fixed = dict((name, bounds[0]) for name, bounds in model.bounds.items() if bounds[0] == bounds[1])
+    result = []
+    for constraint in model.constraints:
+        if constraint.quadratic:
+            raise ValueError('Constraint {} is quadratic'.format(constraint.name))
+        rhs = constraint.rhs
+        continuous, active = [], {}
+        for coefficient, variable in constraint.terms:
+            if variable in model.binaries:
+                if not np.isclose(abs(coefficient), big_m):
+                    raise ValueError('Constraint {}: binary {} has coefficient {}, not a big-M of {:g}'
+                                     .format(constraint.name, variable, coefficient, big_m))
+                active[variable] = coefficient
+            elif variable in fixed:
+                rhs -= coefficient * fixed[variable]
+            else:
+                continuous.append((coefficient, variable))
+        if len(continuous) != 1:
+            raise ValueError('Constraint {} does not bound a single variable'.format(constraint.name))
+
+        coefficient, variable = continuous[0]
+        bound_senses = ['<=', '>='] if constraint.sense == '=' else [constraint.sense]
+        for sense in bound_senses:
+            # Normalized to variable + sum(sign * M * binary) (sense) rhs
+            scale = 1.0 / coefficient
+            upper = (sense == '<=') == (coefficient > 0)
+            signs = dict((name, np.sign(value * scale)) for name, value in active.items())
+            if upper:
+                values = dict((name, 1 if sign > 0 else 0) for name, sign in signs.items())
+                threshold = rhs * scale - big_m * sum(1 for sign in signs.values() if sign > 0)
+            else:
+                values = dict((name, 0 if sign > 0 else 1) for name, sign in signs.items())
+                threshold = rhs * scale + big_m * sum(1 for sign in signs.values() if sign < 0)
+            result.append(BoxConstraint(columns[variable], upper, threshold, values))
+    return result
+
+
+class BoxModel:
+    """Union of axis-aligned boxes equivalent to a big-M model: a point belongs to the model if some
+    assignment of the binaries satisfies all constraints, and every assignment leaves a box.
+
+    `low` and `high` have one row per box and one column per variable of `variables`.
+    """
+
+    def __init__(self, variables, low, high):
+        self.variables = list(variables)
+        self.low = np.asarray(low, dtype=np.float64).reshape(-1, len(self.variables))
+        self.high = np.asarray(high, dtype=np.float64).reshape(-1, len(self.variables))
+        self._index = None
+
+    @property
+    def boxes(self):
+        return len(self.low)
+
+    def _Index(self):
+        """Per variable: sorted distinct bounds of all boxes and, for every position of a point among them,
+        bitsets (in 64-bit words) of the boxes whose lower bound is below and whose upper bound is above it"""
+        words = max(1, (self.boxes + 63) // 64)
+        word = np.arange(self.boxes) // 64
+        bit = np.left_shift(np.uint64(1), (np.arange(self.boxes) % 64).astype(np.uint64))
+
+        def ByRank(rank, count):
+            # Bitsets of the boxes with each rank
+            table = np.zeros((count, words), dtype=np.uint64)
+            np.bitwise_or.at(table, (rank, word), bit)
+            return table
+
+        index = []
+        for axis in xrange(len(self.variables)):
+            bounds = np.unique(np.concatenate([self.low[:, axis], self.high[:, axis]]))
+            low_rank = np.searchsorted(bounds, self.low[:, axis])
+            high_rank = np.searchsorted(bounds, self.high[:, axis])
+            # low <= x holds for the boxes with a lower bound among the first j bounds not above x
+            above_low = np.zeros((len(bounds) + 1, words), dtype=np.uint64)
+            np.bitwise_or.accumulate(ByRank(low_rank, len(bounds)), axis=0, out=above_low[1:])
+            # x <= high holds for the boxes with an upper bound not among the first i bounds below x
+            below_high = np.zeros((len(bounds) + 1, words), dtype=np.uint64)
+            below_high[-2::-1] = np.bitwise_or.accumulate(ByRank(high_rank, len(bounds))[::-1], axis=0)
+            index.append((bounds, above_low, below_high))
+        return index
+
+    def Contains(self, points, block_size=blockSize):
+        """Membership of every row of `points` (columns ordered as `variables`).
+
+        Every coordinate is located among the bounds of its variable by binary search, which selects the set of
+        boxes it satisfies; a point is inside if the intersection of these sets over all variables is not empty.
+        """
+        if self._index is None:
+            self._index = self._Index()
+        inside = np.zeros(len(points), dtype=bool)
+        if not self.boxes:
+            return inside
+
+        for start in xrange(0, len(points), block_size):
+            # Contiguous columns search several times faster
+            columns = np.ascontiguousarray(np.asarray(points[start:start + block_size], dtype=np.float64).T)
+            boxes = None
+            for x, (bounds, above_low, below_high) in zip(columns, self._index):
+                right = np.searchsorted(bounds, x, 'right')
+                # Position among the bounds below x: one less where x equals a bound
+                left = right - (bounds[np.maximum(right - 1, 0)] == x)
+                satisfied = np.take(above_low, right, axis=0)
+                satisfied &= np.take(below_high, left, axis=0)
+                boxes = satisfied if boxes is None else np.bitwise_and(boxes, satisfied, out=boxes)
+            inside[start:start + block_size] = np.any(boxes != 0, axis=1)
+        return inside
+
+    def Score(self, points, truth):
+        """Confusion counts, Jaccard index and accuracy of the model on labelled points"""
+        return Score(np.asarray(truth, dtype=bool), self.Contains(points))
+
+
+def Score(truth, predictions):
+    tp = int(np.count_nonzero(truth & predictions))
+    fp = int(np.count_nonzero(~truth & predictions))
+    tn = int(np.count_nonzero(~truth & ~predictions))
+    fn = int(np.count_nonzero(truth & ~predictions))
+    union = tp + fp + fn
+    return {'TP': tp, 'FP': fp, 'TN': tn, 'FN': fn,
+            'Jaccard': float(tp) / union if union else 1.0,
+            'Accuracy': float(tp + tn) / len(truth) if len(truth) else float('nan')}
+
+
+def CompileModel(model, big_m=bigM, max_boxes=maxBoxes, use_bounds=True):
+    """Enumerates assignments of the binaries depth first, branching only on binaries of constraints which are
+    still undecided, and returns the non-empty boxes as a BoxModel. With `use_bounds` the variable bounds of the
+    model limit every box."""
+    variables = [name for name in model.variables if model.bounds[name][0] != model.bounds[name][1]]
+    columns = dict((name, i) for i, name in enumerate(variables))
+    constraints = _BoxConstraints(model, columns, big_m)
+
+    low = np.full(len(variables), -np.inf)
+    high = np.full(len(variables), np.inf)
+    if use_bounds:
+        for name, i in columns.items():
+            low[i], high[i] = model.bounds[name]
+
+    boxes = []
+
+    def Expand(assignment, undecided, low, high):
+        remaining = []
+        for constraint in undecided:
+            if any(assignment.get(name, value) != value for name, value in constraint.active.items()):
+                continue
+            if all(name in assignment for name in constraint.active):
+                if constraint.upper:
+                    high[constraint.axis] = min(high[constraint.axis], constraint.threshold)
+                else:
+                    low[constraint.axis] = max(low[constraint.axis], constraint.threshold)
+            else:
+                remaining.append(constraint)
+        if np.any(low > high):
+            return
+
+        if not remaining:
+            if len(boxes) >= max_boxes:
+                raise ValueError('More than {} boxes'.format(max_boxes))
+            boxes.append((low, high))
+            return
+
+        counts = Counter(name for constraint in remaining for name in constraint.active if name not in assignment)
+        branch = min(counts, key=lambda name: (-counts[name], _NaturalKey(name)))
+        for value in (0, 1):
+            assignment[branch] = value
+            Expand(assignment, remaining, low.copy(), high.copy())
+        del assignment[branch]
+
+    Expand({}, constraints, low, high)
+    low, high = RemoveContainedBoxes(np.array([box[0] for box in boxes]), np.array([box[1] for box in boxes]))
+    return BoxModel(variables, low, high)
+
+
+def RemoveContainedBoxes(low, high, block_size=256):
+    """Drops boxes lying inside another box (of two identical boxes the first is kept)"""
+    keep = np.ones(len(low), dtype=bool)
+    for start in xrange(0, len(low), block_size):
+        block = slice(start, start + block_size)
+        contained = np.all(low[block, np.newaxis, :] >= low[np.newaxis], axis=2) & \
+            np.all(high[block, np.newaxis, :] <= high[np.newaxis], axis=2)
+        identical = np.all(low[block, np.newaxis, :] == low[np.newaxis], axis=2) & \
+            np.all(high[block, np.newaxis, :] == high[np.newaxis], axis=2)
+        rows = np.arange(start, min(start + block_size, len(low)))
+        # A box is not dropped for itself, nor for an identical box following it
+        contained &= ~identical | (np.arange(len(low))[np.newaxis] < rows[:, np.newaxis])
+        keep[rows] = ~np.any(contained, axis=1)
+    return low[keep], high[keep]
+
+
+def LoadPoints(path):
+    """Rows of a .npy file or a csv file with a header (as written by DataGenerator.DumpToFile)"""
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+    return np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+
+
+if __name__ == "__main__":
+    from dataGeneration import benchmarks
+    parser = argparse.ArgumentParser(description='Scores models in LP format on labelled points without a solver')
+    parser.add_argument('models', nargs='+', help='.lp files written by ModelCreator')
+    parser.add_argument('--points', help='.npy or .csv file of points with the class in the last column, '
+                                         'e.g. homogenous_test.npy of the dataset cache')
+    parser.add_argument('--benchmark', choices=sorted(benchmarks), help='label uniform points of a benchmark')
+    parser.add_argument('--count', type=int, default=1000000, help='number of uniform benchmark points')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--big-m', type=float, default=bigM)
+    args = parser.parse_args()
+
+    for path in args.models:
+        model = CompileModel(ReadLpFile(path), args.big_m)
+        print('== {}: {} boxes over {}'.format(path, model.boxes, ', '.join(model.variables)))
+        if args.points:
+            data = LoadPoints(args.points)
+            points, truth = data[:, :-1], data[:, -1] == 1
+        elif args.benchmark:
+            benchmark = benchmarks[args.benchmark](len(model.variables))
+            points = benchmark.Draw(np.random.RandomState(args.seed), args.count)
+            truth = benchmark.Feasible(points)
+        else:
+            continue
+        print(' '.join('{} {}'.format(key, value) for key, value in sorted(model.Score(points, truth).items())))
@@ -0,0 +1,304 @@
+from __future__ import print_function
+import argparse
+import os
+from collections import OrderedDict
+import numpy as np
+from lpModel import _NaturalKey
+from lpReader import Bound, Constraint, Objective, VariableTypes, ReadRecords, WriteRecords
+
+# Absolute tolerance of comparisons. Right hand sides of big-M rows are of the order of M, so a relative
+# tolerance would accept differences far above the feasibility tolerance of the solvers (1e-6)
+tolerance = 1e-9
+
+
+class LpProblem:
+    """Objective, constraints, bounds and variable types of an LP file, kept in the order of the file.
+
+    `bounds` holds the bounds seen by a solver: declared ones, [0, 1] for binaries and [0, inf) otherwise.
+    """
+
+    def __init__(self, objective, constraints, declared, types):
+        self.objective = objective
+        self.constraints = constraints
+        self.types = types
+        self.declared = set(declared)
+        names = list(declared)
+        for constraint in constraints:
+            names.extend(variable for _, variable in constraint.terms)
+        if objective is not None:
+            names.extend(variable for _, variable in objective.terms)
+        names.extend(types)
+
+        self.bounds = OrderedDict()
+        for name in names:
+            if name in self.bounds:
+                continue
+            lower, upper = declared.get(name, (None, None))
+            binary = types.get(name) == 'binaries'
+            self.bounds[name] = (0.0 if lower is None else lower,
+                                 (1.0 if binary else np.inf) if upper is None else upper)
+
+    def Continuous(self, name):
+        return name not in self.types
+
+    def DomainVariables(self):
+        """Continuous variables which are not fixed, in the order of lpModel.LpModel.variables: those with
+        declared bounds as declared, the others in natural order"""
+        continuous = [name for name, (lower, upper) in self.bounds.items()
+                      if self.Continuous(name) and lower != upper]
+        declared = [name for name in continuous if name in self.declared]
+        rest = sorted((name for name in continuous if name not in self.declared), key=_NaturalKey)
+        return declared + rest
+
+    def Records(self):
+        if self.objective is not None:
+            yield self.objective
+        for constraint in self.constraints:
+            yield constraint
+        for name, (lower, upper) in self.bounds.items():
+            binary = self.types.get(name) == 'binaries'
+            if (lower, upper) != ((0.0, 1.0) if binary else (0.0, np.inf)):
+                yield Bound(name, lower, upper)
+        for section in ('binaries', 'generals'):
+            names = [name for name, kind in self.types.items() if kind == section]
+            for start in xrange(0, len(names), 16):
+                yield VariableTypes(section, names[start:start + 16])
+
+
+def ReadProblem(lines):
+    objective, constraints = None, []
+    declared, types = OrderedDict(), OrderedDict()
+    for record in ReadRecords(lines):
+        if isinstance(record, Objective):
+            objective = record
+        elif isinstance(record, Constraint):
+            constraints.append(record)
+        elif isinstance(record, Bound):
+            lower, upper = declared.get(record.name, (None, None))
+            declared[record.name] = (lower if record.lower is None else record.lower,
+                                     upper if record.upper is None else record.upper)
+        elif record.section in ('binaries', 'generals'):
+            types.update((name, record.section) for name in record.names)
+        else:
+            raise ValueError('{} sections are not supported'.format(record.section))
+    return LpProblem(objective, constraints, declared, types)
+
+
+def LoadDomain(path):
+    """Rows of (lower, upper) from a .npy file (boundries.npy of the dataset cache) or from a text file with
+    one 'lower,upper' line per variable (the NewBoundries column of the results)"""
+    if path.endswith('.npy'):
+        domain = np.load(path)
+    else:
+        domain = np.loadtxt(path, delimiter=',', ndmin=2)
+    return np.asarray(domain, dtype=np.float64).reshape(-1, 2)
+
+
+def _Activity(terms, bounds):
+    """Smallest and largest value of the terms over the bounds"""
+    low = high = 0.0
+    for coefficient, variable in terms:
+        lower, upper = bounds[variable]
+        if coefficient > 0:
+            low += coefficient * lower
+            high += coefficient * upper
+        else:
+            low += coefficient * upper
+            high += coefficient * lower
+    return low, high
+
+
+def _Nonzeros(constraints):
+    return sum(len(constraint.terms) + len(constraint.quadratic) for constraint in constraints)
+
+
+def _MaxCoefficient(constraints):
+    return max([abs(coefficient) for constraint in constraints for coefficient, _ in constraint.terms] or [0.0])
+
+
+class _Row:
+    """Linear constraint as terms <= rhs; `negated` if it was a '>=' constraint"""
+
+    def __init__(self, constraint):
+        self.name = constraint.name
+        self.equality = constraint.sense == '='
+        self.negated = constraint.sense == '>='
+        sign = -1.0 if self.negated else 1.0
+        self.terms = [(sign * coefficient, variable) for coefficient, variable in constraint.terms if coefficient]
+        self.rhs = sign * constraint.rhs
+
+    def Constraint(self):
+        sign = -1.0 if self.negated else 1.0
+        sense = '=' if self.equality else '>=' if self.negated else '<='
+        return Constraint(self.name, [(sign * coefficient, variable) for coefficient, variable in self.terms],
+                          [], sense, sign * self.rhs)
+
+
+def _Dominates(first, second):
+    """Whether every point satisfying `first` satisfies `second`. Both rows are given as (binary coefficients,
+    rhs) over the same continuous part: the difference of their right hand sides has to cover the largest
+    amount by which the binary part of `second` can exceed the one of `first`"""
+    binaries = set(first[0]).union(second[0])
+    excess = sum(max(0.0, second[0].get(name, 0.0) - first[0].get(name, 0.0)) for name in binaries)
+    return excess <= second[1] - first[1] + tolerance
+
+
+def _RemoveDominated(rows, continuous):
+    """Drops rows implied by another row of the same continuous part. Returns the remaining rows, the number of
+    duplicates and the number of other dominated rows"""
+    # Continuous parts are compared scaled to a largest coefficient of 1
+    groups = OrderedDict()
+    for row in rows:
+        terms = [(coefficient, variable) for coefficient, variable in row.terms if continuous(variable)]
+        scale = max([abs(coefficient) for coefficient, _ in terms] or [1.0])
+        key = (row.equality, tuple(sorted((variable, float('{:.12g}'.format(coefficient / scale)))
+                                          for coefficient, variable in terms)))
+        binary = dict((variable, coefficient / scale) for coefficient, variable in row.terms
+                      if not continuous(variable))
+        groups.setdefault(key, []).append((row, (binary, row.rhs / scale)))
+
+    dominated, duplicates = set(), 0
+    for (equality, _), group in groups.items():
+        kept = []
+        for row, scaled in group:
+            if equality:
+                covered = [other for other in kept if _Dominates(other[1], scaled) and _Dominates(scaled, other[1])]
+            else:
+                covered = [other for other in kept if _Dominates(other[1], scaled)]
+            if covered:
+                dominated.add(id(row))
+                duplicates += any(_Dominates(scaled, other[1]) for other in covered)
+                continue
+            if not equality:
+                for other in kept:
+                    if _Dominates(scaled, other[1]):
+                        dominated.add(id(other[0]))
+                kept = [other for other in kept if id(other[0]) not in dominated]
+            kept.append((row, scaled))
+    return [row for row in rows if id(row) not in dominated], duplicates, len(dominated) - duplicates
+
+
+def Presolve(problem, domain=None):
+    """Tightens `problem` in place and returns a report of the reductions.
+
+    Constraints of a single continuous variable become bounds, intersected with `domain` (one (lower, upper)
+    row per variable of DomainVariables). Constraints implied by the bounds, duplicated or dominated by another
+    constraint of the same continuous part are dropped. Finally every binary coefficient is reduced to the
+    smallest value relaxing the constraint over the bounds when the binary leaves its active value, which turns
+    the fixed big-M of ModelCreator into one M per constraint. The set of feasible points is unchanged.
+    """
+    report = OrderedDict([('Rows', len(problem.constraints)), ('Nonzeros', _Nonzeros(problem.constraints)),
+                          ('MaxCoefficient', _MaxCoefficient(problem.constraints))])
+    bounds = problem.bounds
+
+    if domain is not None:
+        variables = problem.DomainVariables()
+        if len(domain) != len(variables):
+            raise ValueError('Domain has {} rows for {} variables'.format(len(domain), len(variables)))
+        for name, (lower, upper) in zip(variables, domain):
+            bounds[name] = (max(bounds[name][0], lower), min(bounds[name][1], upper))
+
+    # Constraints of one continuous variable are bounds
+    rows, others = [], []
+    bound_rows = 0
+    for constraint in problem.constraints:
+        if constraint.quadratic:
+            others.append(constraint)
+            continue
+        row = _Row(constraint)
+        if len(row.terms) == 1 and problem.Continuous(row.terms[0][1]):
+            coefficient, variable = row.terms[0]
+            lower, upper = bounds[variable]
+            value = row.rhs / coefficient
+            if coefficient > 0 or row.equality:
+                upper = min(upper, value)
+            if coefficient < 0 or row.equality:
+                lower = max(lower, value)
+            bounds[variable] = (lower, upper)
+            bound_rows += 1
+        else:
+            rows.append(row)
+    for name, (lower, upper) in bounds.items():
+        if lower > upper + tolerance:
+            raise ValueError('Bounds of {} are infeasible: [{!r}, {!r}]'.format(name, lower, upper))
+    report['BoundRows'] = bound_rows
+
+    rows, duplicates, dominated = _RemoveDominated(rows, problem.Continuous)
+
+    # Coefficient tightening of the binaries, then rows made redundant by the bounds
+    tightened, redundant, dropped_terms = 0, 0, 0
+    tight_rows = []
+    for row in rows:
+        if not row.equality:
+            for i, (coefficient, variable) in enumerate(row.terms):
+                if problem.types.get(variable) != 'binaries' or bounds[variable] != (0.0, 1.0):
+                    continue
+                high = _Activity(row.terms, bounds)[1]
+                # Largest activity when the binary is at its relaxing value (0 for positive coefficients)
+                relaxed = high - coefficient if coefficient > 0 else high + coefficient
+                if not np.isfinite(high) or not relaxed < row.rhs < high:
+                    continue
+                if coefficient > 0:
+                    row.terms[i] = (coefficient - (row.rhs - relaxed), variable)
+                    row.rhs = relaxed
+                else:
+                    row.terms[i] = (row.rhs - relaxed + coefficient, variable)
+                tightened += 1
+            if _Activity(row.terms, bounds)[1] <= row.rhs + tolerance:
+                redundant += 1
+                continue
+            kept_terms = [(coefficient, variable) for coefficient, variable in row.terms
+                          if abs(coefficient) > tolerance]
+            dropped_terms += len(row.terms) - len(kept_terms)
+            row.terms = kept_terms
+        tight_rows.append(row)
+
+    # Tightened coefficients depend on the bounds, which exposes more dominated rows
+    rows, tight_duplicates, tight_dominated = _RemoveDominated(tight_rows, problem.Continuous)
+    report['Duplicates'] = duplicates + tight_duplicates
+    report['Dominated'] = dominated + tight_dominated
+    result = [row.Constraint() for row in rows]
+
+    # The constraints keep their order in the file
+    order = dict((constraint.name, i) for i, constraint in enumerate(problem.constraints))
+    problem.constraints = sorted(result + others, key=lambda constraint: order[constraint.name])
+    report['Redundant'] = redundant
+    report['TightenedCoefficients'] = tightened
+    report['DroppedTerms'] = dropped_terms
+    report['RowsAfter'] = len(problem.constraints)
+    report['NonzerosAfter'] = _Nonzeros(problem.constraints)
+    report['MaxCoefficientAfter'] = _MaxCoefficient(problem.constraints)
+    return report
+
+
+def PresolveFile(path, output, domain=None):
+    with open(path) as f:
+        problem = ReadProblem(f)
+    report = Presolve(problem, domain)
+    temporary = '{}.tmp{}'.format(output, os.getpid())
+    with open(temporary, 'w') as f:
+        WriteRecords(f, problem.Records(), 'Presolved from {}'.format(os.path.basename(path)))
+    os.rename(temporary, output)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Tightens big-M coefficients and removes redundant constraints '
+                                                 'of models in LP format')
+    parser.add_argument('models', nargs='+', help='.lp files written by ModelCreator')
+    parser.add_argument('--domain', help='bounds of the continuous variables: boundries.npy of the dataset cache '
+                                         'or a file of lower,upper lines (NewBoundries of the results)')
+    parser.add_argument('--suffix', default='.presolved', help='written models are <model><suffix>.lp')
+    args = parser.parse_args()
+
+    domain = LoadDomain(args.domain) if args.domain else None
+    for path in args.models:
+        output = '{}{}.lp'.format(os.path.splitext(path)[0], args.suffix)
+        report = PresolveFile(path, output, domain)
+        print('== {} -> {}'.format(path, output))
+        print('rows {} -> {} ({} bounds, {} duplicates, {} dominated, {} redundant)'.format(
+            report['Rows'], report['RowsAfter'], report['BoundRows'], report['Duplicates'], report['Dominated'],
+            report['Redundant']))
+        print('nonzeros {} -> {}, largest coefficient {:g} -> {:g}, {} binary coefficients tightened'.format(
+            report['Nonzeros'], report['NonzerosAfter'], report['MaxCoefficient'], report['MaxCoefficientAfter'],
+            report['TightenedCoefficients']))
@@ -0,0 +1,262 @@
+import re
+from collections import namedtuple
+
+senses = {'<=': '<=', '=<': '<=', '<': '<=', '>=': '>=', '=>': '>=', '>': '>=', '=': '='}
+objectiveSenses = {'maximize': 'max', 'maximum': 'max', 'max': 'max',
+                   'minimize': 'min', 'minimum': 'min', 'min': 'min'}
+sectionKeywords = {'subject to': 'constraints', 'such that': 'constraints', 'st': 'constraints',
+                   's.t.': 'constraints', 'st.': 'constraints', 'bounds': 'bounds', 'bound': 'bounds',
+                   'binaries': 'binaries', 'binary': 'binaries', 'bin': 'binaries',
+                   'generals': 'generals', 'general': 'generals', 'gen': 'generals',
+                   'semi-continuous': 'semis', 'semis': 'semis', 'semi': 'semis', 'sos': 'sos'}
+
+numberPattern = r'(?:(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|[iI][nN][fF](?:[iI][nN][iI][tT][yY])?\b)'
+namePattern = r'[A-Za-z_][\w.\[\]]*'
+# One term of an expression: sign, coefficient, variable and a square ('^ 2') or a second variable ('* y')
+termPattern = re.compile(r'\s*([+-]?)\s*({0})?\s*(?:({1})(?:\s*\^\s*(\d+)|\s*\*\s*({1}))?)?\s*'
+                         .format(numberPattern, namePattern))
+# Characters which cannot appear in the linear and in the quadratic part of an expression
+invalidPatterns = (re.compile(r'[^\w\s.+\-\[\]]'), re.compile(r'[^\w\s.+\-\[\]^*]'))
+sensePattern = re.compile(r'[<>]=?|=[<>]?')
+# Quadratic part: optional sign, the terms in brackets and an optional divisor ('- [ ... ] / 2')
+bracketPattern = re.compile(r'([+-]?)\s*\[([^\]]*)\]\s*(?:/\s*({}))?'.format(numberPattern))
+labelPattern = re.compile(r'([^\s:\[\]]+)\s*:(?!=)(.*)')
+
+# Records of an LP file, yielded by ReadRecords in the order of the file.
+# Terms are (coefficient, variable); quadratic terms (coefficient, variable, variable)
+Objective = namedtuple('Objective', ['sense', 'name', 'terms', 'quadratic', 'constant'])
+Constraint = namedtuple('Constraint', ['name', 'terms', 'quadratic', 'sense', 'rhs'])
+# Lower or upper is None when the line leaves it unchanged
+Bound = namedtuple('Bound', ['name', 'lower', 'upper'])
+# Variables declared in the Binaries, Generals, ... section `section`
+VariableTypes = namedtuple('VariableTypes', ['section', 'names'])
+
+
+def _Terms(text, terms, quadratic, scale=1.0, quadratic_part=False):
+    """Adds the terms of `text` to `terms` and `quadratic`, returns the sum of its constants"""
+    constant = 0.0
+    if invalidPatterns[quadratic_part].search(text):
+        raise ValueError('Cannot parse LP expression: {}'.format(text))
+    for sign, number, name, power, other in termPattern.findall(text):
+        if not name:
+            if number:
+                constant += scale * float(sign + number)
+            elif sign:
+                raise ValueError('Dangling sign in LP expression: {}'.format(text))
+            continue
+        coefficient = scale * float(sign + number) if number else (-scale if sign == '-' else scale)
+        if power:
+            if power != '2':
+                raise ValueError('Only squares are supported in LP expressions: {}'.format(text))
+            quadratic.append((coefficient, name, name))
+        elif other:
+            quadratic.append((coefficient, name, other))
+        else:
+            terms.append((coefficient, name))
+    return constant
+
+
+def ParseExpression(text):
+    """Parses a linear expression with an optional quadratic part in brackets ('[ 2 x ^ 2 + x * y ] / 2')
+    and an optional sense and right hand side. Returns (terms, quadratic, constant, sense, rhs)"""
+    sense, rhs = None, None
+    match = sensePattern.search(text)
+    if match is not None:
+        sense = senses[match.group()]
+        rhs = _Terms(text[match.end():], [], [])
+        text = text[:match.start()]
+
+    terms, quadratic = [], []
+    constant = 0.0
+    if '[' in text:
+        linear = []
+        position = 0
+        for bracket in bracketPattern.finditer(text):
+            linear.append(text[position:bracket.start()])
+            scale = -1.0 if bracket.group(1) == '-' else 1.0
+            if bracket.group(3):
+                scale /= float(bracket.group(3))
+            constant += _Terms(bracket.group(2), terms, quadratic, scale, True)
+            position = bracket.end()
+        linear.append(text[position:])
+        text = ' '.join(linear)
+    constant += _Terms(text, terms, quadratic)
+    return terms, quadratic, constant, sense, rhs
+
+
+def ParseConstraint(name, text):
+    """Parses '3 x + 1e+006 b0 <= 7' into a Constraint"""
+    terms, quadratic, constant, sense, rhs = ParseExpression(text)
+    if sense is None or rhs is None:
+        raise ValueError('Constraint {} has no right hand side: {}'.format(name, text))
+    return Constraint(name, terms, quadratic, sense, rhs - constant)
+
+
+def ParseBound(line):
+    """Parses 'l <= x <= u', 'x >= l', 'x <= u', 'x = v' or 'x free' into a Bound"""
+    parts = line.split()
+    if len(parts) == 2 and parts[1].lower() == 'free':
+        return Bound(parts[0], float('-inf'), float('inf'))
+
+    tokens = re.findall(r'[<>]=?|=[<>]?|[^\s<>=]+', line)
+    if len(tokens) == 5:
+        return Bound(tokens[2], float(tokens[0]), float(tokens[4]))
+    if len(tokens) == 3 and tokens[1] == '=':
+        value = float(tokens[2])
+        return Bound(tokens[0], value, value)
+    if len(tokens) == 3:
+        try:
+            value, name = float(tokens[0]), tokens[2]
+            # 'l <= x' bounds from below
+            upper = senses[tokens[1]] == '>='
+        except ValueError:
+            value, name = float(tokens[2]), tokens[0]
+            upper = senses[tokens[1]] == '<='
+        return Bound(name, None, value) if upper else Bound(name, value, None)
+    raise ValueError('Cannot parse bound: {}'.format(line))
+
+
+def ReadRecords(lines):
+    """Yields the Objective, Constraints, Bounds and VariableTypes of an LP file one by one.
+
+    `lines` is any iterable of lines (e.g. an open file); only the lines of the record being read are kept,
+    so memory does not grow with the size of the model. Constraints wrapped over several lines are joined.
+    """
+    section, sense = None, None
+    label, pending = None, []
+
+    def Flush():
+        if section == 'objective':
+            terms, quadratic, constant, _, _ = ParseExpression(' '.join(pending))
+            return Objective(sense, label, terms, quadratic, constant)
+        if section == 'constraints' and label is not None:
+            return ParseConstraint(label, ' '.join(pending))
+        return None
+
+    for raw in lines:
+        line = raw.split('\\', 1)[0].strip()
+        if not line:
+            continue
+        keyword = ' '.join(line.lower().split())
+        if keyword in objectiveSenses or keyword in sectionKeywords or keyword == 'end':
+            record = Flush()
+            if record is not None:
+                yield record
+            label, pending = None, []
+            if keyword == 'end':
+                section = None
+                break
+            if keyword in objectiveSenses:
+                section, sense = 'objective', objectiveSenses[keyword]
+            else:
+                section = sectionKeywords[keyword]
+            continue
+
+        if section == 'objective':
+            match = labelPattern.match(line) if not pending else None
+            if match:
+                label, line = match.group(1), match.group(2)
+            pending.append(line)
+        elif section == 'constraints':
+            match = labelPattern.match(line)
+            if match:
+                record = Flush()
+                if record is not None:
+                    yield record
+                label, pending = match.group(1), [match.group(2)]
+            else:
+                pending.append(line)
+        elif section == 'bounds':
+            yield ParseBound(line)
+        elif section is not None:
+            yield VariableTypes(section, line.split())
+
+    record = Flush()
+    if record is not None:
+        yield record
+
+
+def _Number(value):
+    if value == float('inf'):
+        return '+inf'
+    if value == float('-inf'):
+        return '-inf'
+    return repr(float(value))
+
+
+def FormatExpression(terms, quadratic=(), halve=False, width=78):
+    """Lines of an expression in LP format. With `halve` the quadratic part is written as '[ ... ] / 2',
+    as required in objectives"""
+    parts = ['{} {}{}'.format('-' if coefficient < 0 else '+',
+                              '' if abs(coefficient) == 1 else _Number(abs(coefficient)) + ' ', variable)
+             for coefficient, variable in terms]
+    if quadratic:
+        scale = 2.0 if halve else 1.0
+        parts.append('+ [')
+        parts.extend('{} {} {}'.format('-' if coefficient < 0 else '+', _Number(abs(coefficient) * scale),
+                                       '{} ^ 2'.format(first) if first == second else '{} * {}'.format(first, second))
+                     for coefficient, first, second in quadratic)
+        parts.append('] / 2' if halve else ']')
+    if parts and parts[0].startswith('+ '):
+        parts[0] = parts[0][2:]
+
+    lines, line = [], ''
+    for part in parts:
+        if line and len(line) + len(part) + 1 > width:
+            lines.append(line)
+            line = ''
+        line = '{} {}'.format(line, part) if line else part
+    return lines + [line] if line else lines or ['0']
+
+
+def FormatBound(bound):
+    name, lower, upper = bound
+    if lower is not None and lower == upper:
+        return '{} = {}'.format(name, _Number(lower))
+    if lower == float('-inf') and upper == float('inf'):
+        return '{} free'.format(name)
+    if lower is None:
+        return '{} <= {}'.format(name, _Number(upper))
+    if upper is None:
+        return '{} >= {}'.format(name, _Number(lower))
+    return '{} <= {} <= {}'.format(_Number(lower), name, _Number(upper))
+
+
+def WriteRecords(f, records, title=None):
+    """Writes records as yielded by ReadRecords to the file `f`; WriteRecords(f, ReadRecords(lines))
+    gives an equivalent model. Records have to be grouped by section"""
+    headers = {'min': 'Minimize', 'max': 'Maximize', 'constraints': 'Subject To', 'bounds': 'Bounds',
+               'binaries': 'Binaries', 'generals': 'Generals', 'semis': 'Semi-Continuous', 'sos': 'SOS'}
+    if title:
+        f.write('\\ {}\n'.format(title))
+    section = None
+    for record in records:
+        if isinstance(record, Objective):
+            current = record.sense
+        elif isinstance(record, Constraint):
+            current = 'constraints'
+        elif isinstance(record, Bound):
+            current = 'bounds'
+        else:
+            current = record.section
+        if current != section:
+            f.write('{}\n'.format(headers[current]))
+            section = current
+
+        if isinstance(record, Objective):
+            lines = FormatExpression(record.terms, record.quadratic, True)
+            if record.constant:
+                lines[-1] += ' {} {}'.format('-' if record.constant < 0 else '+', _Number(abs(record.constant)))
+            if record.name:
+                lines[0] = '{}: {}'.format(record.name, lines[0])
+        elif isinstance(record, Constraint):
+            lines = FormatExpression(record.terms, record.quadratic)
+            lines[0] = '{}: {}'.format(record.name, lines[0])
+            lines[-1] += ' {} {}'.format(record.sense, _Number(record.rhs))
+        elif isinstance(record, Bound):
+            lines = [FormatBound(record)]
+        else:
+            lines = [' '.join(record.names)]
+        for line in lines:
+            f.write(' {}\n'.format(line))
+    f.write('End\n')
@@ -1,125 +1,197 @@
+import argparse
 import os
+import sys
 from os.path import isfile, join
+from adaptiveSeeds import AdaptiveSeeds, minimumSeeds, seedBatch
+from grids import Arguments, ComponentsGrid, TreeParametersGrid, ExamplesGrid, benchmarks, dimensionsRange, \
+    experimentGrids
+from halving import PrintRungs, SearchPlan, maximumSeeds, minimumSeeds as searchMinimumSeeds, objectiveCosts, \
+    reduction
+from ledger import MissingWork, OpenLedger, RecordState
+from localRunner import RunLocally, defaultCommand
+from shards import shardsVariable
 
 tasks = 1
 partition = 'lab-44-student'
 exePath = '~/Release/OneClassClassification.exe'
 scriptsPath = './scripts'
 
-# Applicaction configuation
-feasibleExamples = 500
-k = 1
-treeJoin = 10
-treeHeight = 10
-benchmarks = {'circle', 'cube', 'simplex'}
+# Largest job array accepted by the scheduler (MaxArraySize - 1)
+maxArraySize = 1000
 
+# Generated data sets are cached in this directory, bounded to the given size in megabytes
+# (see GlobalVariables.DatasetCacheVariable)
+datasetCacheVariable = 'OCC_DATASET_CACHE'
+datasetCacheSizeVariable = 'OCC_DATASET_CACHE_MB'
+dataGeneratorVariable = 'OCC_DATA_GENERATOR'
 
-def ComponentExperiment():
-    # slurm configuration
-    experiment_name = 'Components'
-    components_arr = [0.5, 1, 2]
+# Trees loaded from the dataset cache, learned by c45.py (see GlobalVariables.TreeLearnerVariable)
+treeLearnerVariable = 'OCC_TREE_LEARNER'
 
-    for seed in xrange(0, 30):
-        for ben in benchmarks:
-            for dimensions in xrange(3, 8, 1):
-                for c in components_arr:
-                    components = int(round(dimensions * c))
-                    f = open('cmpEx/scripts/{}_{}_{}_{}_{}.sh'.format("cmp", ben, dimensions, components, seed),
-                             'wb')
+# Trees, rules, constraints and models of the runs are kept in this directory (see GlobalVariables.ArtifactsVariable)
+artifactsVariable = 'OCC_ARTIFACTS'
 
-                    f.write('#!/bin/bash\n')
+# Target width of the confidence interval of HJaccard (see GlobalVariables.EvaluationWidthVariable)
+evaluationWidthVariable = 'OCC_EVALUATION_CI_WIDTH'
 
-                    # sbatch
-                    f.write('#SBATCH -p {}\n'.format(partition))
+# Threads of a run (see GlobalVariables.ThreadsVariable)
+threadsVariable = 'OCC_THREADS'
 
-                    f.write('\nexport LD_LIBRARY_PATH=~/gurobi702/linux64/lib/\n')
-                    f.write('export GRB_LICENSE_FILE=~/gurobi-$(hostname).lic\n')
 
-                    f.write('\nsrun mono {} '.format(exePath))
-                    f.write('{} '.format(feasibleExamples))
-                    f.write('{} '.format(dimensions))
-                    f.write('{} '.format(k))
-                    f.write('{} '.format(treeJoin))
-                    f.write('{} '.format(treeHeight))
-                    f.write('{} '.format(seed))
-                    f.write('{} '.format(ben))
-                    f.write('{} '.format(components))
-                    f.write('{}'.format(experiment_name))
+def WriteEnvironment(f):
+    f.write('\nexport LD_LIBRARY_PATH=~/gurobi702/linux64/lib/\n')
+    f.write('export GRB_LICENSE_FILE=~/gurobi-$(hostname).lic\n')
 
-                    f.close()
 
+def DatasetCacheEnvironment(directory, size_mb=None, generator=None):
+    """Environment variables enabling the dataset cache in `directory`. With `generator` 'numpy' runs only load
+    data sets written by dataGeneration.py"""
+    if not directory:
+        return {}
+    environment = {datasetCacheVariable: os.path.abspath(os.path.expanduser(directory))}
+    if size_mb is not None:
+        environment[datasetCacheSizeVariable] = str(size_mb)
+    if generator is not None:
+        environment[dataGeneratorVariable] = generator
+    return environment
 
-def TreeParametersExperiment(experiment_name):
-    multiplier_arr = [1, 1.5, 2]
 
-    for seed in xrange(0, 30):
-        for ben in benchmarks:
-            for dimension in xrange(3, 8, 1):
-                for m1 in multiplier_arr:
-                    j = int((round(m1 * dimension)))
+def RunEnvironment(args):
+    """Environment variables of the runs requested by command line options"""
+    environment = DatasetCacheEnvironment(args.dataset_cache, args.dataset_cache_mb, args.data_generator)
+    if args.evaluation_ci_width is not None:
+        environment[evaluationWidthVariable] = repr(args.evaluation_ci_width)
+    if args.tree_learner is not None:
+        environment[treeLearnerVariable] = args.tree_learner
+    if args.artifacts:
+        environment[artifactsVariable] = os.path.abspath(os.path.expanduser(args.artifacts))
+    return environment
 
-                    for m2 in multiplier_arr:
-                        max_height = int(round(m2 * j))
-                        f = open('treeEx/scripts/{}_{}_{}_{}_{}.sh'.format(ben, dimension, j, max_height, seed),
-                                 'wb')
 
-                        f.write('#!/bin/bash\n')
+def ThreadsByDimension(value):
+    """Parses a thread budget per number of dimensions, e.g. '6:4,7:8'"""
+    try:
+        budget = dict((int(dimensions), int(threads)) for dimensions, threads in
+                      (item.split(':') for item in value.split(',')))
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected dimensions:threads pairs, e.g. 6:4,7:8')
+    if any(threads < 1 for threads in budget.values()):
+        raise argparse.ArgumentTypeError('every budget needs at least one thread')
+    return budget
 
-                        # sbatch
-                        f.write('#SBATCH -p {}\n'.format(partition))
 
-                        f.write('\nexport LD_LIBRARY_PATH=~/gurobi702/linux64/lib/\n')
-                        f.write('export GRB_LICENSE_FILE=~/gurobi-$(hostname).lic\n')
+def SplitByThreads(configurations, threads=1, by_dimension=None):
+    """Groups configurations by their thread budget: `threads`, or the budget of their number of dimensions in
+    `by_dimension`. Returns [(threads, configurations)] ordered by threads"""
+    groups = {}
+    for configuration in configurations:
+        budget = (by_dimension or {}).get(configuration.Dimensions, threads)
+        groups.setdefault(budget, []).append(configuration)
+    return sorted(groups.items())
 
-                        f.write('\nsrun mono {} '.format(exePath))
-                        f.write('{} '.format(feasibleExamples))
-                        f.write('{} '.format(dimension))
-                        f.write('{} '.format(k))
-                        f.write('{} '.format(j))
-                        f.write('{} '.format(max_height))
-                        f.write('{} '.format(seed))
-                        f.write('{} '.format(ben))
 
-                        components = dimension
+def NextSeeds(db_path, grid, args):
+    """Configurations of the next batch of seeds with --seed-ci-width, all of `grid` otherwise"""
+    if args.seed_ci_width is None:
+        return grid
+    conn = OpenLedger(db_path)
+    if conn is None:
+        return [configuration for configuration in grid if configuration.Seed < args.min_seeds]
+    try:
+        return AdaptiveSeeds(conn, list(grid), args.seed_ci_width, args.compare, args.min_seeds, args.batch)[0]
+    finally:
+        conn.close()
 
-                        f.write('{} '.format(components))
-                        f.write('"{}"'.format(experiment_name))
 
+def WriteTaskScript(path, configuration):
+    f = open(path, 'wb')
 
-def ExmaplesExperiment():
-    experiment_name = 'Examples'
+    f.write('#!/bin/bash\n')
+
+    # sbatch
+    f.write('#SBATCH -p {}\n'.format(partition))
+
+    WriteEnvironment(f)
 
-    for seed in xrange(0, 30):
-        for ben in benchmarks:
-            for dimension in xrange(3, 8, 1):
-                for examples in xrange(100, 501, 100):
-                    f = open('examplesEx/scripts/{}_{}_{}_{}.sh'.format(ben, dimension, examples, seed),
-                             'wb')
+    arguments = Arguments(configuration)
+    arguments[-1] = '"{}"'.format(arguments[-1])
+    f.write('\nsrun mono {} {}'.format(exePath, ' '.join(arguments)))
 
-                    j = int(round(dimension*2.0))
-                    height = int(round(j*2.0))
+    f.close()
 
-                    f.write('#!/bin/bash\n')
 
-                    # sbatch
-                    f.write('#SBATCH -p {}\n'.format(partition))
+def ComponentExperiment():
+    # slurm configuration
+    for cfg in ComponentsGrid():
+        WriteTaskScript('cmpEx/scripts/{}_{}_{}_{}_{}.sh'.format("cmp", cfg.Benchmark, cfg.Dimensions,
+                                                                 cfg.Components, cfg.Seed), cfg)
 
-                    f.write('\nexport LD_LIBRARY_PATH=~/gurobi702/linux64/lib/\n')
-                    f.write('export GRB_LICENSE_FILE=~/gurobi-$(hostname).lic\n')
 
-                    f.write('\nsrun mono {} '.format(exePath))
-                    f.write('{} '.format(examples))
-                    f.write('{} '.format(dimension))
-                    f.write('{} '.format(k))
-                    f.write('{} '.format(j))
-                    f.write('{} '.format(height))
-                    f.write('{} '.format(seed))
-                    f.write('{} '.format(ben))
+def TreeParametersExperiment(experiment_name):
+    for cfg in TreeParametersGrid(experiment_name):
+        WriteTaskScript('treeEx/scripts/{}_{}_{}_{}_{}.sh'.format(cfg.Benchmark, cfg.Dimensions, cfg.Join,
+                                                                  cfg.MaxHeight, cfg.Seed), cfg)
 
-                    components = dimension
 
-                    f.write('{} '.format(components))
-                    f.write('"{}"'.format(experiment_name))
+def ExmaplesExperiment():
+    for cfg in ExamplesGrid():
+        WriteTaskScript('examplesEx/scripts/{}_{}_{}_{}.sh'.format(cfg.Benchmark, cfg.Dimensions,
+                                                                   cfg.FeasibleExamples, cfg.Seed), cfg)
+
+
+def ArrayJob(configurations, directory, name, pack=1, throttle=None, shards=False, environment=None, threads=1):
+    """Writes a manifest with one configuration per line and SLURM array scripts running them.
+
+    Every array task runs `pack` consecutive manifest lines inside a single OneClassClassification.exe
+    process. Arrays larger than maxArraySize are split into several scripts, all listed in
+    submit_<name>.sh. With `shards` every node saves results into its own shard database, to be merged
+    with shards.py. `environment` holds further variables exported by the scripts, e.g. from
+    RunEnvironment. With more than one of `threads` every task asks for as many CPUs and runs with as many
+    threads. Returns the number of array tasks.
+    """
+    manifest_name = '{}.manifest'.format(name)
+    manifest = open(join(directory, manifest_name), 'wb')
+    count = 0
+    for configuration in configurations:
+        manifest.write('\t'.join(Arguments(configuration)) + '\n')
+        count += 1
+    manifest.close()
+
+    tasks = (count + pack - 1) // pack
+    submit = open(join(directory, 'submit_{}.sh'.format(name)), 'wb')
+
+    for chunk, offset in enumerate(xrange(0, tasks, maxArraySize)):
+        size = min(maxArraySize, tasks - offset)
+        script_name = '{}_{}.sh'.format(name, chunk)
+        f = open(join(directory, script_name), 'wb')
+
+        f.write('#!/bin/bash\n')
+
+        # sbatch
+        f.write('#SBATCH -p {}\n'.format(partition))
+        f.write('#SBATCH -J {}\n'.format(name))
+        f.write('#SBATCH --array=0-{}{}\n'.format(size - 1, '%{}'.format(throttle) if throttle else ''))
+        if threads > 1:
+            f.write('#SBATCH --cpus-per-task={}\n'.format(threads))
+
+        WriteEnvironment(f)
+        if shards:
+            f.write('export {}=1\n'.format(shardsVariable))
+        for variable, value in sorted((environment or {}).items()):
+            f.write('export {}="{}"\n'.format(variable, value))
+        if threads > 1:
+            # srun does not inherit --cpus-per-task of the batch script
+            f.write('export SRUN_CPUS_PER_TASK=$SLURM_CPUS_PER_TASK\n')
+            f.write('export {}=$SLURM_CPUS_PER_TASK\n'.format(threadsVariable))
+
+        f.write('\nfirst=$(( ({} + SLURM_ARRAY_TASK_ID) * {} ))\n'.format(offset, pack))
+        f.write('\nsrun mono {} --manifest "$SLURM_SUBMIT_DIR/{}" $first {}\n'.format(exePath, manifest_name, pack))
+        f.close()
+
+        submit.write('sbatch ./{}\n'.format(script_name))
+
+    submit.close()
+    return tasks
 
 
 def MainScriptComponents():
@@ -171,12 +243,167 @@ def MainScriptExamples():
             fa = open('./examplesEx/mainExamples{}.sh'.format(counter), 'wb')
 
 
+def ParseArguments(argv):
+    parser = argparse.ArgumentParser(description='Generates SLURM tasks for the experiments')
+    subparsers = parser.add_subparsers(dest='command')
+
+    array = subparsers.add_parser('array', help='single job array backed by a parameter manifest')
+    array.add_argument('experiment', choices=sorted(experimentGrids))
+    array.add_argument('--seeds', type=int, default=30, help='number of seeds of every configuration')
+    array.add_argument('--db', default='testDatabase.sqlite', help='results database holding the job ledger')
+    array.add_argument('--resubmit', action='store_true', help='submit again runs which are pending or running')
+    array.add_argument('--out', default='.', help='directory for the manifest and array scripts')
+    array.add_argument('--pack', type=int, default=1, help='configurations run by one array task')
+    array.add_argument('--throttle', type=int, help='maximum number of simultaneously running tasks')
+    array.add_argument('--shards', action='store_true', help='save results into one database per node')
+    array.add_argument('--threads', type=int, default=1, help='CPUs requested by every array task and threads '
+                                                                 'of its runs')
+    array.add_argument('--threads-by-dimension', type=ThreadsByDimension, metavar='D:T,...',
+                       help='threads of the runs of the given dimensions, e.g. 6:4,7:8; one array per budget')
+
+    run = subparsers.add_parser('run', help='run the experiment on a local process pool')
+    run.add_argument('experiment', choices=sorted(experimentGrids))
+    run.add_argument('--seeds', type=int, default=30, help='number of seeds of every configuration')
+    run.add_argument('--exe', default=defaultCommand, help='command running a single configuration')
+    run.add_argument('--db', default='testDatabase.sqlite', help='results database holding the job ledger')
+    run.add_argument('--resubmit', action='store_true', help='run again runs which are pending or running')
+    run.add_argument('--workers', type=int, default=1)
+    run.add_argument('--timeout', type=float, help='seconds after which a run is killed')
+    run.add_argument('--retries', type=int, default=0, help='repetitions of a failed or timed out run')
+    run.add_argument('--logs', help='directory for the output of every run')
+    run.add_argument('--threads', type=int, default=1, help='threads of every run, besides --workers runs at once')
+
+    search = subparsers.add_parser('search', help='successive halving over Join, MaxHeight and Components')
+    search.add_argument('--benchmarks', nargs='+', default=sorted(benchmarks), choices=sorted(benchmarks))
+    search.add_argument('--dimensions', nargs='+', type=int, default=list(dimensionsRange))
+    search.add_argument('--fixed-components', action='store_true', help='keep Components equal to the dimensions')
+    search.add_argument('--objective', choices=sorted(objectiveCosts), default='jaccard',
+                        help='maximized mean Jaccard index, less --weight times the mean constraints or terms')
+    search.add_argument('--weight', type=float, default=0.001, help='weight of the size in the objective')
+    search.add_argument('--min-seeds', type=int, default=searchMinimumSeeds, help='seeds of the first rung')
+    search.add_argument('--eta', type=int, default=reduction, help='1/eta of the candidates is promoted')
+    search.add_argument('--max-seeds', type=int, default=maximumSeeds, help='seeds of the last rung')
+    search.add_argument('--db', default='testDatabase.sqlite', help='results database the search reads')
+    search.add_argument('--out', help='write the current rungs as a job array into this directory instead of '
+                                      'running them')
+    search.add_argument('--exe', default=defaultCommand, help='command running a single configuration')
+    search.add_argument('--workers', type=int, default=1)
+    search.add_argument('--timeout', type=float, help='seconds after which a run is killed')
+    search.add_argument('--logs', help='directory for the output of every run')
+    search.add_argument('--threads', type=int, default=1, help='threads of every run, and CPUs of every array task '
+                                                                  'with --out')
+
+    # Options of the runs themselves, see RunEnvironment
+    for subparser in (array, run, search):
+        subparser.add_argument('--dataset-cache', help='directory caching generated data sets, on shared storage '
+                                                       'for job arrays')
+        subparser.add_argument('--dataset-cache-mb', type=int, help='size limit of the dataset cache in megabytes')
+        subparser.add_argument('--data-generator', choices=['numpy'],
+                               help='load data sets generated by dataGeneration.py')
+        subparser.add_argument('--evaluation-ci-width', type=float,
+                               help='evaluate HJaccard on a Halton sequence until its 95%% interval is this narrow')
+        subparser.add_argument('--tree-learner', choices=['numpy'],
+                               help='load trees learned by c45.py from the dataset cache')
+        subparser.add_argument('--artifacts', help='directory on shared storage keeping the tree, rules, constraints '
+                                                   'and model of every run')
+
+    for subparser in (array, run):
+        subparser.add_argument('--seed-ci-width', type=float,
+                               help='add seeds in batches only to configurations whose 95%% intervals of Jaccard, '
+                                    'precision or recall are wider than this; --seeds is the largest number')
+        subparser.add_argument('--min-seeds', type=int, default=minimumSeeds, help='first batch of seeds')
+        subparser.add_argument('--batch', type=int, default=seedBatch, help='seeds added to a configuration at once')
+        subparser.add_argument('--compare', help='also add seeds until the paired comparison with this database '
+                                                 '(e.g. treePruningDb.sqlite) is resolved')
+
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    ComponentExperiment()
-    # TreeParametersExperiment('PrunedTree')
-    # TreeParametersExperiment('Tree')
-    # ExmaplesExperiment()
-
-    MainScriptComponents()
-    # MainScriptTreeParameters()
-    # MainScriptExamples()
+    if len(sys.argv) == 1:
+        ComponentExperiment()
+        # TreeParametersExperiment('PrunedTree')
+        # TreeParametersExperiment('Tree')
+        # ExmaplesExperiment()
+
+        MainScriptComponents()
+        # MainScriptTreeParameters()
+        # MainScriptExamples()
+        sys.exit(0)
+
+    args = ParseArguments(sys.argv[1:])
+
+    if args.command == 'search':
+        brackets = [(benchmark, dimensions) for benchmark in args.benchmarks for dimensions in args.dimensions]
+        options = dict(search_components=not args.fixed_components, objective=args.objective, weight=args.weight,
+                       min_seeds=args.min_seeds, eta=args.eta, max_seeds=args.max_seeds)
+        if not args.out:
+            # Inherited by every run
+            os.environ.update(RunEnvironment(args))
+            os.environ[threadsVariable] = str(args.threads)
+        previous = None
+        while True:
+            runs, rungs = SearchPlan(args.db, brackets, **options)
+            # Runs which do not reach the database would be planned again
+            if not runs or runs == previous or args.out:
+                break
+            RunLocally(runs, args.db, command=args.exe, workers=args.workers, timeout=args.timeout,
+                       log_dir=args.logs)
+            previous = runs
+        if args.out and runs:
+            ledger = OpenLedger(args.db)
+            if ledger is not None:
+                runs = MissingWork(ledger, runs)
+            ArrayJob(runs, args.out, 'search', environment=RunEnvironment(args), threads=args.threads)
+            # Recorded once the manifest is written, as with array
+            if ledger is not None:
+                RecordState(ledger, runs, 'pending')
+                ledger.close()
+        PrintRungs(rungs)
+        print('{} runs {}'.format(len(runs), 'written to {}'.format(args.out) if args.out else 'left'))
+        sys.exit(0)
+
+    grid = experimentGrids[args.experiment](xrange(args.seeds))
+
+    if args.command == 'array':
+        grid = NextSeeds(args.db, grid, args)
+        ledger = OpenLedger(args.db)
+        if ledger is not None:
+            grid = MissingWork(ledger, grid, args.resubmit)
+        else:
+            grid = list(grid)
+        groups = SplitByThreads(grid, args.threads, args.threads_by_dimension) or [(args.threads, [])]
+        for threads, configurations in groups:
+            # One array per thread budget, e.g. many single-threaded tasks of small dimensions and a few
+            # multi-threaded ones of the largest
+            name = args.experiment if len(groups) == 1 else '{}_t{}'.format(args.experiment, threads)
+            tasks = ArrayJob(configurations, args.out, name, args.pack, args.throttle, args.shards,
+                             RunEnvironment(args), threads)
+            print('{} runs in {} array tasks of {} threads written to {}'.format(len(configurations), tasks,
+                                                                                 threads, args.out))
+        if ledger is not None:
+            RecordState(ledger, grid, 'pending')
+            ledger.close()
+    elif args.command == 'run':
+        # Inherited by every run
+        os.environ.update(RunEnvironment(args))
+        os.environ[threadsVariable] = str(args.threads)
+        grid = list(grid)
+        results = []
+        previous = None
+        while True:
+            # With --seed-ci-width batches are run until every configuration converged, or until a batch
+            # leaves the next one unchanged (e.g. runs which keep failing)
+            configurations = NextSeeds(args.db, grid, args)
+            if configurations == previous:
+                break
+            batch = RunLocally(configurations, args.db, command=args.exe, workers=args.workers,
+                               timeout=args.timeout, retries=args.retries, log_dir=args.logs,
+                               include_pending=args.resubmit)
+            results += batch
+            previous = configurations
+            if args.seed_ci_width is None or not any(result.succeeded for result in batch):
+                break
+        failed = len([result for result in results if not result.succeeded])
+        print('{} runs, {} failed'.format(len(results), failed))
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,190 @@
+from __future__ import print_function
+import argparse
+import re
+import numpy as np
+from lpIndex import FindModels
+from lpModel import _NaturalKey
+from lpReader import Bound, Constraint, VariableTypes, ReadRecords
+
+_simplexCot = 1 / np.tan(np.pi / 12)
+_simplexTan = np.tan(np.pi / 12)
+
+
+def BenchmarkConstraints(benchmark, dimensions):
+    """Weight vectors of the constraints of a benchmark, as Benchmark.Constraints"""
+    if benchmark == 'circle':
+        # One quadratic constraint as [x^2, -2x, y^2, -4y, ...]
+        weights = np.zeros((1, 2 * dimensions))
+        weights[0, 0::2] = 1
+        weights[0, 1::2] = -2 * np.arange(1, dimensions + 1)
+        return weights
+    if benchmark == 'cube':
+        # The same vector for both constraints of an axis
+        return np.repeat(np.eye(dimensions), 2, axis=0)
+    if benchmark == 'simplex':
+        rows = []
+        for i in xrange(dimensions):
+            for j in xrange(i + 1, dimensions):
+                for first, second in ((_simplexCot, -_simplexTan), (-_simplexTan, _simplexCot)):
+                    row = np.zeros(dimensions)
+                    row[i], row[j] = first, second
+                    rows.append(row)
+        rows.append(np.ones(dimensions))
+        return np.array(rows)
+    raise ValueError('Unknown benchmark: {}'.format(benchmark))
+
+
+def SynthesizedConstraints(benchmark, dimensions, axes):
+    """Weight vectors of synthesized constraints bounding `axes`, as Benchmark.GetConstraintsForCalculations"""
+    axes = np.asarray(axes, dtype=np.intp)
+    if benchmark == 'circle':
+        weights = np.zeros((len(axes), 2 * dimensions))
+        weights[np.arange(len(axes)), 2 * axes + 1] = 1
+        return weights
+    return np.eye(dimensions)[axes].reshape(len(axes), dimensions)
+
+
+def AngleMatrix(first, second):
+    """Angles between the lines spanned by every row of `first` and every row of `second`"""
+    first = np.asarray(first, dtype=np.float64)
+    second = np.asarray(second, dtype=np.float64)
+    norms = np.outer(np.linalg.norm(first, axis=1), np.linalg.norm(second, axis=1))
+    return np.arccos(np.clip(np.abs(first.dot(second.T)) / norms, 0, 1))
+
+
+def Assign(cost):
+    """Column of every row of a matrix with no more rows than columns, minimizing the total cost.
+
+    Hungarian algorithm with row and column potentials, one shortest augmenting path per row; the updates of all
+    columns are vectorized, so a path costs O(columns) NumPy operations.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    rows, columns = cost.shape
+    if rows > columns:
+        raise ValueError('Assignment needs at least as many columns as rows')
+
+    # Index 0 is a virtual column the row being added starts from
+    u = np.zeros(rows + 1)
+    v = np.zeros(columns + 1)
+    owner = np.zeros(columns + 1, dtype=np.intp)
+    way = np.zeros(columns + 1, dtype=np.intp)
+    for i in xrange(1, rows + 1):
+        owner[0] = i
+        current = 0
+        minimum = np.full(columns + 1, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        while True:
+            used[current] = True
+            row = owner[current]
+            reduced = cost[row - 1] - u[row] - v[1:]
+            better = ~used[1:] & (reduced < minimum[1:])
+            minimum[1:][better] = reduced[better]
+            way[1:][better] = current
+            candidates = np.where(used[1:], np.inf, minimum[1:])
+            following = int(np.argmin(candidates)) + 1
+            delta = candidates[following - 1]
+
+            u[owner[used]] += delta
+            v[used] -= delta
+            minimum[~used] -= delta
+            current = following
+            if owner[current] == 0:
+                break
+
+        # Flips the augmenting path
+        while current:
+            previous = way[current]
+            owner[current] = owner[previous]
+            current = previous
+
+    assignment = np.empty(rows, dtype=np.intp)
+    assigned = np.flatnonzero(owner[1:])
+    assignment[owner[assigned + 1] - 1] = assigned
+    return assignment
+
+
+def Cover(cost):
+    """Cells of a nonnegative cost matrix with the smallest total cost such that every row and column holds one,
+    the solution of the covering model solved with Gurobi before (see AssignmentSolver.Cover).
+
+    Every row and column is covered by a cell of a matching or by its cheapest cell; the matching (an assignment
+    of the rectangular matrix) maximizes the savings of its cells over the cheapest cells of their row and column.
+    A matrix without cells (no synthesized constraints) has an empty cover, so its mean angle is 0.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    rows, columns = cost.shape
+    cover = np.zeros((rows, columns), dtype=bool)
+    if cost.size == 0:
+        return cover
+
+    row_minimum = np.argmin(cost, axis=1)
+    column_minimum = np.argmin(cost, axis=0)
+    savings = np.maximum(0, cost[np.arange(rows), row_minimum][:, np.newaxis] +
+                         cost[column_minimum, np.arange(columns)][np.newaxis, :] - cost)
+    if rows <= columns:
+        matched_rows, matched_columns = np.arange(rows), Assign(-savings)
+    else:
+        matched_rows, matched_columns = Assign(-savings.T), np.arange(columns)
+    # Cells without savings are no better than the cheapest cells
+    useful = savings[matched_rows, matched_columns] > 0
+    cover[matched_rows[useful], matched_columns[useful]] = True
+
+    uncovered = np.flatnonzero(~cover.any(axis=1))
+    cover[uncovered, row_minimum[uncovered]] = True
+    uncovered = np.flatnonzero(~cover.any(axis=0))
+    cover[column_minimum[uncovered], uncovered] = True
+    return cover
+
+
+def MeanAngle(benchmark, dimensions, axes):
+    """StatisticsCalculator.CalculateMeanAngle of synthesized constraints bounding `axes`"""
+    matrix = AngleMatrix(BenchmarkConstraints(benchmark, dimensions), SynthesizedConstraints(benchmark, dimensions,
+                                                                                             axes))
+    return matrix[Cover(matrix)].sum() / max(matrix.shape)
+
+
+def ModelAxes(lines):
+    """Axis bounded by every constraint of a model written by ModelCreator and the number of continuous variables.
+
+    Variables x0, x1, ... are axes 0, 1, ...; other names are numbered in natural order.
+    """
+    binaries, continuous, bounded = set(), set(), []
+    for record in ReadRecords(lines):
+        if isinstance(record, Constraint):
+            names = [variable for _, variable in record.terms]
+            continuous.update(names)
+            bounded.append(names)
+        elif isinstance(record, Bound):
+            continuous.add(record.name)
+        elif isinstance(record, VariableTypes):
+            binaries.update(record.names)
+    continuous -= binaries
+
+    if all(re.match(r'x\d+$', name) for name in continuous):
+        axis = dict((name, int(name[1:])) for name in continuous)
+    else:
+        axis = dict((name, i) for i, name in enumerate(sorted(continuous, key=_NaturalKey)))
+    axes = []
+    for names in bounded:
+        variables = [name for name in names if name in axis]
+        if len(variables) != 1:
+            raise ValueError('Constraint over {} does not bound a single variable'.format(', '.join(variables)))
+        axes.append(axis[variables[0]])
+    return axes, len(continuous)
+
+
+if __name__ == "__main__":
+    from dataGeneration import benchmarks
+    parser = argparse.ArgumentParser(description='Mean angle between the constraints of models in LP format and '
+                                                 'the constraints of a benchmark')
+    parser.add_argument('benchmark', choices=sorted(benchmarks))
+    parser.add_argument('models', nargs='+', help='.lp files written by ModelCreator or directories holding them')
+    parser.add_argument('--dimensions', type=int, help='number of dimensions, by default the number of '
+                                                       'continuous variables of every model')
+    args = parser.parse_args()
+
+    for path in FindModels(args.models):
+        with open(path) as f:
+            axes, variables = ModelAxes(f)
+        dimensions = args.dimensions or variables
+        print('{}\t{}\t{}\t{!r}'.format(path, dimensions, len(axes), MeanAngle(args.benchmark, dimensions, axes)))
@@ -0,0 +1,83 @@
+from __future__ import print_function
+import argparse
+import sqlite3
+from collections import OrderedDict
+import numpy as np
+from schema import Migrate, TagFilter, stageMetricsTable
+
+profileParameters = ('Dimensions', 'FeasibleExamples', 'Join', 'MaxHeight')
+# Stages in the order of a run, as measured by the program; other stages are listed after them
+stageOrder = ('DatasetCacheLoad', 'MixtureFit', 'RejectionSampling', 'TestData', 'DatasetCacheStore', 'Learning',
+              'ModelCreation', 'ModelWrite', 'Statistics')
+
+
+def LoadStageMetric(conn, parameter, metric, tags=None, benchmark=None):
+    """(parameter value, stage, metric value) of every successful run having the metric"""
+    conditions = ["e.Errors = ''", 'sm.Metric = ?']
+    arguments = [metric]
+    if tags:
+        conditions.append(TagFilter(tags, 'e.id'))
+    if benchmark:
+        conditions.append('e.Benchmark = ?')
+        arguments.append(benchmark)
+    return conn.execute("SELECT e.[{}], sm.Stage, sm.Value FROM {} sm JOIN experiments e ON e.id = sm.ExperimentId "
+                        "WHERE {}".format(parameter, stageMetricsTable, ' AND '.join(conditions)),
+                        arguments).fetchall()
+
+
+def ScalingExponent(values, costs):
+    """Slope of log(cost) over log(value), i.e. b of cost ~ value^b, or None with fewer than two usable points"""
+    values, costs = np.asarray(values, dtype=np.float64), np.asarray(costs, dtype=np.float64)
+    usable = (values > 0) & (costs > 0)
+    if len(np.unique(values[usable])) < 2:
+        return None
+    return np.polyfit(np.log(values[usable]), np.log(costs[usable]), 1)[0]
+
+
+def StageProfile(rows):
+    """Mean metric of every stage for every value of the parameter: stage -> OrderedDict(value -> mean), with
+    stages in the order of a run. Runs without a stage (e.g. MixtureFit of runs reading the dataset cache) do not
+    count in its mean"""
+    grouped = {}
+    for value, stage, metric in rows:
+        if metric is not None:
+            grouped.setdefault(stage, {}).setdefault(value, []).append(metric)
+
+    known = [stage for stage in stageOrder if stage in grouped]
+    profile = OrderedDict()
+    for stage in known + sorted(set(grouped) - set(known)):
+        profile[stage] = OrderedDict((value, np.mean(metrics))
+                                     for value, metrics in sorted(grouped[stage].items()))
+    return profile
+
+
+def FormatProfile(parameter, metric, profile):
+    values = sorted(set(value for columns in profile.values() for value in columns))
+    lines = ['{} by {}'.format(metric, parameter),
+             '\t'.join(['Stage'] + ['{:g}'.format(value) for value in values] + ['Exponent'])]
+    for stage, columns in profile.items():
+        cells = ['{:.1f}'.format(columns[value]) if value in columns else '-' for value in values]
+        exponent = ScalingExponent(list(columns), list(columns.values()))
+        lines.append('\t'.join([stage] + cells + ['-' if exponent is None else '{:.2f}'.format(exponent)]))
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Cost of the stages of the runs as a function of the grid '
+                                                 'parameters, from the stage_metrics table')
+    parser.add_argument('db', help='results database')
+    parser.add_argument('--metric', default='WallMs',
+                        help='WallMs, CpuMs, EndRssMb or a counter, e.g. Attempts or Nodes (default WallMs)')
+    parser.add_argument('--by', nargs='+', default=list(profileParameters), choices=profileParameters,
+                        help='parameters to group by')
+    parser.add_argument('--tag', nargs='+', help='only runs of these experiments, e.g. Tree')
+    parser.add_argument('--benchmark', help='only runs of this benchmark')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    Migrate(conn)
+    for parameter in args.by:
+        rows = LoadStageMetric(conn, parameter, args.metric, args.tag, args.benchmark)
+        print(FormatProfile(parameter, args.metric, StageProfile(rows)))
+        print()
+    conn.close()
@@ -0,0 +1,69 @@
+from __future__ import print_function
+import re
+import sqlite3
+import sys
+import latexTable
+import summary
+import ledger
+import significance
+from schema import Migrate
+
+checkIfExistsFilter = "FeasibleExamples = ? AND Dimensions = ? AND K = ? AND [Join] = ? AND MaxHeight = ? AND " \
+                      "Seed = ? AND Benchmark = ? AND Components = ? AND Errors = ''"
+
+# Every query run against a results database while generating reports or scheduling jobs
+reportQueries = (
+    ('significance.ComparePairedRuns', significance.PairedRunsQuery(latexTable.treeColumns, latexTable.treeTags)),
+    ('summary.RefreshSummary (stale groups)', summary.staleGroupsQuery),
+    ('summary.RefreshSummary (recompute)', summary.recomputeQuery),
+    ('summary.LoadSummaryStatistics', summary.summaryQuery.format('Benchmark, Dimensions, [Join], MaxHeight')),
+    ('latexTable.DatabaseState', summary.summaryRowsQuery),
+    ('DatabaseUtils.CheckIfExists', "SELECT * FROM experiments WHERE {}".format(checkIfExistsFilter)),
+    ('DatabaseUtils.UpdateExperimentNameColumn',
+     "UPDATE experiments SET ExperimentName = ExperimentName || ';Tree' WHERE {}".format(checkIfExistsFilter)),
+    ('ledger.MissingWork', ledger.workQuery),
+    ('DatabaseUtils.RecordLedgerState',
+     "UPDATE {} SET State = ?, Error = ? WHERE {}".format(ledger.ledgerTable, ledger.parameterFilter)),
+)
+
+# Plain scans and automatic indexes (built by scanning the table first) of experiments
+fullScan = re.compile(r'^(SCAN (experiments|e)\b|SEARCH (experiments|e) USING AUTOMATIC)')
+
+
+def ExplainReportQueries(conn, queries=reportQueries):
+    """Prints EXPLAIN QUERY PLAN of every query and returns names of those scanning the experiments table"""
+    c = conn.cursor()
+    # Paired runs are compared against a second database, the same one serves to explain the join
+    path = [row[2] for row in c.execute("PRAGMA database_list") if row[1] == 'main'][0]
+    c.execute("ATTACH DATABASE ? AS other", (path,))
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS stale_groups AS SELECT {} FROM experiments WHERE 0"
+              .format(', '.join('[{}]'.format(column) for column in summary.keyColumns)))
+
+    scanning = []
+    for name, query in queries:
+        plan = c.execute("EXPLAIN QUERY PLAN {}".format(query), [None] * query.count('?')).fetchall()
+        details = [row[-1] for row in plan]
+        scans = [detail for detail in details if fullScan.match(detail)]
+
+        print('{}{}'.format(name, '  <-- FULL SCAN' if scans else ''))
+        for detail in details:
+            print('    {}'.format(detail))
+        if scans:
+            scanning.append(name)
+
+    c.execute("DROP TABLE temp.stale_groups")
+    c.execute("DETACH DATABASE other")
+    return scanning
+
+
+if __name__ == "__main__":
+    failed = False
+    for db in sys.argv[1:]:
+        connection = sqlite3.connect(db)
+        Migrate(connection)
+        ledger.CreateLedger(connection.cursor())
+        summary.CreateSummaryTables(connection.cursor())
+        print('== {}'.format(db))
+        failed = bool(ExplainReportQueries(connection)) or failed
+        connection.close()
+    sys.exit(1 if failed else 0)
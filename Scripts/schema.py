@@ -0,0 +1,120 @@
+import sqlite3
+import sys
+
+# Composite indexes covering the filters used by the reports and by DatabaseUtils.CheckIfExists
+indexDefinitions = (
+    ('experiments_configuration',
+     ('Benchmark', 'Dimensions', 'FeasibleExamples', 'Components', 'Join', 'MaxHeight', 'Seed', 'K')),
+    ('experiments_tree', ('Benchmark', 'Dimensions', 'Join', 'MaxHeight', 'Seed')),
+    ('experiments_components', ('Benchmark', 'Dimensions', 'Components', 'Seed')),
+)
+
+tagsTable = 'experiment_tags'
+tagsQueueTable = 'experiment_tags_queue'
+# Time, memory and counters of the stages of every run, written by DatabaseUtils.SaveStageMetrics
+stageMetricsTable = 'stage_metrics'
+# Hashes of the artifacts of every run in the artifact store, written by DatabaseUtils.SaveArtifacts
+artifactsTable = 'artifacts'
+
+
+def SplitTags(experiment_name):
+    """ExperimentName holds every experiment a run belongs to joined with ';' (e.g. 'Tree;Examples')"""
+    if experiment_name is None:
+        return []
+    return [tag for tag in u'{}'.format(experiment_name).split(';') if tag]
+
+
+def HasTag(experiment_name, tags):
+    return any(tag in tags for tag in SplitTags(experiment_name))
+
+
+def TagFilter(tags, id_column='id', database=None):
+    """SQL condition selecting experiments rows having any of `tags`, answered from the tag index
+    (of the attached `database`, if given)"""
+    literals = ', '.join("'{}'".format(tag.replace("'", "''")) for tag in tags)
+    table = tagsTable if database is None else '{}.{}'.format(database, tagsTable)
+    return "{} IN (SELECT ExperimentId FROM {} WHERE Tag IN ({}))".format(id_column, table, literals)
+
+
+def CreateIndexes(c):
+    for name, columns in indexDefinitions:
+        c.execute("CREATE INDEX IF NOT EXISTS {} ON experiments ({})"
+                  .format(name, ', '.join('[{}]'.format(column) for column in columns)))
+
+
+def CreateTagTables(c):
+    c.execute("CREATE TABLE IF NOT EXISTS {}(Tag TEXT NOT NULL, ExperimentId INTEGER NOT NULL, "
+              "PRIMARY KEY (Tag, ExperimentId)) WITHOUT ROWID".format(tagsTable))
+    c.execute("CREATE INDEX IF NOT EXISTS {0}_experiment ON {0} (ExperimentId)".format(tagsTable))
+
+    # Triggers cannot split strings, so they only queue the ids whose tags have to be rebuilt
+    c.execute("CREATE TABLE IF NOT EXISTS {}(ExperimentId INTEGER NOT NULL)".format(tagsQueueTable))
+    c.execute("CREATE TRIGGER IF NOT EXISTS experiment_tags_insert AFTER INSERT ON experiments "
+              "BEGIN INSERT INTO {} VALUES (NEW.id); END".format(tagsQueueTable))
+    c.execute("CREATE TRIGGER IF NOT EXISTS experiment_tags_update AFTER UPDATE OF ExperimentName ON experiments "
+              "BEGIN INSERT INTO {} VALUES (NEW.id); END".format(tagsQueueTable))
+    c.execute("CREATE TRIGGER IF NOT EXISTS experiment_tags_delete AFTER DELETE ON experiments "
+              "BEGIN DELETE FROM {} WHERE ExperimentId = OLD.id; END".format(tagsTable))
+
+
+def CreateStageMetrics(c):
+    c.execute("CREATE TABLE IF NOT EXISTS {}(ExperimentId INTEGER NOT NULL, Stage TEXT NOT NULL, "
+              "Metric TEXT NOT NULL, Value REAL, PRIMARY KEY (ExperimentId, Stage, Metric)) WITHOUT ROWID"
+              .format(stageMetricsTable))
+    c.execute("CREATE TRIGGER IF NOT EXISTS stage_metrics_delete AFTER DELETE ON experiments "
+              "BEGIN DELETE FROM {} WHERE ExperimentId = OLD.id; END".format(stageMetricsTable))
+
+
+def CreateArtifacts(c):
+    c.execute("CREATE TABLE IF NOT EXISTS {}(ExperimentId INTEGER NOT NULL, Kind TEXT NOT NULL, Hash TEXT NOT NULL, "
+              "Size INTEGER NOT NULL, PRIMARY KEY (ExperimentId, Kind)) WITHOUT ROWID".format(artifactsTable))
+    c.execute("CREATE TRIGGER IF NOT EXISTS artifacts_delete AFTER DELETE ON experiments "
+              "BEGIN DELETE FROM {} WHERE ExperimentId = OLD.id; END".format(artifactsTable))
+
+
+def SyncTags(conn):
+    """Rebuilds tags of queued rows. Returns the number of rows processed"""
+    c = conn.cursor()
+    ids = [row[0] for row in c.execute("SELECT DISTINCT ExperimentId FROM {}".format(tagsQueueTable))]
+    if not ids:
+        return 0
+
+    c.execute("DROP TABLE IF EXISTS temp.tag_ids")
+    c.execute("CREATE TEMP TABLE tag_ids(id INTEGER PRIMARY KEY)")
+    c.executemany("INSERT INTO temp.tag_ids VALUES (?)", [(i,) for i in ids])
+
+    c.execute("DELETE FROM {} WHERE ExperimentId IN (SELECT id FROM temp.tag_ids)".format(tagsTable))
+    rows = c.execute("SELECT id, ExperimentName FROM experiments WHERE id IN (SELECT id FROM temp.tag_ids)")
+    tags = [(tag, experiment_id) for experiment_id, name in rows.fetchall() for tag in set(SplitTags(name))]
+    c.executemany("INSERT INTO {} VALUES (?, ?)".format(tagsTable), tags)
+
+    c.execute("DELETE FROM {} WHERE ExperimentId IN (SELECT id FROM temp.tag_ids)".format(tagsQueueTable))
+    c.execute("DROP TABLE temp.tag_ids")
+    conn.commit()
+    return len(ids)
+
+
+def Migrate(conn):
+    """Adds indexes, the tag table, the stage metrics and the artifacts tables to a results database. Safe to run
+    repeatedly"""
+    c = conn.cursor()
+    new_tags = c.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = ?", (tagsTable,)).fetchone()[0] == 0
+
+    CreateIndexes(c)
+    CreateTagTables(c)
+    CreateStageMetrics(c)
+    CreateArtifacts(c)
+    if new_tags:
+        c.execute("INSERT INTO {} SELECT id FROM experiments".format(tagsQueueTable))
+        c.execute("ANALYZE")
+    conn.commit()
+
+    SyncTags(conn)
+
+
+if __name__ == "__main__":
+    for db in sys.argv[1:]:
+        connection = sqlite3.connect(db)
+        Migrate(connection)
+        connection.close()
+        print('{}: migrated'.format(db))
@@ -0,0 +1,195 @@
+from __future__ import print_function
+import glob
+import os
+import sqlite3
+import sys
+import numpy as np
+from groupedStats import CombineStatistics, GroupRows, metricNames, metricsSelectString
+from ledger import CreateLedger, RecordResults, parameterColumns
+from schema import Migrate, artifactsTable, stageMetricsTable
+
+# Shards of results.sqlite are written by the program to results.shards/<node>.sqlite
+# when the OCC_RESULT_SHARDS environment variable is set (see GlobalVariables.ShardsVariable)
+shardsVariable = 'OCC_RESULT_SHARDS'
+mergedTable = 'merged_shards'
+blockSize = 10000
+
+
+def ShardDirectory(db_path):
+    return '{}.shards'.format(os.path.splitext(db_path)[0])
+
+
+def ShardPaths(db_path):
+    return sorted(glob.glob(os.path.join(ShardDirectory(db_path), '*.sqlite')))
+
+
+def _Columns(columns, prefix=''):
+    return ', '.join('{}[{}]'.format(prefix, column) for column in columns)
+
+
+def _TableColumns(c, database, table='experiments'):
+    return [row[1] for row in c.execute("PRAGMA {}.table_info({})".format(database, table))]
+
+
+def _PrepareMaster(c, shard):
+    """Creates the experiments table of a new master database like the shard's, adds columns it lacks"""
+    columns = _TableColumns(c, 'main')
+    if not columns:
+        c.execute(c.execute("SELECT sql FROM {}.sqlite_master WHERE name = 'experiments'".format(shard))
+                  .fetchone()[0])
+        return
+
+    for column in _TableColumns(c, shard):
+        if column not in columns:
+            c.execute("ALTER TABLE experiments ADD COLUMN [{}] NUMERIC".format(column))
+
+
+def MergeShard(conn, shard_path):
+    """Copies rows of one shard which are newer than its last merge into the master database of `conn`.
+
+    A successful run is skipped if the master already has one with the same parameters (its experiment
+    name is appended instead, as DatabaseUtils.CheckIfExists does), and so is a failed run of parameters
+    that already succeeded or failed with the same error. The schema of the master is brought up to date
+    first, the rows are then copied in a single transaction. Returns the number of copied rows.
+    """
+    c = conn.cursor()
+    c.execute("ATTACH DATABASE ? AS shard", (shard_path,))
+    try:
+        if not _TableColumns(c, 'shard'):
+            return 0
+        _PrepareMaster(c, 'shard')
+        Migrate(conn)
+        CreateLedger(c)
+        c.execute("CREATE TABLE IF NOT EXISTS {}(Path TEXT PRIMARY KEY, Watermark INTEGER NOT NULL)"
+                  .format(mergedTable))
+        conn.commit()
+
+        row = c.execute("SELECT Watermark FROM {} WHERE Path = ?".format(mergedTable),
+                        (os.path.abspath(shard_path),)).fetchone()
+        watermark = row[0] if row else 0
+        newmark = c.execute("SELECT IFNULL(MAX(id), 0) FROM shard.experiments").fetchone()[0]
+
+        match = ' AND '.join('m.[{0}] = s.[{0}]'.format(column) for column in parameterColumns)
+        # A run already saved, or one that failed with the same error, is not copied again
+        duplicate = "EXISTS (SELECT 1 FROM main.experiments m WHERE {} AND (m.Errors = '' OR m.Errors = s.Errors))" \
+            .format(match)
+
+        # Name merging first, so that the copy below sees only runs which are really new
+        outer = ' AND '.join('experiments.[{0}] = s.[{0}]'.format(column) for column in parameterColumns)
+        c.execute("UPDATE main.experiments SET ExperimentName = ExperimentName || ';' || "
+                  "(SELECT s.ExperimentName FROM shard.experiments s WHERE {} AND s.Errors = '' AND s.id > ? "
+                  "ORDER BY s.id LIMIT 1) "
+                  "WHERE id IN (SELECT m.id FROM shard.experiments s JOIN main.experiments m ON {} AND m.Errors = '' "
+                  "WHERE s.Errors = '' AND s.id > ? AND "
+                  "instr(';' || m.ExperimentName || ';', ';' || s.ExperimentName || ';') = 0)".format(outer, match),
+                  (watermark, watermark))
+
+        columns = [column for column in _TableColumns(c, 'shard') if column != 'id']
+        first_id = c.execute("SELECT IFNULL(MAX(id), 0) FROM main.experiments").fetchone()[0]
+        c.execute("INSERT INTO main.experiments ({0}) SELECT {1} FROM shard.experiments s "
+                  "WHERE s.id > ? AND NOT {2} ORDER BY s.id"
+                  .format(_Columns(columns), _Columns(columns, 's.'), duplicate), (watermark,))
+        copied = c.rowcount
+
+        # Copied rows got new ids; their stage metrics and artifacts follow them by parameters
+        if _TableColumns(c, 'shard', stageMetricsTable):
+            c.execute("INSERT OR REPLACE INTO main.{0} SELECT m.id, sm.Stage, sm.Metric, sm.Value "
+                      "FROM shard.{0} sm JOIN shard.experiments s ON s.id = sm.ExperimentId "
+                      "JOIN main.experiments m ON {1} AND m.Errors = s.Errors AND m.id > ? "
+                      "WHERE s.id > ?".format(stageMetricsTable, match), (first_id, watermark))
+        if _TableColumns(c, 'shard', artifactsTable):
+            c.execute("INSERT OR REPLACE INTO main.{0} SELECT m.id, a.Kind, a.Hash, a.Size "
+                      "FROM shard.{0} a JOIN shard.experiments s ON s.id = a.ExperimentId "
+                      "JOIN main.experiments m ON {1} AND m.Errors = s.Errors AND m.id > ? "
+                      "WHERE s.id > ?".format(artifactsTable, match), (first_id, watermark))
+
+        RecordResults(c, 'shard', watermark)
+        c.execute("INSERT OR REPLACE INTO {} VALUES (?, ?)".format(mergedTable),
+                  (os.path.abspath(shard_path), newmark))
+        conn.commit()
+        return copied
+    finally:
+        conn.rollback()
+        c.execute("DETACH DATABASE shard")
+
+
+def MergeShards(db_path, shard_paths=None):
+    """Merges shards (by default every shard of `db_path`) into the master database. Returns copied rows per shard"""
+    if shard_paths is None:
+        shard_paths = ShardPaths(db_path)
+    conn = sqlite3.connect(db_path, timeout=60)
+    try:
+        return [(path, MergeShard(conn, path)) for path in shard_paths]
+    finally:
+        conn.close()
+
+
+def UnmergedShardPaths(conn, db_path):
+    """Shards of `db_path` holding rows which were not merged into the database of `conn` yet"""
+    c = conn.cursor()
+    merged = {}
+    if c.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = ?", (mergedTable,)).fetchone()[0]:
+        merged = dict(c.execute("SELECT Path, Watermark FROM {}".format(mergedTable)).fetchall())
+
+    unmerged = []
+    for path in ShardPaths(db_path):
+        shard = sqlite3.connect(path)
+        try:
+            newest = shard.execute("SELECT IFNULL(MAX(id), 0) FROM experiments").fetchone()[0]
+        except sqlite3.OperationalError:
+            newest = 0
+        shard.close()
+        if newest > merged.get(os.path.abspath(path), 0):
+            unmerged.append(path)
+    return unmerged
+
+
+def TagCondition(tags, prefix=''):
+    """SQL condition on ExperimentName matching any of `tags`, for databases without the tag index"""
+    return '({})'.format(' OR '.join("instr(';' || {}ExperimentName || ';', ';{};') > 0"
+                                     .format(prefix, tag.replace("'", "''")) for tag in tags))
+
+
+def LoadShardedStatistics(conn, shard_paths, group_columns, tags, block_size=blockSize):
+    """Groups successful runs of the master database of `conn` together with runs of shards which are not
+    merged yet, attaching one shard at a time. Parameters already seen in the master or an earlier shard are
+    skipped, so merged shards are not counted twice."""
+    c = conn.cursor()
+    width = len(parameterColumns)
+    group_index = [parameterColumns.index(column) for column in group_columns]
+    seen = set()
+    statistics = []
+
+    for database, path in [('main', None)] + [('shard', path) for path in shard_paths]:
+        if path is not None:
+            c.execute("ATTACH DATABASE ? AS shard", (path,))
+        try:
+            if not _TableColumns(c, database):
+                continue
+            c.execute("SELECT {}, {} FROM {}.experiments WHERE Errors = '' AND {}"
+                      .format(_Columns(parameterColumns), metricsSelectString, database, TagCondition(tags)))
+            while True:
+                rows = c.fetchmany(block_size)
+                if not rows:
+                    break
+                fresh = []
+                for row in rows:
+                    parameters = tuple(row[:width])
+                    if parameters not in seen:
+                        seen.add(parameters)
+                        fresh.append(row)
+                keys = [tuple(row[i] for i in group_index) for row in fresh]
+                values = np.array([row[width:] for row in fresh], dtype=np.float64).reshape(len(fresh),
+                                                                                           len(metricNames))
+                statistics.append(GroupRows(keys, values))
+        finally:
+            if path is not None:
+                c.execute("DETACH DATABASE shard")
+
+    return CombineStatistics(statistics)
+
+
+if __name__ == "__main__":
+    for db in sys.argv[1:]:
+        for shard, count in MergeShards(db):
+            print('{}: {} rows merged'.format(shard, count))
@@ -0,0 +1,132 @@
+import numpy as np
+from distributions import StudentTwoSidedP
+from groupedStats import GroupRows, MetricsSelectString, metricNames
+from ledger import parameterColumns
+from schema import TagFilter
+
+
+def _Columns(columns, prefix):
+    return ', '.join('{}.[{}]'.format(prefix, column) for column in columns)
+
+
+def PairedRunsQuery(group_columns, tags, other='other'):
+    """Joins every successful run of the main database with the run of the same parameters and seed
+    in the attached database `other`. Both have to be migrated (see schema.Migrate).
+
+    Rows hold the group columns, the parameters and the metrics of both runs, ordered by the ids
+    of the runs, so that the latest pair of repeated runs comes last."""
+    return "SELECT {0}, {7}, {1}, {2} FROM main.experiments a JOIN {3}.experiments b ON {4} " \
+           "WHERE a.Errors = '' AND b.Errors = '' AND {5} AND {6} ORDER BY a.id, b.id" \
+        .format(_Columns(group_columns, 'a'), MetricsSelectString('a.'), MetricsSelectString('b.'), other,
+                ' AND '.join('a.[{0}] = b.[{0}]'.format(column) for column in parameterColumns),
+                # Unary + keeps the planner from probing b's index once per tagged id of b
+                TagFilter(tags, 'a.id'), TagFilter(tags, '+b.id', other), _Columns(parameterColumns, 'a'))
+
+
+def AdjustPValues(p, method=None):
+    """Corrects p-values for multiple comparisons. `method` is None, 'bonferroni', 'holm' or 'fdr_bh'
+    (Benjamini-Hochberg); NaN values are left out of the family and stay NaN."""
+    p = np.asarray(p, dtype=np.float64)
+    if method is None:
+        return p.copy()
+
+    flat = p.ravel()
+    valid = np.flatnonzero(~np.isnan(flat))
+    m = len(valid)
+    adjusted = np.full(flat.shape, np.nan)
+    if m == 0:
+        return adjusted.reshape(p.shape)
+
+    values = flat[valid]
+    if method == 'bonferroni':
+        result = values * m
+    elif method == 'holm':
+        order = np.argsort(values)
+        stepped = np.maximum.accumulate(values[order] * (m - np.arange(m)))
+        result = np.empty(m)
+        result[order] = stepped
+    elif method == 'fdr_bh':
+        order = np.argsort(values)[::-1]
+        stepped = np.minimum.accumulate(values[order] * m / np.arange(m, 0, -1))
+        result = np.empty(m)
+        result[order] = stepped
+    else:
+        raise ValueError('Unknown multiple comparison correction: {}'.format(method))
+
+    adjusted[valid] = np.minimum(result, 1)
+    return adjusted.reshape(p.shape)
+
+
+class PairedTests:
+    """Paired t-test of every metric in every group, all arrays have shape (groups, metrics).
+
+    `n` is the number of pairs with both values present, `p` the two-sided p-value
+    (NaN for less than two pairs), possibly corrected for multiple comparisons.
+    """
+
+    def __init__(self, keys, n, mean_diff, t, p):
+        self.keys = keys
+        self.index = dict((key, i) for i, key in enumerate(keys))
+        self.n = n
+        self.mean_diff = mean_diff
+        self.t = t
+        self.p = p
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def PValues(self, key):
+        i = self.index.get(key)
+        if i is None:
+            return [None] * len(metricNames)
+        return [None if np.isnan(x) else float(x) for x in self.p[i]]
+
+    def Significant(self, key, alpha=0.05):
+        """One flag per metric; groups without pairs are never significant"""
+        return [p is not None and p < alpha for p in self.PValues(key)]
+
+
+def PairedTTests(keys, differences, correction=None):
+    """Tests whether the mean of paired `differences` (rows x metrics) is zero in every group of `keys`.
+
+    Pairs with a missing value are skipped for that metric only.
+    """
+    stats = GroupRows(keys, differences)
+    n = stats.n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Sample variance of the differences, standard error of their mean
+        standard_error = np.sqrt(stats.m2 / (n - 1) / n)
+        t = stats.mean / standard_error
+    # Identical samples: no difference at all, or the same difference in every pair
+    t[(standard_error == 0) & (stats.mean == 0)] = 0
+    t[n < 2] = np.nan
+
+    p = StudentTwoSidedP(t, n - 1)
+    return PairedTests(stats.keys, n, stats.mean, t, AdjustPValues(p, correction))
+
+
+def ComparePairedRuns(conn, other_path, group_columns, tags, correction=None):
+    """Paired t-tests of all metrics between the results database of `conn` and the one at `other_path`.
+
+    Runs are paired by their parameters and seed, then grouped by `group_columns`; all groups are
+    loaded with one query and tested in a single vectorized pass.
+    """
+    c = conn.cursor()
+    c.execute("ATTACH DATABASE ? AS other", (other_path,))
+    try:
+        rows = c.execute(PairedRunsQuery(group_columns, tags)).fetchall()
+    finally:
+        c.execute("DETACH DATABASE other")
+
+    width = len(group_columns)
+    metrics = len(metricNames)
+    # A configuration run more than once is represented by its latest pair
+    latest = {}
+    for row in rows:
+        latest[tuple(row[width:width + len(parameterColumns)])] = row
+    rows = list(latest.values())
+
+    keys = [tuple(row[:width]) for row in rows]
+    values = np.array([row[width + len(parameterColumns):] for row in rows],
+                      dtype=np.float64).reshape(len(rows), 2 * metrics)
+    return PairedTTests(keys, values[:, :metrics] - values[:, metrics:], correction)
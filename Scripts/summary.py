@@ -0,0 +1,134 @@
+import sqlite3
+import sys
+import numpy as np
+from groupedStats import AggregateCursor, CombineStatistics, MergeGroups, MetricsSelectString, metricNames
+from schema import HasTag
+
+# Parameters identifying one experiment configuration (every seed of it)
+keyColumns = ('ExperimentName', 'Benchmark', 'FeasibleExamples', 'Dimensions', 'K', 'Join', 'MaxHeight', 'Components')
+momentSuffixes = ('N', 'Mean', 'M2', 'Min', 'Max')
+
+summaryTable = 'experiment_summary'
+stateTable = 'experiment_summary_state'
+dirtyTable = 'experiment_summary_dirty'
+
+
+def _Columns(columns, prefix=''):
+    return ', '.join('{}[{}]'.format(prefix, column) for column in columns)
+
+
+def _MomentColumns():
+    return ['{}{}'.format(metric, suffix) for suffix in momentSuffixes for metric in metricNames]
+
+
+staleGroupsQuery = "SELECT DISTINCT {0} FROM experiments WHERE id > ? AND id <= ? " \
+                   "UNION SELECT {0} FROM {1}".format(_Columns(keyColumns), dirtyTable)
+# Key columns are matched with IS, a row value IN would never select groups with a NULL key;
+# CROSS JOIN keeps the few stale groups as the outer loop, searched in experiments_configuration
+staleGroupsMatch = ' AND '.join('e.[{0}] IS s.[{0}]'.format(column) for column in keyColumns)
+recomputeQuery = "SELECT {0}, e.id, {1} FROM temp.stale_groups s CROSS JOIN experiments e ON {2} " \
+                 "WHERE e.Errors = ''".format(_Columns(keyColumns, 'e.'), MetricsSelectString('e.'), staleGroupsMatch)
+summaryQuery = "SELECT ExperimentName, {{}}, {} FROM {}".format(_Columns(_MomentColumns()), summaryTable)
+# Every group in key order, ExperimentName first; hashed by latexTable.InputDigest
+summaryRowsQuery = "SELECT {0}, Runs, MaxId, {1} FROM {2} ORDER BY {0}".format(_Columns(keyColumns),
+                                                                              _Columns(_MomentColumns()), summaryTable)
+
+
+def CreateSummaryTables(c):
+    key_definition = ', '.join('[{}] NUMERIC'.format(column) for column in keyColumns)
+
+    c.execute("CREATE TABLE IF NOT EXISTS {}({}, Runs INTEGER, MaxId INTEGER, {}, PRIMARY KEY ({}))"
+              .format(summaryTable, key_definition,
+                      ', '.join('{} REAL'.format(column) for column in _MomentColumns()),
+                      _Columns(keyColumns)))
+    c.execute("CREATE TABLE IF NOT EXISTS {}(Watermark INTEGER NOT NULL)".format(stateTable))
+    c.execute("CREATE TABLE IF NOT EXISTS {}({})".format(dirtyTable, key_definition))
+
+    # Rows which are already summarized can still be renamed by DatabaseUtils.UpdateExperimentNameColumn
+    # or removed by hand; both groups affected by such a change are queued for the next refresh
+    c.execute("CREATE TRIGGER IF NOT EXISTS experiment_summary_update AFTER UPDATE ON experiments "
+              "BEGIN "
+              "INSERT INTO {0} VALUES ({1}); "
+              "INSERT INTO {0} VALUES ({2}); "
+              "END".format(dirtyTable, _Columns(keyColumns, 'OLD.'), _Columns(keyColumns, 'NEW.')))
+    c.execute("CREATE TRIGGER IF NOT EXISTS experiment_summary_delete AFTER DELETE ON experiments "
+              "BEGIN "
+              "INSERT INTO {} VALUES ({}); "
+              "END".format(dirtyTable, _Columns(keyColumns, 'OLD.')))
+
+
+def RefreshSummary(conn):
+    """Brings experiment_summary up to date, recomputing only the groups which changed.
+
+    New rows are found by id above the stored watermark, renamed or deleted rows through
+    the queue filled by the triggers. Returns the number of recomputed groups.
+    """
+    c = conn.cursor()
+    CreateSummaryTables(c)
+
+    row = c.execute("SELECT Watermark FROM {}".format(stateTable)).fetchone()
+    watermark = row[0] if row else 0
+    newmark = c.execute("SELECT IFNULL(MAX(id), 0) FROM experiments").fetchone()[0]
+
+    c.execute("DROP TABLE IF EXISTS temp.stale_groups")
+    c.execute("CREATE TEMP TABLE stale_groups AS {}".format(staleGroupsQuery), (watermark, newmark))
+    stale = c.execute("SELECT {} FROM temp.stale_groups".format(_Columns(keyColumns))).fetchall()
+
+    if stale:
+        # Rows newer than newmark may be included here, their groups are simply recomputed once more next time
+        # The row id is grouped like a metric: its count and maximum give Runs and MaxId
+        c.execute(recomputeQuery)
+        stats = AggregateCursor(c, len(keyColumns), len(metricNames) + 1)
+
+        where = ' AND '.join('[{}] IS ?'.format(column) for column in keyColumns)
+        c.executemany("DELETE FROM {} WHERE {}".format(summaryTable, where), stale)
+
+        records = []
+        for i, key in enumerate(stats.keys):
+            moments = []
+            for arr in (stats.n, stats.mean, stats.m2, stats.min, stats.max):
+                moments.extend(None if np.isnan(x) else float(x) for x in arr[i, 1:])
+            records.append(list(key) + [int(stats.n[i, 0]), int(stats.max[i, 0])] + moments)
+
+        columns = list(keyColumns) + ['Runs', 'MaxId'] + _MomentColumns()
+        c.executemany("INSERT INTO {} ({}) VALUES ({})"
+                      .format(summaryTable, _Columns(columns), ', '.join('?' * len(columns))), records)
+
+    c.execute("DELETE FROM {}".format(dirtyTable))
+    c.execute("DELETE FROM {}".format(stateTable))
+    c.execute("INSERT INTO {} VALUES (?)".format(stateTable), (newmark,))
+    c.execute("DROP TABLE temp.stale_groups")
+    conn.commit()
+
+    return len(stale)
+
+
+def LoadSummaryStatistics(c, group_columns, tags):
+    """Reads experiment_summary rows of runs tagged with any of `tags` and merges them
+    into groups given by `group_columns`"""
+    moments = _MomentColumns()
+    c.execute(summaryQuery.format(_Columns(group_columns)))
+    rows = [row[1:] for row in c.fetchall() if HasTag(row[0], tags)]
+
+    width = len(group_columns)
+    keys = [tuple(row[:width]) for row in rows]
+    values = np.array([row[width:] for row in rows], dtype=np.float64).reshape(len(rows), len(moments))
+    return MergeGroups(keys, *np.hsplit(values, len(momentSuffixes)))
+
+
+def LoadCombinedStatistics(db_paths, group_columns, tags):
+    """Refreshes and loads the summaries of several results databases (e.g. one per node) and combines them"""
+    statistics = []
+    for db in db_paths:
+        conn = sqlite3.connect(db)
+        RefreshSummary(conn)
+        statistics.append(LoadSummaryStatistics(conn.cursor(), group_columns, tags))
+        conn.close()
+    return CombineStatistics(statistics)
+
+
+if __name__ == "__main__":
+    for db in sys.argv[1:]:
+        connection = sqlite3.connect(db)
+        print('{}: {} groups refreshed'.format(db, RefreshSummary(connection)))
+        connection.close()
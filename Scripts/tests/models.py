@@ -0,0 +1,47 @@
+import itertools
+import numpy as np
+
+bigM = 1e6
+
+
+def RandomBigMModel(random, variables=2, binaries=6, constraints=16, domain=(-5, 15)):
+    """Text of a random big-M model in the form written by ModelCreator: every constraint bounds one variable by
+    an integer threshold and is relaxed by M for each of its binaries leaving its active value"""
+    lines = ['Maximize', ' x0', 'Subject To']
+    for i in xrange(constraints):
+        variable = random.randint(variables)
+        chosen = random.choice(binaries, random.randint(1, min(3, binaries) + 1), replace=False)
+        signs = random.choice([-1, 1], len(chosen))
+        threshold = random.randint(domain[0] + 1, domain[1])
+        if random.rand() < 0.5:
+            sense, rhs = '<=', threshold + bigM * np.sum(signs > 0)
+        else:
+            sense, rhs = '>=', threshold - bigM * np.sum(signs < 0)
+        terms = ' '.join('{} 1e+006 b{}'.format('+' if sign > 0 else '-', b) for sign, b in zip(signs, chosen))
+        lines.append(' c{}: x{} {} {} {!r}'.format(i, variable, terms, sense, float(rhs)))
+    lines.append('Bounds')
+    lines.extend(' {} <= x{} <= {}'.format(domain[0], i, domain[1]) for i in xrange(variables))
+    lines.append('Binaries')
+    lines.append(' ' + ' '.join('b{}'.format(b) for b in xrange(binaries)))
+    lines.append('End')
+    return [line + '\n' for line in lines]
+
+
+def Satisfies(constraint, values, tolerance=1e-6):
+    activity = sum(coefficient * values[variable] for coefficient, variable in constraint.terms)
+    if constraint.sense == '<=':
+        return activity <= constraint.rhs + tolerance
+    if constraint.sense == '>=':
+        return activity >= constraint.rhs - tolerance
+    return abs(activity - constraint.rhs) <= tolerance
+
+
+def FeasibleAssignments(constraints, binaries, point):
+    """Assignments of `binaries` (as tuples) under which `point` (name -> value) satisfies every constraint"""
+    feasible = []
+    for assignment in itertools.product((0, 1), repeat=len(binaries)):
+        values = dict(point)
+        values.update(zip(binaries, assignment))
+        if all(Satisfies(constraint, values) for constraint in constraints):
+            feasible.append(assignment)
+    return feasible
@@ -0,0 +1,97 @@
+import re
+import unittest
+import numpy as np
+from c45 import DecisionTree, Learn, leafFeature
+
+rulePattern = re.compile(r'\(x(\d+) (<=|>) (\S+)\)')
+
+
+def Paths(tree):
+    """Features split on along the path to every leaf, with the depth of the leaf"""
+    paths, stack = [], [(0, [])]
+    while stack:
+        node, features = stack.pop()
+        if tree.feature[node] == leafFeature:
+            paths.append(features)
+            continue
+        stack.append((tree.left[node], features + [tree.feature[node]]))
+        stack.append((tree.right[node], features + [tree.feature[node]]))
+    return paths
+
+
+def ApplyRule(rule, x):
+    """Output of a rule of DecisionTree.Rules and the rows of `x` satisfying its antecedents"""
+    output, antecedents = rule.split(' =: ')
+    matches = np.ones(len(x), dtype=bool)
+    for feature, sense, threshold in rulePattern.findall(antecedents):
+        values = x[:, int(feature)]
+        matches &= values <= float(threshold) if sense == '<=' else values > float(threshold)
+    return int(output), matches
+
+
+def RandomData(random, count=400, dimensions=3):
+    x = random.uniform(-1, 1, (count, dimensions))
+    y = (np.sum(x ** 2, axis=1) < 0.5).astype(int)
+    return x, y
+
+
+class LearnTests(unittest.TestCase):
+    def testJoinAndMaxHeight(self):
+        random = np.random.RandomState(0)
+        x, y = RandomData(random)
+        for bins in (None, 16):
+            for join, max_height in ((1, 0), (2, 0), (1, 2), (3, 3), (5, 0)):
+                tree = Learn(x, y, join, max_height, bins)
+                paths = Paths(tree)
+                self.assertEqual(len(paths), tree.leaves)
+                self.assertLessEqual(max(np.bincount(path, minlength=1).max() if path else 0 for path in paths), join)
+                if max_height:
+                    self.assertLessEqual(tree.height, max_height)
+                self.assertEqual(tree.height, max(len(path) for path in paths))
+
+    def testUnlimitedTreeFitsTrainingSet(self):
+        random = np.random.RandomState(1)
+        x = random.uniform(0, 1, (300, 2))
+        y = ((x[:, 0] > 0.3) & (x[:, 1] < 0.6)).astype(int)
+        tree = Learn(x, y, join=5)
+        np.testing.assert_array_equal(tree.Decide(x), y)
+
+    def testThresholdBetweenValues(self):
+        x = np.array([[0.0], [1.0], [2.0], [4.0], [5.0]])
+        tree = Learn(x, [0, 0, 0, 1, 1], join=1)
+        self.assertEqual((tree.nodes, tree.feature[0], tree.threshold[0]), (3, 0, 3.0))
+        self.assertEqual((tree.output[tree.left[0]], tree.output[tree.right[0]]), (0, 1))
+
+    def testPureSetIsLeaf(self):
+        tree = Learn(np.arange(10.0).reshape(5, 2), np.ones(5), join=2)
+        self.assertEqual((tree.nodes, tree.height, tree.output[0]), (1, 0, 1))
+
+
+class DecisionTreeTests(unittest.TestCase):
+    def testRulesMatchDecide(self):
+        random = np.random.RandomState(2)
+        x, y = RandomData(random)
+        test = random.uniform(-1.2, 1.2, (2000, 3))
+        for bins in (None, 8):
+            tree = Learn(x, y, 2, 4, bins)
+            rules = tree.Rules()
+            self.assertEqual(len(rules), tree.leaves)
+            decisions = tree.Decide(test)
+            covered = np.zeros(len(test), dtype=int)
+            for rule in rules:
+                output, matches = ApplyRule(rule, test)
+                covered += matches
+                self.assertTrue(np.all(decisions[matches] == output))
+            # Every point satisfies the rule of exactly one leaf
+            np.testing.assert_array_equal(covered, 1)
+
+    def testArrayRoundTrip(self):
+        x, y = RandomData(np.random.RandomState(3))
+        tree = Learn(x, y, 2, 3)
+        loaded = DecisionTree.FromArray(tree.ToArray())
+        self.assertEqual(loaded.Rules(), tree.Rules())
+        np.testing.assert_array_equal(loaded.Decide(x), tree.Decide(x))
+
+
+if __name__ == '__main__':
+    unittest.main()
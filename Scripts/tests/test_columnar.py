@@ -0,0 +1,54 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+from columnar import BuildColumns, CacheDirectory, LoadColumns, pointerFile
+
+database = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Databases', 'testDatabase.sqlite')
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db = os.path.join(self.directory, 'test.sqlite')
+        shutil.copy(database, self.db)
+        self.cache = CacheDirectory(self.db)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def Versions(self):
+        return sorted(name for name in os.listdir(self.cache) if name != pointerFile)
+
+    def testRebuildReplacesVersion(self):
+        results = LoadColumns(self.db)
+        first = self.Versions()
+        self.assertEqual(len(first), 1)
+        self.assertIsInstance(results['Jaccard'], np.memmap)
+
+        # Unchanged databases are not rebuilt
+        LoadColumns(self.db)
+        self.assertEqual(self.Versions(), first)
+
+        conn = sqlite3.connect(self.db)
+        conn.execute("DELETE FROM experiments WHERE id = (SELECT MAX(id) FROM experiments)")
+        conn.commit()
+        conn.close()
+        rebuilt = LoadColumns(self.db)
+        self.assertEqual(rebuilt.rows, results.rows - 1)
+        self.assertEqual(len(self.Versions()), 1)
+        self.assertNotEqual(self.Versions(), first)
+        # The old snapshot is still readable where its files were mapped before the swap
+        self.assertEqual(len(results['id']), rebuilt.rows + 1)
+
+    def testMissingVersionRebuilt(self):
+        BuildColumns(self.db)
+        with open(os.path.join(self.cache, pointerFile), 'w') as f:
+            f.write('v0-removed')
+        self.assertGreater(LoadColumns(self.db).rows, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
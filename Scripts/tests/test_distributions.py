@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+from distributions import RegularizedBeta, StudentQuantile, StudentTwoSidedP
+
+
+class RegularizedBetaTests(unittest.TestCase):
+    def testKnownValues(self):
+        # I_x(1, 1) = x; I_0.4(2, 3) is the probability of at least 2 successes in 4 trials with p = 0.4
+        np.testing.assert_allclose(RegularizedBeta(1, 1, [0, 0.3, 1]), [0, 0.3, 1])
+        self.assertAlmostEqual(float(RegularizedBeta(2, 3, 0.4)), 0.5248, places=12)
+        # Symmetry used for x above the mean
+        self.assertAlmostEqual(float(RegularizedBeta(3, 2, 0.6)), 1 - 0.5248, places=12)
+
+
+class StudentTests(unittest.TestCase):
+    def testTwoSidedPAgainstTables(self):
+        self.assertAlmostEqual(float(StudentTwoSidedP(2.0, 10)), 0.07338803, places=8)
+        self.assertAlmostEqual(float(StudentTwoSidedP(-2.0, 10)), 0.07338803, places=8)
+        # Cauchy distribution for 1 degree of freedom, 1 - t / sqrt(2 + t^2) for 2
+        np.testing.assert_allclose(StudentTwoSidedP([1.0, 1.0], [1, 2]), [0.5, 1 - 1 / np.sqrt(3)], rtol=1e-12)
+        np.testing.assert_array_equal(StudentTwoSidedP([0.0, np.inf], [10, 5]), [1, 0])
+        self.assertTrue(np.isnan(StudentTwoSidedP(np.nan, 10)))
+
+    def testQuantileAgainstTables(self):
+        np.testing.assert_allclose(StudentQuantile(0.95, [1, 10, 30]), [12.7062047, 2.2281389, 2.0422725],
+                                   rtol=1e-7)
+        np.testing.assert_allclose(StudentQuantile(0.99, [5]), [4.0321430], rtol=1e-7)
+        self.assertTrue(np.isnan(StudentQuantile(0.95, [0])[0]))
+
+    def testQuantileInvertsP(self):
+        dof = np.array([2.0, 7, 50])
+        np.testing.assert_allclose(StudentTwoSidedP(StudentQuantile(0.9, dof), dof), 0.1, rtol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
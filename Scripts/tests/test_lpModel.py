@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+from lpModel import BoxModel, CompileModel, ReadLp, RemoveContainedBoxes
+from tests.models import FeasibleAssignments, RandomBigMModel
+
+
+def BruteForceContains(low, high, points):
+    return np.array([np.any(np.all((low <= point) & (point <= high), axis=1)) for point in points], dtype=bool)
+
+
+class BoxModelTests(unittest.TestCase):
+    def testContainsMatchesBruteForce(self):
+        random = np.random.RandomState(0)
+        for boxes in (0, 1, 5, 63, 64, 65, 200):
+            dimensions = random.randint(1, 4)
+            low = random.randint(0, 8, (boxes, dimensions)).astype(float)
+            high = low + random.randint(0, 4, (boxes, dimensions))
+            # Half of the points lie on box bounds
+            points = random.randint(-1, 12, (500, dimensions)) + random.choice([0, 0.5], (500, dimensions))
+            model = BoxModel(range(dimensions), low, high)
+            np.testing.assert_array_equal(model.Contains(points, block_size=128),
+                                          BruteForceContains(low, high, points))
+
+    def testUnboundedBoxes(self):
+        model = BoxModel(['x0', 'x1'], [[-np.inf, 0], [1, -np.inf]], [[0, np.inf], [np.inf, 2]])
+        points = np.array([[-1e300, 5], [0, 0], [0.5, 0.5], [1e300, -1e300], [0.5, -1]])
+        np.testing.assert_array_equal(model.Contains(points), [True, True, False, True, False])
+
+    def testRemoveContainedBoxesKeepsUnion(self):
+        random = np.random.RandomState(1)
+        low = random.randint(0, 5, (100, 2)).astype(float)
+        high = low + random.randint(0, 5, (100, 2))
+        kept_low, kept_high = RemoveContainedBoxes(low, high, block_size=16)
+        self.assertLess(len(kept_low), len(low))
+        points = random.randint(-1, 11, (1000, 2)) + random.choice([0, 0.5], (1000, 2))
+        np.testing.assert_array_equal(BruteForceContains(kept_low, kept_high, points),
+                                      BruteForceContains(low, high, points))
+
+
+class CompileModelTests(unittest.TestCase):
+    def testMembershipMatchesBinaryEnumeration(self):
+        random = np.random.RandomState(2)
+        for trial in xrange(10):
+            model = ReadLp(RandomBigMModel(random))
+            compiled = CompileModel(model)
+            self.assertEqual(compiled.variables, ['x0', 'x1'])
+            points = random.uniform(-6, 16, (200, 2))
+            # Points outside of the variable bounds lie outside of every box
+            expected = [np.all((-5 <= point) & (point <= 15)) and
+                        len(FeasibleAssignments(model.constraints, sorted(model.binaries), zip(['x0', 'x1'], point)))
+                        > 0 for point in points]
+            np.testing.assert_array_equal(compiled.Contains(points), expected)
+
+    def testTooManyBoxes(self):
+        model = ReadLp(RandomBigMModel(np.random.RandomState(3)))
+        self.assertRaises(ValueError, CompileModel, model, max_boxes=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
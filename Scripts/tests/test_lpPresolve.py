@@ -0,0 +1,88 @@
+import itertools
+import unittest
+from StringIO import StringIO
+import numpy as np
+from lpPresolve import Presolve, ReadProblem
+from lpReader import WriteRecords
+from tests.models import RandomBigMModel, Satisfies
+
+dominatedModel = """Maximize
+ x0
+Subject To
+ c0: x0 + 1e+006 b0 <= 1000004
+ c1: x0 + 1e+006 b0 <= 1000004
+ c2: x0 + 1e+006 b0 <= 1000006
+ c3: x0 - 1e+006 b0 <= 7
+ c4: 2 x0 <= 30
+Bounds
+ -5 <= x0 <= 15
+Binaries
+ b0
+End
+"""
+
+
+def Feasible(problem, values):
+    return all(lower - 1e-6 <= values[name] <= upper + 1e-6 for name, (lower, upper) in problem.bounds.items()) and \
+        all(Satisfies(constraint, values) for constraint in problem.constraints)
+
+
+def FeasiblePoints(problem, points, continuous, binaries):
+    """Feasibility of every point combined with every assignment of the binaries"""
+    return [Feasible(problem, dict(zip(continuous, point) + zip(binaries, assignment)))
+            for point in points for assignment in itertools.product((0.0, 1.0), repeat=len(binaries))]
+
+
+class PresolveTests(unittest.TestCase):
+    def testFeasibilityPreserved(self):
+        random = np.random.RandomState(0)
+        binaries = ['b{}'.format(i) for i in xrange(6)]
+        feasible = 0
+        for trial in xrange(10):
+            lines = RandomBigMModel(random)
+            original, presolved = ReadProblem(lines), ReadProblem(lines)
+            report = Presolve(presolved)
+            self.assertLess(report['MaxCoefficientAfter'], 1e6)
+            self.assertLessEqual(report['RowsAfter'], report['Rows'])
+
+            # The presolved model is written and read again as by PresolveFile
+            f = StringIO()
+            WriteRecords(f, presolved.Records())
+            written = ReadProblem(StringIO(f.getvalue()).readlines())
+
+            points = random.uniform(-5, 15, (100, 2))
+            expected = FeasiblePoints(original, points, ['x0', 'x1'], binaries)
+            feasible += sum(expected)
+            self.assertEqual(FeasiblePoints(presolved, points, ['x0', 'x1'], binaries), expected)
+            self.assertEqual(FeasiblePoints(written, points, ['x0', 'x1'], binaries), expected)
+        self.assertGreater(feasible, 0)
+
+    def testDomainRestrictsBounds(self):
+        random = np.random.RandomState(3)
+        lines = RandomBigMModel(random)
+        original, presolved = ReadProblem(lines), ReadProblem(lines)
+        domain = np.array([[0.0, 10.0], [-2.0, 12.0]])
+        Presolve(presolved, domain)
+        points = random.uniform(-5, 15, (200, 2))
+        inside = np.all((domain[:, 0] <= points) & (points <= domain[:, 1]), axis=1)
+        binaries = ['b{}'.format(i) for i in xrange(6)]
+        expected = np.array(FeasiblePoints(original, points, ['x0', 'x1'], binaries)).reshape(len(points), -1)
+        actual = np.array(FeasiblePoints(presolved, points, ['x0', 'x1'], binaries)).reshape(len(points), -1)
+        np.testing.assert_array_equal(actual, expected & inside[:, np.newaxis])
+
+    def testRemovesDuplicatedAndDominatedRows(self):
+        problem = ReadProblem(dominatedModel.splitlines(True))
+        report = Presolve(problem)
+        self.assertEqual((report['BoundRows'], report['Duplicates'], report['Dominated']), (1, 1, 1))
+        self.assertEqual([constraint.name for constraint in problem.constraints], ['c0', 'c3'])
+        self.assertEqual(problem.bounds['x0'], (-5.0, 15.0))
+        # Relaxing by the width of the domain is enough
+        self.assertEqual(report['MaxCoefficientAfter'], 11.0)
+
+    def testDomainOfWrongSize(self):
+        problem = ReadProblem(dominatedModel.splitlines(True))
+        self.assertRaises(ValueError, Presolve, problem, np.zeros((2, 2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
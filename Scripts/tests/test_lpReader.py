@@ -0,0 +1,81 @@
+import os
+import unittest
+from StringIO import StringIO
+from lpIndex import ModelStatistics
+from lpReader import Bound, Constraint, Objective, VariableTypes, ReadRecords, WriteRecords
+
+caseStudy = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Case study')
+
+model = """\\ Model with every supported record
+Minimize
+ cost: 2 x + 3.5 y - z + [ 4 x ^ 2 + 2 x * y ] / 2 + 7
+Subject To
+ c0: x + 1e+006 b0 <= 1.0000089999985989e+006
+ c1: - x + 2 y
+   - 1e+006 b1 >= -3
+ c2: x + y + z = 4
+ q0: x + [ x ^ 2 - y * z ] <= 10
+Bounds
+ -1 <= x <= 5.5
+ y >= -inf
+ z <= 8
+ w free
+ v = 2
+Binaries
+ b0 b1
+Generals
+ n
+End
+"""
+
+
+def RoundTrip(records):
+    f = StringIO()
+    WriteRecords(f, records, 'round trip')
+    return list(ReadRecords(StringIO(f.getvalue()).readlines()))
+
+
+class ReadRecordsTests(unittest.TestCase):
+    def testRecords(self):
+        records = list(ReadRecords(model.splitlines(True)))
+        self.assertEqual(records[0], Objective('min', 'cost', [(2.0, 'x'), (3.5, 'y'), (-1.0, 'z')],
+                                               [(2.0, 'x', 'x'), (1.0, 'x', 'y')], 7.0))
+        self.assertEqual(records[1], Constraint('c0', [(1.0, 'x'), (1e6, 'b0')], [], '<=', 1.0000089999985989e+006))
+        # Constraints wrapped over several lines are joined
+        self.assertEqual(records[2], Constraint('c1', [(-1.0, 'x'), (2.0, 'y'), (-1e6, 'b1')], [], '>=', -3.0))
+        self.assertEqual(records[4], Constraint('q0', [(1.0, 'x')], [(1.0, 'x', 'x'), (-1.0, 'y', 'z')], '<=', 10.0))
+        self.assertEqual(records[5:10], [Bound('x', -1.0, 5.5), Bound('y', float('-inf'), None),
+                                         Bound('z', None, 8.0), Bound('w', float('-inf'), float('inf')),
+                                         Bound('v', 2.0, 2.0)])
+        self.assertEqual(records[10:], [VariableTypes('binaries', ['b0', 'b1']), VariableTypes('generals', ['n'])])
+
+    def testWriteRecordsRoundTrip(self):
+        records = list(ReadRecords(model.splitlines(True)))
+        self.assertEqual(RoundTrip(records), records)
+
+    def testCaseStudyRoundTrip(self):
+        for name in ('model_wine-red_0_4.lp', 'model_wine-white_3_6.lp'):
+            with open(os.path.join(caseStudy, name)) as f:
+                records = list(ReadRecords(f))
+            self.assertGreater(len(records), 500)
+            self.assertEqual(RoundTrip(records), records)
+
+    def testInvalidExpression(self):
+        self.assertRaises(ValueError, list, ReadRecords(['Subject To\n', ' c0: x + y # 2 <= 1\n', 'End\n']))
+
+
+class ModelStatisticsTests(unittest.TestCase):
+    def testStatistics(self):
+        stats, bounds = ModelStatistics(model.splitlines(True))
+        self.assertEqual((stats['Sense'], stats['ObjectiveTerms'], stats['ObjectiveQuadraticTerms']), ('min', 3, 2))
+        self.assertEqual((stats['Constraints'], stats['Equalities'], stats['QuadraticConstraints']), (4, 1, 1))
+        self.assertEqual((stats['Nonzeros'], stats['BigMTerms'], stats['BigMConstraints']), (9, 2, 2))
+        self.assertEqual((stats['MinCoefficient'], stats['MaxCoefficient']), (1.0, 1e6))
+        self.assertEqual((stats['Variables'], stats['Binaries'], stats['Generals']), (8, 2, 1))
+        self.assertEqual(bounds['b0'], ('binary', 0.0, 1.0))
+        self.assertEqual(bounds['n'], ('general', 0.0, float('inf')))
+        self.assertEqual(bounds['z'], ('continuous', 0.0, 8.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
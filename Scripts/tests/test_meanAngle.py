@@ -0,0 +1,65 @@
+import itertools
+import unittest
+import numpy as np
+from meanAngle import Assign, Cover, MeanAngle, ModelAxes
+
+
+def ExhaustiveCover(cost):
+    """Smallest total cost of a set of cells holding a cell of every row and column"""
+    rows, columns = cost.shape
+    best = np.inf
+    for cells in itertools.product((False, True), repeat=cost.size):
+        cover = np.array(cells).reshape(rows, columns)
+        if cover.any(axis=1).all() and cover.any(axis=0).all():
+            best = min(best, cost[cover].sum())
+    return best
+
+
+class AssignTests(unittest.TestCase):
+    def testMatchesPermutations(self):
+        random = np.random.RandomState(0)
+        for rows, columns in ((1, 1), (2, 2), (2, 4), (3, 3), (3, 5), (5, 5)):
+            cost = random.randint(0, 10, (rows, columns)).astype(float)
+            assignment = Assign(cost)
+            self.assertEqual(len(set(assignment)), rows)
+            best = min(cost[np.arange(rows), list(chosen)].sum()
+                       for chosen in itertools.permutations(range(columns), rows))
+            self.assertEqual(cost[np.arange(rows), assignment].sum(), best)
+
+    def testMoreRowsThanColumns(self):
+        self.assertRaises(ValueError, Assign, np.zeros((3, 2)))
+
+
+class CoverTests(unittest.TestCase):
+    def testMatchesExhaustiveSearch(self):
+        random = np.random.RandomState(1)
+        for trial in xrange(60):
+            rows, columns = random.randint(1, 4, 2)
+            # Integer costs have many ties, uniform ones none
+            cost = random.randint(0, 5, (rows, columns)).astype(float) if trial % 2 else \
+                random.uniform(0, np.pi / 2, (rows, columns))
+            cover = Cover(cost)
+            self.assertTrue(cover.any(axis=1).all() and cover.any(axis=0).all())
+            self.assertAlmostEqual(cost[cover].sum(), ExhaustiveCover(cost))
+
+    def testEmptyMatrix(self):
+        for shape in ((0, 3), (3, 0), (0, 0)):
+            self.assertEqual(Cover(np.zeros(shape)).shape, shape)
+        self.assertEqual(MeanAngle('cube', 3, []), 0)
+
+
+class MeanAngleTests(unittest.TestCase):
+    def testCube(self):
+        # Synthesized constraints of a cube are parallel to its own constraints
+        self.assertEqual(MeanAngle('cube', 3, [0, 0, 1, 1, 2, 2]), 0)
+        # Six benchmark constraints, of which those of axis 2 are at a right angle to both synthesized constraints
+        self.assertAlmostEqual(MeanAngle('cube', 3, [0, 1]), 2 * (np.pi / 2) / 6)
+
+    def testModelAxes(self):
+        lines = ['Subject To\n', ' c0: x1 + 1e+006 b0 <= 1000003\n', ' c1: x0 - 1e+006 b0 >= -999998\n',
+                 'Bounds\n', ' x2 free\n', 'Binaries\n', ' b0\n', 'End\n']
+        self.assertEqual(ModelAxes(lines), ([1, 0], 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+from significance import AdjustPValues, PairedTTests
+
+# Hand-worked family of four tests, in sorted order 0.005, 0.01, 0.03, 0.04:
+# Holm multiplies by 4, 3, 2, 1 and keeps the running maximum: 0.02, 0.03, 0.06, 0.06;
+# Benjamini-Hochberg multiplies by 4/1, 4/2, 4/3, 4/4 and keeps the running minimum from the top: 0.02, 0.02, 0.04, 0.04
+pValues = [0.01, 0.04, 0.03, 0.005]
+
+
+class AdjustPValuesTests(unittest.TestCase):
+    def testHolm(self):
+        np.testing.assert_allclose(AdjustPValues(pValues, 'holm'), [0.03, 0.06, 0.06, 0.02])
+
+    def testBenjaminiHochberg(self):
+        np.testing.assert_allclose(AdjustPValues(pValues, 'fdr_bh'), [0.02, 0.04, 0.04, 0.02])
+
+    def testBonferroniCappedAtOne(self):
+        np.testing.assert_allclose(AdjustPValues(pValues, 'bonferroni'), [0.04, 0.16, 0.12, 0.02])
+        np.testing.assert_array_equal(AdjustPValues([0.5, 0.6], 'bonferroni'), [1, 1])
+
+    def testMissingValuesLeftOut(self):
+        # The family has two members
+        np.testing.assert_allclose(AdjustPValues([[0.01, np.nan], [0.04, np.nan]], 'holm'),
+                                   [[0.02, np.nan], [0.04, np.nan]])
+
+    def testNoCorrection(self):
+        np.testing.assert_array_equal(AdjustPValues(pValues), pValues)
+        self.assertRaises(ValueError, AdjustPValues, pValues, 'sidak')
+
+
+class PairedTTestsTests(unittest.TestCase):
+    def testGroups(self):
+        keys = [('a',), ('a',), ('a',), ('b',)]
+        differences = np.array([[1.0, 0], [2, 0], [3, 0], [4, 4]])
+        tests = PairedTTests(keys, differences)
+        self.assertEqual(tests.keys, [('a',), ('b',)])
+        # Mean 2, standard error 1 / sqrt(3); p = 1 - t / sqrt(2 + t^2) with 2 degrees of freedom
+        self.assertAlmostEqual(tests.t[0, 0], 2 * np.sqrt(3))
+        self.assertAlmostEqual(tests.p[0, 0], 1 - 2 * np.sqrt(3) / np.sqrt(14))
+        # No difference at all is not significant
+        self.assertEqual((tests.t[0, 1], tests.p[0, 1]), (0, 1))
+        # A single pair has no p-value
+        self.assertTrue(np.isnan(tests.p[1]).all())
+        self.assertEqual(tests.Significant(('b',), 0.05)[:2], [False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from summary import RefreshSummary, stateTable, summaryRowsQuery, summaryTable
+
+database = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Databases', 'testDatabase.sqlite')
+
+
+class RefreshSummaryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        db = os.path.join(self.directory, 'test.sqlite')
+        shutil.copy(database, db)
+        self.conn = sqlite3.connect(db)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.directory)
+
+    def Rebuilt(self):
+        """Summary computed from scratch"""
+        self.conn.execute("DROP TABLE {}".format(summaryTable))
+        self.conn.execute("DROP TABLE {}".format(stateTable))
+        RefreshSummary(self.conn)
+        return self.conn.execute(summaryRowsQuery).fetchall()
+
+    def testNullKeysRecomputed(self):
+        RefreshSummary(self.conn)
+        self.conn.execute("UPDATE experiments SET Components = NULL WHERE id IN "
+                          "(SELECT id FROM experiments ORDER BY id LIMIT 5)")
+        self.conn.commit()
+        self.assertGreater(RefreshSummary(self.conn), 0)
+        refreshed = self.conn.execute(summaryRowsQuery).fetchall()
+        self.assertTrue(any(row[7] is None for row in refreshed))
+        self.assertEqual(refreshed, self.Rebuilt())
+
+        # Rows of a group with a NULL key are found again once they change
+        self.conn.execute("DELETE FROM experiments WHERE id = (SELECT MIN(id) FROM experiments)")
+        self.conn.commit()
+        RefreshSummary(self.conn)
+        self.assertEqual(self.conn.execute(summaryRowsQuery).fetchall(), self.Rebuilt())
+
+
+if __name__ == '__main__':
+    unittest.main()